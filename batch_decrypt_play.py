@@ -16,6 +16,8 @@ from player.core.video_processor import VideoProcessor
 from player.cli.interface import CLIInterface
 from player.utils.file_utils import FileUtils
 from player.exceptions.custom_exceptions import VideoEncryptionError, PasswordError
+from player.crypto.key_cache import get_key_cache
+from player.core.playback_prefetcher import PlaylistPrefetcher
 
 
 class BatchDecryptPlayer:
@@ -37,12 +39,14 @@ class BatchDecryptPlayer:
             'skipped': 0
         }
         self.current_password = None
+        self.prefetch_stats = None
     
     def process_folder(self, input_folder: str, password: str = None,
                       pattern: str = "*.enc.mp4", recursive: bool = False,
                       skip_all_notice: bool = False, ask_each: bool = False,
                       stop_on_error: bool = False, playlist_mode: bool = False,
-                      shuffle: bool = False):
+                      shuffle: bool = False, prefetch_depth: int = 2,
+                      prefetch_budget_mb: int = 256, interval: int = 0):
         """
         处理文件夹中的所有加密视频
         
@@ -56,6 +60,9 @@ class BatchDecryptPlayer:
             stop_on_error: 出错时是否停止
             playlist_mode: 播放列表模式（连续播放）
             shuffle: 随机播放
+            prefetch_depth: 播放列表模式下在后台预先准备的后续文件数（0表示不预取）
+            prefetch_budget_mb: 预取占用的内存/磁盘上限（MB）
+            interval: 播放列表模式下两个视频之间的间隔（秒）
             
         Returns:
             处理统计信息
@@ -83,125 +90,153 @@ class BatchDecryptPlayer:
             import random
             random.shuffle(video_files)
         
-        # 处理每个文件
-        for i, video_file in enumerate(video_files, 1):
-            try:
-                relative_path = os.path.relpath(video_file, input_folder)
-                print(f"[{i}/{len(video_files)}] 准备播放: {relative_path}")
-                
-                # 显示视频信息
+        # 播放列表模式下按（打乱后的）播放顺序预取后续文件
+        playlist = None
+        if playlist_mode and prefetch_depth > 0:
+            playlist = PlaylistPrefetcher(self.processor, video_files, prefetch_depth,
+                                          prefetch_budget_mb * 1024 * 1024)
+        
+        # 处理每个文件（提前停止、中断或异常退出时取消不再需要的预取）
+        try:
+            for i, video_file in enumerate(video_files, 1):
                 try:
-                    self.cli.show_video_info(video_file)
-                except Exception as e:
-                    print(f"  警告: 无法获取视频信息: {e}")
-                
-                # 获取密码
-                file_password = password
-                if file_password is None:
-                    if self.current_password is None or ask_each:
-                        print(f"请输入 {os.path.basename(video_file)} 的解密密码:")
-                        file_password = getpass.getpass("密码: ")
+                    relative_path = os.path.relpath(video_file, input_folder)
+                    print(f"[{i}/{len(video_files)}] 准备播放: {relative_path}")
+                        
+                    # 显示视频信息
+                    try:
+                        self.cli.show_video_info(video_file)
+                    except Exception as e:
+                        print(f"  警告: 无法获取视频信息: {e}")
+                        
+                    # 获取密码
+                    file_password = password
+                    if file_password is None:
+                        if self.current_password is None or ask_each:
+                            print(f"请输入 {os.path.basename(video_file)} 的解密密码:")
+                            file_password = getpass.getpass("密码: ")
+                            if not ask_each:
+                                self.current_password = file_password
+                        else:
+                            file_password = self.current_password
+                        
+                    # 用文件头中的密钥校验值提前识别错误密码，避免先播放提示段（旧文件跳过）；
+                    # 预取时由后台线程校验（decrypt_and_play在提示段前等待结果），不在主线程重复派生密钥
+                    if playlist is None:
+                        self.processor.decryptor.check_password(video_file, file_password)
+                        
+                    # 询问是否跳过提示段（仅在存在提示段时询问）
+                    skip_notice = skip_all_notice
+                    if not skip_all_notice and not playlist_mode:
+                        # 检查是否有提示段
+                        from player.file.encrypted_video import EncryptedVideoFile
+                        encrypted_file = EncryptedVideoFile(video_file, lazy=True)
+                        has_notice = encrypted_file.notice_size > 0
+                            
+                        if has_notice:
+                            response = input("是否跳过提示段？(y/n, 默认n): ").strip().lower()
+                            skip_notice = response == 'y' or response == 'yes'
+                        else:
+                            skip_notice = True  # 无提示段，直接跳过
+                        
+                    # 取出已在后台准备好的当前文件，并开始准备后续文件（逐个询问密码时无法提前准备）
+                    prefetcher = None
+                    if playlist is not None:
+                        prefetcher = playlist.take(i - 1, file_password)
                         if not ask_each:
-                            self.current_password = file_password
+                            playlist.schedule(i - 1, file_password)
+                        
+                    # 执行解密播放
+                    print(f"开始播放...")
+                    success = self.processor.decrypt_and_play(
+                        encrypted_path=video_file,
+                        password=file_password,
+                        skip_notice=skip_notice,
+                        prefetcher=prefetcher
+                    )
+                        
+                    if success:
+                        self.stats['played'] += 1
+                        print(f"  ✓ 播放完成")
+                            
+                        # 如果不是播放列表模式，询问是否继续
+                        if not playlist_mode and i < len(video_files):
+                            response = input("是否继续播放下一个文件？(y/n, 默认y): ").strip().lower()
+                            if response == 'n' or response == 'no':
+                                self.stats['skipped'] = len(video_files) - i
+                                print("用户选择停止播放")
+                                break
                     else:
-                        file_password = self.current_password
-                
-                # 询问是否跳过提示段（仅在存在提示段时询问）
-                skip_notice = skip_all_notice
-                if not skip_all_notice and not playlist_mode:
-                    # 检查是否有提示段
-                    from player.file.encrypted_video import EncryptedVideoFile
-                    encrypted_file = EncryptedVideoFile(video_file)
-                    has_notice = encrypted_file.notice_data is not None and len(encrypted_file.notice_data) > 0
-                    
-                    if has_notice:
-                        response = input("是否跳过提示段？(y/n, 默认n): ").strip().lower()
-                        skip_notice = response == 'y' or response == 'yes'
+                        self.stats['failed'] += 1
+                        print(f"  ✗ 播放失败")
+                            
+                        if stop_on_error:
+                            print("出错时停止选项已启用，停止播放")
+                            break
+                            
+                        # 询问是否继续
+                        response = input("播放失败，是否继续？(y/n, 默认y): ").strip().lower()
+                        if response == 'n' or response == 'no':
+                            self.stats['skipped'] = len(video_files) - i
+                            print("用户选择停止播放")
+                            break
+                        
+                    # 播放列表模式下，在文件之间添加间隔（默认无间隔，下一个文件已在后台准备好）
+                    if playlist_mode and i < len(video_files) and interval > 0:
+                        print(f"下一个视频将在{interval}秒后开始...")
+                        for remaining in range(interval, 0, -1):
+                            print(f"\r{remaining}秒...", end='')
+                            time.sleep(1)
+                        print("\r开始下一个视频...")
+                            
+                except KeyboardInterrupt:
+                    print("\n用户中断操作")
+                    self.stats['skipped'] = len(video_files) - i + 1
+                    break
+                except PasswordError as e:
+                    self.stats['failed'] += 1
+                    self.cli.show_error(e)
+                        
+                    # 记住的密码错误，下一个文件重新询问
+                    if password is None:
+                        self.current_password = None
+                        
+                    if stop_on_error:
+                        print("密码错误，停止播放")
+                        break
+                            
+                    # 询问是否重试
+                    response = input("密码错误，是否重试？(y/n, 默认n): ").strip().lower()
+                    if response == 'y' or response == 'yes':
+                        i -= 1  # 重试当前文件
                     else:
-                        skip_notice = True  # 无提示段，直接跳过
-                
-                # 执行解密播放
-                print(f"开始播放...")
-                success = self.processor.decrypt_and_play(
-                    encrypted_path=video_file,
-                    password=file_password,
-                    skip_notice=skip_notice
-                )
-                
-                if success:
-                    self.stats['played'] += 1
-                    print(f"  ✓ 播放完成")
-                    
-                    # 如果不是播放列表模式，询问是否继续
-                    if not playlist_mode and i < len(video_files):
                         response = input("是否继续播放下一个文件？(y/n, 默认y): ").strip().lower()
                         if response == 'n' or response == 'no':
                             self.stats['skipped'] = len(video_files) - i
-                            print("用户选择停止播放")
                             break
-                else:
+                except Exception as e:
                     self.stats['failed'] += 1
-                    print(f"  ✗ 播放失败")
-                    
+                    print(f"  ✗ 处理失败: {e}")
+                        
                     if stop_on_error:
                         print("出错时停止选项已启用，停止播放")
                         break
-                    
+                        
+                    import traceback
+                    traceback.print_exc()
+                        
                     # 询问是否继续
-                    response = input("播放失败，是否继续？(y/n, 默认y): ").strip().lower()
+                    response = input("处理失败，是否继续？(y/n, 默认y): ").strip().lower()
                     if response == 'n' or response == 'no':
                         self.stats['skipped'] = len(video_files) - i
                         print("用户选择停止播放")
                         break
-                
-                # 播放列表模式下，在文件之间添加短暂间隔
-                if playlist_mode and i < len(video_files):
-                    print(f"下一个视频将在5秒后开始...")
-                    for remaining in range(5, 0, -1):
-                        print(f"\r{remaining}秒...", end='')
-                        time.sleep(1)
-                    print("\r开始下一个视频...")
                     
-            except KeyboardInterrupt:
-                print("\n用户中断操作")
-                self.stats['skipped'] = len(video_files) - i + 1
-                break
-            except PasswordError as e:
-                self.stats['failed'] += 1
-                self.cli.show_error(e)
-                
-                if stop_on_error:
-                    print("密码错误，停止播放")
-                    break
-                    
-                # 询问是否重试
-                response = input("密码错误，是否重试？(y/n, 默认n): ").strip().lower()
-                if response == 'y' or response == 'yes':
-                    i -= 1  # 重试当前文件
-                else:
-                    response = input("是否继续播放下一个文件？(y/n, 默认y): ").strip().lower()
-                    if response == 'n' or response == 'no':
-                        self.stats['skipped'] = len(video_files) - i
-                        break
-            except Exception as e:
-                self.stats['failed'] += 1
-                print(f"  ✗ 处理失败: {e}")
-                
-                if stop_on_error:
-                    print("出错时停止选项已启用，停止播放")
-                    break
-                
-                import traceback
-                traceback.print_exc()
-                
-                # 询问是否继续
-                response = input("处理失败，是否继续？(y/n, 默认y): ").strip().lower()
-                if response == 'n' or response == 'no':
-                    self.stats['skipped'] = len(video_files) - i
-                    print("用户选择停止播放")
-                    break
-            
-            print()  # 空行分隔
+                print()  # 空行分隔
+        finally:
+            if playlist is not None:
+                playlist.cancel_all()
+                self.prefetch_stats = playlist.stats()
         
         return self.stats
     
@@ -218,6 +253,18 @@ class BatchDecryptPlayer:
         if self.stats['total'] > 0:
             success_rate = (self.stats['played'] / self.stats['total']) * 100
             print(f"播放成功率: {success_rate:.1f}%")
+        
+        key_cache_stats = get_key_cache().stats()
+        print(f"密钥缓存: 命中 {key_cache_stats['hits']} 次, 未命中 {key_cache_stats['misses']} 次")
+        
+        payload_cache = self.processor.payload_cache
+        if payload_cache.enabled:
+            payload_stats = payload_cache.stats()
+            print(f"解密视频缓存: 命中 {payload_stats['hits']} 次, 未命中 {payload_stats['misses']} 次, "
+                  f"命中率 {payload_stats['hit_rate'] * 100:.1f}%")
+        
+        if self.prefetch_stats:
+            print(f"播放列表预取: 命中 {self.prefetch_stats['hits']} 个, 未命中 {self.prefetch_stats['misses']} 个")
 
 
 def main():
@@ -239,6 +286,12 @@ def main():
                        help='播放列表模式（连续播放）')
     parser.add_argument('--shuffle', action='store_true',
                        help='随机播放')
+    parser.add_argument('--prefetch', type=int, default=2,
+                       help='播放列表模式下预先准备的后续文件数（默认2，0表示不预取）')
+    parser.add_argument('--prefetch-budget-mb', type=int, default=256,
+                       help='预取占用的内存/磁盘上限（MB，默认256）')
+    parser.add_argument('--interval', type=int, default=0,
+                       help='播放列表模式下两个视频之间的间隔秒数（默认0）')
     parser.add_argument('--config', default='config.json',
                        help='配置文件路径（默认：config.json）')
     parser.add_argument('--use-secrets', action='store_true',
@@ -275,7 +328,10 @@ def main():
             ask_each=args.ask_each,
             stop_on_error=args.stop_on_error,
             playlist_mode=args.playlist,
-            shuffle=args.shuffle
+            shuffle=args.shuffle,
+            prefetch_depth=args.prefetch,
+            prefetch_budget_mb=args.prefetch_budget_mb,
+            interval=args.interval
         )
         
         # 打印摘要
@@ -13,7 +13,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from player.core.decryptor import Decryptor
 from player.file.encrypted_video import EncryptedVideoFile
-from player.exceptions.custom_exceptions import CryptoError, FileFormatError
+from player.exceptions.custom_exceptions import CryptoError, FileFormatError, PasswordError
+from player.crypto.key_cache import get_key_cache
 
 
 class BatchDecryptSaver:
@@ -35,19 +36,24 @@ class BatchDecryptSaver:
             'skipped': 0
         }
     
-    def detect_original_extension(self, encrypted_file: EncryptedVideoFile) -> str:
+    def detect_original_extension(self, encrypted_file: EncryptedVideoFile,
+                                  password: str = None) -> str:
         """
         尝试检测原始文件扩展名
         
         Args:
             encrypted_file: 加密文件对象
+            password: 解密密码（提供时只解密开头16字节来检测原始文件头）
             
         Returns:
             文件扩展名（默认为.mp4）
         """
-        # 尝试通过文件头检测
+        # 尝试通过文件头检测（只读取加密段开头的几个字节）
         try:
-            encrypted_data = encrypted_file.extract_encrypted_section()
+            if password is not None:
+                encrypted_data = self.decryptor.decrypt_range(encrypted_file.file_path, password, 0, 16)
+            else:
+                encrypted_data = encrypted_file.read_encrypted_range(0, 16)
             
             # 检测ZIP文件
             if encrypted_data[:4] == b'PK\x03\x04':
@@ -74,7 +80,8 @@ class BatchDecryptSaver:
                 return '.7z'
             
             # 检测MP4文件
-            if encrypted_data[:4] == b'\x00\x00\x00\x18' or encrypted_data[:4] == b'\x00\x00\x00\x20':
+            if encrypted_data[:4] == b'\x00\x00\x00\x18' or encrypted_data[:4] == b'\x00\x00\x00\x20' \
+                    or encrypted_data[4:8] == b'ftyp':
                 return '.mp4'
             
         except:
@@ -98,36 +105,32 @@ class BatchDecryptSaver:
             (是否成功, 消息)
         """
         try:
-            # 加载加密文件
-            encrypted_file = EncryptedVideoFile(input_path)
+            # 加载加密文件（惰性模式，按需读取各段）
+            encrypted_file = EncryptedVideoFile(input_path, lazy=True)
             
             # 获取加密信息
             encryption_info = encrypted_file.header.get_encryption_info()
             algorithm = encryption_info.get('algorithm', 'N/A')
             
-            # 解密数据
-            encrypted_data = encrypted_file.extract_encrypted_section()
-            decrypted_data = self.decryptor.decrypt_stream(encrypted_data, password, encryption_info)
-            
             # 确保输出目录存在
             output_dir = os.path.dirname(output_path)
             if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir)
             
-            # 保存解密后的文件
-            with open(output_path, 'wb') as f:
-                f.write(decrypted_data)
+            # 分块解密并直接写入输出文件
+            self.decryptor.decrypt_file(input_path, output_path, password)
             
             # 保存提示段（载体视频）
             notice_output = None
-            if save_notice and len(encrypted_file.notice_data) > 0:
+            if save_notice and encrypted_file.notice_size > 0:
                 notice_output = os.path.splitext(output_path)[0] + "_notice.mp4"
                 with open(notice_output, 'wb') as f:
-                    f.write(encrypted_file.notice_data)
+                    for chunk in encrypted_file.iter_notice_chunks():
+                        f.write(chunk)
             
             return True, f"解密成功"
             
-        except CryptoError as e:
+        except (CryptoError, PasswordError) as e:
             return False, f"解密失败: {e}"
         except Exception as e:
             return False, f"解密失败: {e}"
@@ -184,22 +187,25 @@ class BatchDecryptSaver:
                 relative_path = os.path.relpath(encrypted_file, input_folder)
                 print(f"[{i}/{len(encrypted_files)}] 处理: {relative_path}")
                 
-                # 加载加密文件获取信息
-                encrypted_obj = EncryptedVideoFile(encrypted_file)
+                # 加载加密文件获取信息（惰性模式，只读取文件头）
+                encrypted_obj = EncryptedVideoFile(encrypted_file, lazy=True)
                 
                 # 显示文件信息
-                print(f"  提示段大小: {len(encrypted_obj.notice_data)} 字节")
-                print(f"  加密段大小: {len(encrypted_obj.encrypted_data)} 字节")
+                print(f"  提示段大小: {encrypted_obj.notice_size} 字节")
+                print(f"  加密段大小: {encrypted_obj.encrypted_size} 字节")
                 
                 encryption_info = encrypted_obj.header.get_encryption_info()
                 print(f"  加密算法: {encryption_info.get('algorithm', 'N/A')}")
                 
+                # 用文件头中的密钥校验值提前识别错误密码（旧文件跳过）
+                self.decryptor.check_password(encrypted_file, password)
+                
                 # 确定输出文件名和扩展名
                 filename_without_ext = os.path.splitext(os.path.basename(encrypted_file))[0]
                 
                 if detect_type:
                     # 尝试检测原始文件类型
-                    ext = self.detect_original_extension(encrypted_obj)
+                    ext = self.detect_original_extension(encrypted_obj, password)
                     print(f"  检测到文件类型: {ext}")
                 else:
                     ext = '.mp4'  # 默认为.mp4
@@ -226,7 +232,7 @@ class BatchDecryptSaver:
                     self.stats['success'] += 1
                     print(f"  ✓ 解密成功: {output_filename}")
                     
-                    if save_notice and len(encrypted_obj.notice_data) > 0:
+                    if save_notice and encrypted_obj.notice_size > 0:
                         notice_path = os.path.splitext(output_path)[0] + "_notice.mp4"
                         print(f"  ✓ 提示段已保存: {os.path.basename(notice_path)}")
                 else:
@@ -250,7 +256,7 @@ class BatchDecryptSaver:
                 print("\n用户中断操作")
                 self.stats['skipped'] = len(encrypted_files) - i + 1
                 break
-            except CryptoError as e:
+            except (CryptoError, PasswordError) as e:
                 self.stats['failed'] += 1
                 print(f"  ✗ 解密失败: {e}")
                 
@@ -301,6 +307,9 @@ class BatchDecryptSaver:
         if self.stats['total'] > 0:
             success_rate = (self.stats['success'] / self.stats['total']) * 100
             print(f"成功率: {success_rate:.1f}%")
+        
+        key_cache_stats = get_key_cache().stats()
+        print(f"密钥缓存: 命中 {key_cache_stats['hits']} 次, 未命中 {key_cache_stats['misses']} 次")
 
 
 def main():
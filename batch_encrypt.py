@@ -6,17 +6,84 @@ import sys
 import glob
 import argparse
 import getpass
+import traceback
 from pathlib import Path
 
 # 添加项目路径到系统路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from player.core.video_processor import VideoProcessor
+from player.core.batch_pool import BatchWorkerPool
 from player.cli.interface import CLIInterface
 from player.utils.file_utils import FileUtils
 from player.exceptions.custom_exceptions import VideoEncryptionError
 
 
+def encrypt_task(processor: VideoProcessor, task: dict) -> dict:
+    """
+    加密单个文件并打印处理过程（顺序处理和并行工作池共用，须为模块级函数）
+    
+    Args:
+        processor: 当前工作者的视频处理器
+        task: 任务参数（序号、输入/输出路径和加密选项）
+        
+    Returns:
+        结果字典（success，以及明文来源source）
+    """
+    cli = CLIInterface()
+    result = {'success': False, 'source': None}
+    try:
+        input_file = task['input_file']
+        output_file = task['output_file']
+        
+        # 确保输出文件的目录存在
+        FileUtils.ensure_directory(os.path.dirname(output_file))
+        
+        print(f"[{task['index']}/{task['total']}] 处理: {task['relative_path']}")
+        
+        # 显示视频信息
+        try:
+            cli.show_video_info(input_file)
+        except Exception as e:
+            print(f"  警告: 无法获取视频信息: {e}")
+        
+        # 执行加密
+        success = processor.encrypt_video(
+            input_path=input_file,
+            output_path=output_file,
+            password=task['password'],
+            notice_video_path=task['notice_video_path'],
+            metadata_config=task['metadata_config'],
+            pure_encrypt=task['pure_encrypt']
+        )
+        
+        if success:
+            result['success'] = True
+            print(f"  ✓ 加密完成: {os.path.basename(output_file)}")
+            
+            # 显示明文来源
+            last_source = processor.encryptor.last_source
+            if last_source:
+                result['source'] = last_source
+                source, reason = last_source
+                print(f"  处理方式: {BatchEncryptor.SOURCE_LABELS.get(source, source)}（{reason}）")
+            
+            # 显示输出文件信息
+            try:
+                cli.show_video_info(output_file)
+            except Exception as e:
+                print(f"  警告: 无法获取输出文件信息: {e}")
+        else:
+            print(f"  ✗ 加密失败: {os.path.basename(input_file)}")
+            
+    except Exception as e:
+        print(f"  ✗ 处理失败: {e}")
+        traceback.print_exc()
+    
+    print()  # 空行分隔
+    return result
+
+
 class BatchEncryptor:
     """批量加密器"""
     
@@ -33,14 +100,18 @@ class BatchEncryptor:
             'total': 0,
             'success': 0,
             'failed': 0,
-            'skipped': 0
+            'skipped': 0,
+            # 各明文来源（直接加密/重封装/非视频）的文件数
+            'sources': {}
         }
     
     def process_folder(self, input_folder: str, output_folder: str, 
                       password: str, notice_video_path: str = None,
                       metadata_config: str = None, pattern: str = "*.mp4",
                       recursive: bool = False, dry_run: bool = False,
-                      pure_encrypt: bool = False, use_queue: bool = True):
+                      pure_encrypt: bool = False, use_queue: bool = True,
+                      batch_key: bool = False, jobs: int = None,
+                      executor: str = None):
         """
         处理文件夹中的所有视频
         
@@ -55,6 +126,9 @@ class BatchEncryptor:
             dry_run: 试运行，不实际加密
             pure_encrypt: 纯加密模式（无提示段）
             use_queue: 是否使用队列文件夹（默认True）
+            batch_key: 批量密钥模式（整批只派生一次主密钥，每个文件用HKDF派生密钥）
+            jobs: 同时加密的文件数（0表示自动，None表示使用配置文件中的值）
+            executor: 并行执行器类型（thread或process，None表示使用配置文件中的值）
             
         Returns:
             处理统计信息
@@ -110,64 +184,93 @@ class BatchEncryptor:
             print("试运行完成")
             return self.stats
         
-        # 处理每个文件
+        tasks = []
         for i, video_file in enumerate(video_files, 1):
+            # 获取相对路径以保持文件夹结构，修改扩展名，添加.enc标识
+            relative_path = os.path.relpath(video_file, input_folder)
+            tasks.append({
+                'index': i,
+                'total': len(video_files),
+                'input_file': video_file,
+                'relative_path': relative_path,
+                'output_file': self._add_enc_suffix(os.path.join(output_folder, relative_path)),
+                'password': password,
+                'notice_video_path': notice_video_path,
+                'metadata_config': metadata_config,
+                'pure_encrypt': pure_encrypt
+            })
+        
+        # 并行任务数和执行器（未指定时使用配置文件中的值，0表示自动选择）
+        batch_config = self.processor.config_manager.get_batch_config()
+        jobs = batch_config['jobs'] if jobs is None else jobs
+        executor = executor or batch_config['executor']
+        if not jobs:
+            jobs = BatchWorkerPool.auto_jobs(video_files, output_folder,
+                                             self.processor.encryptor.kdf_params)
+        
+        if jobs > 1 and len(tasks) > 1:
+            print(f"并行加密: {jobs} 个任务（{'进程' if executor == 'process' else '线程'}）")
+            if batch_key:
+                print("批量密钥模式：每个并行任务共用一次密钥派生")
+            pool = BatchWorkerPool(jobs, executor, config_path=self.processor.config_manager.config_file,
+                                   batch_password=password if batch_key else None)
+            self._encrypt_parallel(pool, tasks)
+            return self.stats
+        
+        # 批量密钥模式：整批文件只运行一次密钥派生
+        if batch_key:
+            print("批量密钥模式：整批文件共用一次密钥派生")
+            self.processor.encryptor.begin_batch(password)
+        
+        try:
+            self._encrypt_files(tasks)
+        finally:
+            if batch_key:
+                self.processor.encryptor.end_batch()
+        
+        return self.stats
+    
+    def _encrypt_files(self, tasks: list):
+        """逐个加密文件并更新统计信息"""
+        for task in tasks:
             try:
-                # 获取相对路径以保持文件夹结构
-                relative_path = os.path.relpath(video_file, input_folder)
-                output_file = os.path.join(output_folder, relative_path)
-                
-                # 确保输出文件的目录存在
-                output_dir = os.path.dirname(output_file)
-                FileUtils.ensure_directory(output_dir)
-                
-                # 修改扩展名，添加.enc标识
-                output_file = self._add_enc_suffix(output_file)
-                
-                print(f"[{i}/{len(video_files)}] 处理: {relative_path}")
-                
-                # 显示视频信息
-                try:
-                    self.cli.show_video_info(video_file)
-                except Exception as e:
-                    print(f"  警告: 无法获取视频信息: {e}")
-                
-                # 执行加密
-                success = self.processor.encrypt_video(
-                    input_path=video_file,
-                    output_path=output_file,
-                    password=password,
-                    notice_video_path=notice_video_path,
-                    metadata_config=metadata_config,
-                    pure_encrypt=pure_encrypt
-                )
-                
-                if success:
-                    self.stats['success'] += 1
-                    print(f"  ✓ 加密完成: {os.path.basename(output_file)}")
-                    
-                    # 显示输出文件信息
-                    try:
-                        self.cli.show_video_info(output_file)
-                    except Exception as e:
-                        print(f"  警告: 无法获取输出文件信息: {e}")
-                else:
-                    self.stats['failed'] += 1
-                    print(f"  ✗ 加密失败: {os.path.basename(video_file)}")
-                    
+                self._record_result(encrypt_task(self.processor, task))
             except KeyboardInterrupt:
                 print("\n用户中断操作")
-                self.stats['skipped'] = len(video_files) - i + 1
+                self.stats['skipped'] = len(tasks) - task['index'] + 1
                 break
-            except Exception as e:
-                self.stats['failed'] += 1
-                print(f"  ✗ 处理失败: {e}")
-                import traceback
-                traceback.print_exc()
-            
-            print()  # 空行分隔
-        
-        return self.stats
+    
+    def _encrypt_parallel(self, pool: BatchWorkerPool, tasks: list):
+        """用工作池并行加密文件，按文件顺序输出各文件的处理过程并更新统计信息"""
+        finished = 0
+        try:
+            for _, result in pool.run(encrypt_task, tasks):
+                print(result['output'], end='')
+                if 'error' in result:
+                    # 任务函数之外的失败（如工作者初始化失败）
+                    print(f"  ✗ 处理失败: {result.get('error')}\n")
+                self._record_result(result)
+                finished += 1
+        except KeyboardInterrupt:
+            print("\n用户中断操作")
+            self.stats['skipped'] = len(tasks) - finished
+    
+    def _record_result(self, result: dict):
+        """把单个文件的结果计入统计信息"""
+        if not result['success']:
+            self.stats['failed'] += 1
+            return
+        self.stats['success'] += 1
+        if result.get('source'):
+            source = result['source'][0]
+            sources = self.stats['sources']
+            sources[source] = sources.get(source, 0) + 1
+    
+    SOURCE_LABELS = {
+        'passthrough': '直接加密原文件',
+        'remux': 'FFmpeg重封装',
+        'raw': '非视频文件直接加密'
+    }
     
     def _add_enc_suffix(self, file_path: str) -> str:
         """
@@ -193,6 +296,8 @@ class BatchEncryptor:
         print(f"成功: {self.stats['success']}")
         print(f"失败: {self.stats['failed']}")
         print(f"跳过: {self.stats['skipped']}")
+        for source, count in self.stats['sources'].items():
+            print(f"{self.SOURCE_LABELS.get(source, source)}: {count}")
         
         if self.stats['total'] > 0:
             success_rate = (self.stats['success'] / self.stats['total']) * 100
@@ -223,6 +328,12 @@ def main():
                        help='从secrets/password.txt读取密码')
     parser.add_argument('--no-queue', action='store_true',
                        help='禁用队列文件夹功能')
+    parser.add_argument('--batch-key', action='store_true',
+                       help='批量密钥模式：整批只派生一次主密钥，每个文件用HKDF派生独立密钥（适合大量小文件）')
+    parser.add_argument('-j', '--jobs', type=int,
+                       help='同时加密的文件数（0表示按CPU核心数、可用内存和磁盘空间自动选择，默认读取配置文件）')
+    parser.add_argument('--executor', choices=BatchWorkerPool.EXECUTORS,
+                       help='并行执行器：thread（线程）或process（进程），默认读取配置文件')
     
     args = parser.parse_args()
     
@@ -265,6 +376,10 @@ def main():
         print(f"警告: 元数据配置文件不存在: {args.metadata}")
         args.metadata = None
     
+    if args.jobs is not None and args.jobs < 0:
+        print(f"错误: 并行任务数不能为负数: {args.jobs}")
+        sys.exit(1)
+    
     # 创建批量加密器
     encryptor = BatchEncryptor(args.config)
     
@@ -280,7 +395,10 @@ def main():
             recursive=args.recursive,
             dry_run=args.dry_run,
             pure_encrypt=args.pure_encrypt,
-            use_queue=not args.no_queue
+            use_queue=not args.no_queue,
+            batch_key=args.batch_key,
+            jobs=args.jobs,
+            executor=args.executor
         )
         
         # 打印摘要
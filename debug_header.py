@@ -13,12 +13,14 @@ def debug_header(file_path):
     print("=" * 60)
     
     try:
-        # 加载文件
-        encrypted_file = EncryptedVideoFile(file_path)
+        # 加载文件（惰性模式，只读取文件头）
+        encrypted_file = EncryptedVideoFile(file_path, lazy=True)
         
         print(f"文件大小: {os.path.getsize(file_path)} 字节")
-        print(f"提示段大小: {len(encrypted_file.notice_data)} 字节")
-        print(f"加密段大小: {len(encrypted_file.encrypted_data)} 字节")
+        print(f"提示段大小: {encrypted_file.notice_size} 字节")
+        print(f"文件头偏移: {encrypted_file.header_offset}")
+        print(f"加密段偏移: {encrypted_file.encrypted_offset}")
+        print(f"加密段大小: {encrypted_file.encrypted_size} 字节")
         print()
         
         # 检查文件头
@@ -27,7 +29,20 @@ def debug_header(file_path):
         print(f"  魔数: {header.magic}")
         print(f"  版本: {header.version}")
         print(f"  记录的加密数据大小: {header.encrypted_size}")
-        print(f"  实际加密数据大小: {len(encrypted_file.encrypted_data)}")
+        print(f"  实际加密数据大小: {encrypted_file.encrypted_size}")
+        print(f"  文件头长度: {header.size}")
+        print()
+        
+        # 检查索引尾（v2）
+        if encrypted_file.trailer:
+            trailer = encrypted_file.trailer
+            print("索引尾信息:")
+            print(f"  版本: {trailer.version}")
+            print(f"  文件头偏移: {trailer.header_offset}")
+            print(f"  提示段长度: {trailer.notice_size}")
+            print(f"  加密数据长度: {trailer.encrypted_size}")
+        else:
+            print("索引尾信息: 无（v1文件，通过搜索魔数定位文件头）")
         print()
         
         # 检查加密信息
@@ -10,10 +10,46 @@ from pathlib import Path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from player.core.video_processor import VideoProcessor
+from player.core.batch_pool import BatchWorkerPool
 from player.cli.interface import CLIInterface
 from player.utils.file_utils import FileUtils
 
 
+def encrypt_queue_file(processor: VideoProcessor, task: dict) -> dict:
+    """
+    加密队列中的单个文件并打印处理过程（顺序处理和并行工作池共用，须为模块级函数）
+    
+    Args:
+        processor: 当前工作者的视频处理器
+        task: 任务参数（序号、输入/输出路径和加密选项）
+        
+    Returns:
+        结果字典（success）
+    """
+    try:
+        print(f"\n[{task['index']}/{task['total']}] 处理: {os.path.basename(task['input_file'])}")
+        
+        # 执行加密
+        success = processor.encrypt_video(
+            input_path=task['input_file'],
+            output_path=task['output_file'],
+            password=task['password'],
+            notice_video_path=task['notice_video_path'],
+            metadata_config=task['metadata_config'],
+            pure_encrypt=task['pure_encrypt']
+        )
+        
+        if success:
+            print(f"  ✓ 加密成功")
+        else:
+            print(f"  ✗ 加密失败")
+        return {'success': bool(success)}
+            
+    except Exception as e:
+        print(f"  ✗ 加密失败: {e}")
+        return {'success': False}
+
+
 class InteractiveTool:
     """交互式加解密工具"""
     
@@ -347,6 +383,19 @@ class InteractiveTool:
             output_dir = output_path
             os.makedirs(output_dir, exist_ok=True)
         
+        # 选择并行任务数（配置文件中为0时按CPU核心数、可用内存和磁盘空间自动选择）
+        batch_config = self.processor.config_manager.get_batch_config()
+        default_jobs = batch_config['jobs'] or BatchWorkerPool.auto_jobs(
+            queue_files, output_dir, self.processor.encryptor.kdf_params)
+        jobs = input(f"并行加密任务数 (默认{default_jobs}): ").strip()
+        try:
+            jobs = int(jobs) if jobs else default_jobs
+            if jobs < 1:
+                raise ValueError
+        except ValueError:
+            print(f"✗ 无效的输入，使用默认值: {default_jobs}")
+            jobs = default_jobs
+        
         # 选择提示视频（仅在非纯加密模式下）
         use_metadata = False
         if not pure_encrypt:
@@ -368,6 +417,7 @@ class InteractiveTool:
         print(f"队列文件数量: {len(queue_files)}")
         print(f"输出目录: {output_dir}")
         print(f"加密算法: {self.algorithm}")
+        print(f"并行任务数: {jobs}")
         if pure_encrypt:
             print(f"加密模式: 纯加密（无提示段）")
         else:
@@ -395,34 +445,40 @@ class InteractiveTool:
         success_count = 0
         failed_count = 0
         
+        tasks = []
         for i, input_file in enumerate(queue_files, 1):
-            try:
-                print(f"\n[{i}/{len(queue_files)}] 处理: {os.path.basename(input_file)}")
-                
-                # 生成输出文件名
-                input_filename = os.path.basename(input_file)
-                output_file = os.path.join(output_dir, os.path.splitext(input_filename)[0] + ".enc.mp4")
-                
-                # 执行加密
-                success = self.processor.encrypt_video(
-                    input_path=input_file,
-                    output_path=output_file,
-                    password=self.password,
-                    notice_video_path=self.notice_video_path if not pure_encrypt else None,
-                    metadata_config=self.metadata_config if use_metadata else None,
-                    pure_encrypt=pure_encrypt
-                )
-                
-                if success:
-                    success_count += 1
-                    print(f"  ✓ 加密成功")
-                else:
-                    failed_count += 1
-                    print(f"  ✗ 加密失败")
-                    
-            except Exception as e:
+            # 生成输出文件名
+            input_filename = os.path.basename(input_file)
+            tasks.append({
+                'index': i,
+                'total': len(queue_files),
+                'input_file': input_file,
+                'output_file': os.path.join(output_dir, os.path.splitext(input_filename)[0] + ".enc.mp4"),
+                'password': self.password,
+                'notice_video_path': self.notice_video_path if not pure_encrypt else None,
+                'metadata_config': self.metadata_config if use_metadata else None,
+                'pure_encrypt': pure_encrypt
+            })
+        
+        if jobs > 1 and len(tasks) > 1:
+            # 并行加密：各文件的输出按顺序整段打印
+            pool = BatchWorkerPool(jobs, batch_config['executor'],
+                                   config_path=self.processor.config_manager.config_file,
+                                   algorithm=self.algorithm)
+            results = []
+            for _, result in pool.run(encrypt_queue_file, tasks):
+                print(result['output'], end='')
+                if 'error' in result:
+                    print(f"  ✗ 加密失败: {result['error']}")
+                results.append(result)
+        else:
+            results = [encrypt_queue_file(self.processor, task) for task in tasks]
+        
+        for result in results:
+            if result['success']:
+                success_count += 1
+            else:
                 failed_count += 1
-                print(f"  ✗ 加密失败: {e}")
         
         # 显示结果
         print(f"\n{'='*50}")
@@ -483,8 +539,8 @@ class InteractiveTool:
         
         # 检测加密文件类型
         from player.file.encrypted_video import EncryptedVideoFile
-        encrypted_file = EncryptedVideoFile(input_path)
-        has_notice = encrypted_file.notice_data is not None and len(encrypted_file.notice_data) > 0
+        encrypted_file = EncryptedVideoFile(input_path, lazy=True)
+        has_notice = encrypted_file.notice_size > 0
         
         # 检测是否可能是隐写文件（通过文件名判断）
         filename = os.path.basename(input_path)
@@ -617,38 +673,34 @@ class InteractiveTool:
             
             print(f"\n开始解密...")
             
-            # 加载加密文件
-            encrypted_file = EncryptedVideoFile(input_path)
+            # 加载加密文件（惰性模式，按需读取各段）
+            encrypted_file = EncryptedVideoFile(input_path, lazy=True)
             
-            print(f"提示段大小: {len(encrypted_file.notice_data)} 字节")
-            print(f"加密段大小: {len(encrypted_file.encrypted_data)} 字节")
+            print(f"提示段大小: {encrypted_file.notice_size} 字节")
+            print(f"加密段大小: {encrypted_file.encrypted_size} 字节")
             
             # 获取加密信息
             encryption_info = encrypted_file.header.get_encryption_info()
             print(f"加密算法: {encryption_info.get('algorithm', 'N/A')}")
             
-            # 解密数据
-            decryptor = Decryptor()
-            encrypted_data = encrypted_file.extract_encrypted_section()
-            decrypted_data = decryptor.decrypt_stream(encrypted_data, self.password, encryption_info)
-            print(f"✓ 解密完成，解密后大小: {len(decrypted_data)} 字节")
-            
             # 确保输出目录存在
             output_dir = os.path.dirname(output_path)
             if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir)
             
-            # 保存解密后的文件
-            with open(output_path, 'wb') as f:
-                f.write(decrypted_data)
+            # 分块解密并直接写入输出文件
+            decryptor = Decryptor()
+            decrypted_size = decryptor.decrypt_file(input_path, output_path, self.password)
+            print(f"✓ 解密完成，解密后大小: {decrypted_size} 字节")
             
             print(f"✓ 解密文件已保存: {output_path}")
             
             # 保存提示段（载体视频）
-            if save_notice and len(encrypted_file.notice_data) > 0:
+            if save_notice and encrypted_file.notice_size > 0:
                 notice_output = os.path.splitext(output_path)[0] + "_notice.mp4"
                 with open(notice_output, 'wb') as f:
-                    f.write(encrypted_file.notice_data)
+                    for chunk in encrypted_file.iter_notice_chunks():
+                        f.write(chunk)
                 print(f"✓ 提示段（载体视频）已保存: {notice_output}")
             
             return True
@@ -11,10 +11,33 @@ from pathlib import Path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from player.core.video_processor import VideoProcessor
+from player.core.batch_pool import BatchWorkerPool
 from player.core.encryptor import Encryptor
 from player.core.decryptor import Decryptor
 from player.file.encrypted_video import EncryptedVideoFile
 from player.exceptions.custom_exceptions import CryptoError, FileFormatError
+from player.crypto.key_cache import get_key_cache
+
+
+def encrypt_batch_file(processor: VideoProcessor, task: dict) -> dict:
+    """
+    批量加密中的单个文件（并行工作池调用，须为模块级函数）
+    
+    Returns:
+        结果字典（success，失败时附带error）
+    """
+    try:
+        success = processor.encrypt_video(
+            input_path=task["input_path"],
+            output_path=task["output_path"],
+            password=task["password"],
+            pure_encrypt=task["pure_encrypt"]
+        )
+        if success:
+            return {"success": True}
+        return {"success": False, "error": "加密失败"}
+    except Exception as e:
+        return {"success": False, "error": f"加密失败: {str(e)}"}
 
 
 class ShellVideoPlayerMCP:
@@ -160,6 +183,10 @@ class ShellVideoPlayerMCP:
                         "pure_encrypt": {
                             "type": "boolean",
                             "description": "纯加密模式（无提示段，默认：false）"
+                        },
+                        "jobs": {
+                            "type": "integer",
+                            "description": "同时加密的文件数（0表示自动选择，默认读取配置文件）"
                         }
                     },
                     "required": ["input_folder", "output_folder", "password"]
@@ -288,25 +315,20 @@ class ShellVideoPlayerMCP:
                     "error": f"输入文件不存在: {input_path}"
                 }
             
-            # 加载加密文件
-            encrypted_file = EncryptedVideoFile(input_path)
+            # 加载加密文件（惰性模式，按需读取各段）
+            encrypted_file = EncryptedVideoFile(input_path, lazy=True)
             
             # 获取加密信息
             encryption_info = encrypted_file.header.get_encryption_info()
             
-            # 解密数据
-            decryptor = Decryptor()
-            encrypted_data = encrypted_file.extract_encrypted_section()
-            decrypted_data = decryptor.decrypt_stream(encrypted_data, password, encryption_info)
-            
             # 确保输出目录存在
             output_dir = os.path.dirname(output_path)
             if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir)
             
-            # 保存解密后的文件
-            with open(output_path, 'wb') as f:
-                f.write(decrypted_data)
+            # 分块解密并直接写入输出文件
+            decryptor = Decryptor()
+            decryptor.decrypt_file(input_path, output_path, password)
             
             result = {
                 "success": True,
@@ -317,10 +339,11 @@ class ShellVideoPlayerMCP:
             }
             
             # 保存提示段（载体视频）
-            if save_notice and len(encrypted_file.notice_data) > 0:
+            if save_notice and encrypted_file.notice_size > 0:
                 notice_output = os.path.splitext(output_path)[0] + "_notice.mp4"
                 with open(notice_output, 'wb') as f:
-                    f.write(encrypted_file.notice_data)
+                    for chunk in encrypted_file.iter_notice_chunks():
+                        f.write(chunk)
                 result["notice_path"] = notice_output
                 result["message"] += f"\n提示段已保存: {notice_output}"
             
@@ -385,8 +408,8 @@ class ShellVideoPlayerMCP:
                     "error": f"文件不存在: {file_path}"
                 }
             
-            # 加载加密文件
-            encrypted_file = EncryptedVideoFile(file_path)
+            # 加载加密文件（惰性模式，只读取文件头）
+            encrypted_file = EncryptedVideoFile(file_path, lazy=True)
             
             # 获取加密信息
             encryption_info = encrypted_file.header.get_encryption_info()
@@ -394,11 +417,11 @@ class ShellVideoPlayerMCP:
             return {
                 "success": True,
                 "file_path": file_path,
-                "file_size": os.path.getsize(file_path),
-                "notice_size": len(encrypted_file.notice_data),
-                "encrypted_size": len(encrypted_file.encrypted_data),
+                "file_size": encrypted_file.file_size,
+                "notice_size": encrypted_file.notice_size,
+                "encrypted_size": encrypted_file.encrypted_size,
                 "algorithm": encryption_info.get('algorithm', 'N/A'),
-                "has_notice": len(encrypted_file.notice_data) > 0
+                "has_notice": encrypted_file.notice_size > 0
             }
         except Exception as e:
             return {
@@ -408,7 +431,7 @@ class ShellVideoPlayerMCP:
     
     def batch_encrypt(self, input_folder: str, output_folder: str, password: str,
                      pattern: str = "*.mp4", recursive: bool = False,
-                     pure_encrypt: bool = False) -> dict:
+                     pure_encrypt: bool = False, jobs: Optional[int] = None) -> dict:
         """
         批量加密
         
@@ -443,16 +466,41 @@ class ShellVideoPlayerMCP:
             if not os.path.exists(output_folder):
                 os.makedirs(output_folder)
             
+            # 并行任务数（未指定时使用配置文件中的值，0表示自动选择）
+            batch_config = self.processor.config_manager.get_batch_config()
+            jobs = batch_config["jobs"] if jobs is None else jobs
+            if not jobs:
+                jobs = BatchWorkerPool.auto_jobs(files, output_folder, self.processor.encryptor.kdf_params)
+            
             # 批量加密
             success_count = 0
             failed_count = 0
             results = []
             
-            for file_path in files:
+            if jobs > 1 and len(files) > 1:
+                tasks = [{
+                    "input_path": file_path,
+                    "output_path": os.path.join(output_folder,
+                                                os.path.splitext(os.path.basename(file_path))[0] + ".enc.mp4"),
+                    "password": password,
+                    "pure_encrypt": pure_encrypt
+                } for file_path in files]
+                # 工作池收集各文件的输出，不写入标准输出
+                pool = BatchWorkerPool(jobs, batch_config["executor"],
+                                       config_path=self.processor.config_manager.config_file,
+                                       algorithm="AES-CTR")
+                file_results = [result for _, result in pool.run(encrypt_batch_file, tasks)]
+            else:
+                file_results = None
+            
+            for index, file_path in enumerate(files):
                 filename = os.path.basename(file_path)
                 output_path = os.path.join(output_folder, os.path.splitext(filename)[0] + ".enc.mp4")
                 
-                result = self.encrypt_file(file_path, output_path, password, pure_encrypt=pure_encrypt)
+                if file_results is not None:
+                    result = file_results[index]
+                else:
+                    result = self.encrypt_file(file_path, output_path, password, pure_encrypt=pure_encrypt)
                 results.append({
                     "file": filename,
                     "success": result["success"],
@@ -470,6 +518,7 @@ class ShellVideoPlayerMCP:
                 "total_files": len(files),
                 "success_count": success_count,
                 "failed_count": failed_count,
+                "jobs": jobs,
                 "results": results
             }
         except Exception as e:
@@ -542,7 +591,8 @@ class ShellVideoPlayerMCP:
                 "total_files": len(files),
                 "success_count": success_count,
                 "failed_count": failed_count,
-                "results": results
+                "results": results,
+                "key_cache": get_key_cache().stats()
             }
         except Exception as e:
             return {
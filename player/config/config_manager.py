@@ -19,14 +19,31 @@ class ConfigManager:
         self.default_config = {
             "ffmpeg": {
                 "ffmpeg_path": "ffmpeg",
-                "ffprobe_path": "ffprobe"
+                "ffprobe_path": "ffprobe",
+                "ffplay_path": "ffplay",
+                "probe_cache_entries": 4096,
+                "probe_cache_path": "",
+                "pipe_remux": True,
+                "remux": "auto",
+                "notice_cache_mb": 64,
+                "notice_cache_path": ""
             },
             "encryption": {
                 "default_algorithm": "AES-CTR",
                 "key_derivation": "PBKDF2",
                 "salt_length": 16,
                 "key_size": 32,
-                "iterations": 100000
+                "iterations": 100000,
+                "scrypt_n": 16384,
+                "scrypt_r": 8,
+                "scrypt_p": 1,
+                "cipher_workers": 0,
+                "cipher_segment_size": 2097152,
+                "cipher_executor": "thread",
+                "key_cache_entries": 64,
+                "key_cache_ttl": 600,
+                "batch_jobs": 0,
+                "batch_executor": "thread"
             },
             "metadata": {
                 "whitelist": [
@@ -42,13 +59,18 @@ class ConfigManager:
             },
             "file_format": {
                 "magic": b"ENCV",
-                "version": 1,
+                "version": 2,
                 "reserved_size": 32
             },
             "player": {
                 "skip_notice_by_default": False,
                 "show_metadata_on_start": True,
-                "platform_adaptation": True
+                "platform_adaptation": True,
+                "stream_playback": True,
+                "prefetch_mb": 32,
+                "memory_buffer_mb": 512,
+                "payload_cache_mb": 0,
+                "payload_cache_storage": "memfd"
             }
         }
         self._config = None
@@ -141,11 +163,57 @@ class ConfigManager:
         config = self.load_config()
         return config.get("ffmpeg", {}).get("ffprobe_path", "ffprobe")
     
+    def get_ffplay_path(self) -> str:
+        """获取FFplay路径"""
+        config = self.load_config()
+        return config.get("ffmpeg", {}).get("ffplay_path", "ffplay")
+    
+    def get_probe_cache_config(self) -> Dict[str, Any]:
+        """获取ffprobe结果缓存配置（probe_cache_entries为0表示禁用，路径为空表示用户缓存目录）"""
+        ffmpeg_config = self.load_config().get("ffmpeg", {})
+        return {
+            "max_entries": ffmpeg_config.get("probe_cache_entries", 4096),
+            "path": ffmpeg_config.get("probe_cache_path", "")
+        }
+    
+    def get_notice_cache_config(self) -> Dict[str, Any]:
+        """获取提示视频缓存配置（notice_cache_mb为0表示禁用，路径为空表示用户缓存目录）"""
+        ffmpeg_config = self.load_config().get("ffmpeg", {})
+        return {
+            "max_mb": ffmpeg_config.get("notice_cache_mb", 64),
+            "path": ffmpeg_config.get("notice_cache_path", "")
+        }
+    
     def get_default_algorithm(self) -> str:
         """获取默认加密算法"""
         config = self.load_config()
         return config.get("encryption", {}).get("default_algorithm", "AES-CTR")
     
+    def get_cipher_engine_config(self) -> Dict[str, Any]:
+        """获取并行加密引擎配置（workers为0表示使用CPU核心数）"""
+        encryption_config = self.load_config().get("encryption", {})
+        return {
+            "workers": encryption_config.get("cipher_workers", 0),
+            "segment_size": encryption_config.get("cipher_segment_size", 2097152),
+            "executor": encryption_config.get("cipher_executor", "thread")
+        }
+    
+    def get_key_cache_config(self) -> Dict[str, Any]:
+        """获取派生密钥缓存配置（key_cache_entries为0表示禁用缓存）"""
+        encryption_config = self.load_config().get("encryption", {})
+        return {
+            "max_entries": encryption_config.get("key_cache_entries", 64),
+            "ttl": encryption_config.get("key_cache_ttl", 600)
+        }
+    
+    def get_batch_config(self) -> Dict[str, Any]:
+        """获取批量加密配置（jobs为0表示按CPU核心数、可用内存和磁盘空间自动选择）"""
+        encryption_config = self.load_config().get("encryption", {})
+        return {
+            "jobs": encryption_config.get("batch_jobs", 0),
+            "executor": encryption_config.get("batch_executor", "thread")
+        }
+    
     @staticmethod
     def _deep_merge(base: Dict, update: Dict) -> Dict:
         """深度合并两个字典"""
@@ -0,0 +1,271 @@
+# player/core/batch_pool.py
+import contextlib
+import io
+import os
+import shutil
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+from ..exceptions.custom_exceptions import VideoEncryptionError
+
+
+class _ThreadOutput:
+    """按线程分流的输出流：正在执行任务的工作线程写入各自的缓冲区，其他线程写入原输出流"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def capture(self, buffer: io.StringIO):
+        self._local.buffer = buffer
+        try:
+            yield
+        finally:
+            self._local.buffer = None
+
+    def _target(self):
+        return getattr(self._local, 'buffer', None) or self._stream
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextlib.contextmanager
+def _capture_output(buffer: io.StringIO):
+    """把当前任务的stdout/stderr写入buffer（线程池中只影响当前线程）"""
+    if isinstance(sys.stdout, _ThreadOutput) and isinstance(sys.stderr, _ThreadOutput):
+        with sys.stdout.capture(buffer), sys.stderr.capture(buffer):
+            yield
+    else:
+        with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+            yield
+
+
+# 工作者（线程或进程）自己的VideoProcessor：Encryptor.last_source等状态按文件记录，不能在工作者之间共享
+_worker_state = threading.local()
+
+
+def _worker_processor(settings: Dict[str, Any]):
+    """获取当前工作者的VideoProcessor（首次调用时创建，批量密钥模式下同时派生主密钥）"""
+    processor = getattr(_worker_state, 'processor', None)
+    if processor is None:
+        from .video_processor import VideoProcessor
+        processor = VideoProcessor(settings.get('config_path'))
+        algorithm = settings.get('algorithm')
+        if algorithm and algorithm != processor.encryptor.algorithm:
+            from .crypto_factory import CryptoAlgorithmFactory
+            processor.encryptor.crypto_algorithm = CryptoAlgorithmFactory().create_algorithm(algorithm)
+            processor.encryptor.algorithm = algorithm
+        if settings.get('batch_password') is not None:
+            processor.encryptor.begin_batch(settings['batch_password'])
+        _worker_state.processor = processor
+        registry = settings.get('registry')
+        if registry is not None:
+            registry.append(processor)
+    return processor
+
+
+def _init_process_worker(cipher_workers: int):
+    """进程池初始化：按任务数缩小每个进程的并行加密引擎，避免进程数×线程数超过CPU核心数"""
+    if cipher_workers:
+        from ..crypto.parallel_engine import configure_default_engine
+        configure_default_engine(workers=cipher_workers)
+
+
+def _run_task(func: Callable, settings: Dict[str, Any], task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    在工作者中执行一个任务并收集其输出
+
+    Args:
+        func: 任务函数 func(processor, task) -> 结果字典（进程池要求为模块级函数）
+        settings: 工作者设置（配置文件、加密算法、批量密钥模式的密码）
+        task: 任务参数
+
+    Returns:
+        结果字典（附加output：任务期间的全部输出；异常时success为False并附加error）
+    """
+    buffer = io.StringIO()
+    with _capture_output(buffer):
+        try:
+            result = func(_worker_processor(settings), task)
+        except Exception as e:
+            traceback.print_exc()
+            result = {'success': False, 'error': str(e)}
+    result['output'] = buffer.getvalue()
+    return result
+
+
+class BatchWorkerPool:
+    """
+    批量加密工作池
+
+    每个文件的加密大部分时间花在FFmpeg重封装和密钥派生上（子进程与hashlib都会释放GIL），
+    多个文件并行处理可以利用空闲的核心。每个工作者使用自己的VideoProcessor；
+    任务输出先写入各自的缓冲区，再按提交顺序整段打印，不同文件的输出不会交错。
+    """
+
+    EXECUTORS = ("thread", "process")
+
+    # 每个任务的内存估算：管道预读缓冲、FFmpeg重封装进程、提示段数据等（不含scrypt）
+    JOB_MEMORY = 160 * 1024 * 1024
+    # 每个任务在输出目录中最多同时占用的空间相对输入文件的倍数（输出文件 + 非管道重封装的临时MP4）
+    JOB_DISK_FACTOR = 2
+
+    def __init__(self, jobs: int = 1, executor: str = "thread", config_path: Optional[str] = None,
+                 algorithm: Optional[str] = None, batch_password: Optional[str] = None):
+        """
+        初始化工作池
+
+        Args:
+            jobs: 同时处理的文件数
+            executor: 执行器类型（thread或process）
+            config_path: 配置文件路径（各工作者据此创建VideoProcessor）
+            algorithm: 加密算法（None表示使用配置文件中的默认算法）
+            batch_password: 批量密钥模式的密码（每个工作者派生一次主密钥，None表示不使用）
+
+        Raises:
+            VideoEncryptionError: 参数无效
+        """
+        if executor not in self.EXECUTORS:
+            raise VideoEncryptionError(f"不支持的执行器类型: {executor}")
+        if jobs < 1:
+            raise VideoEncryptionError(f"并行任务数必须为正数: {jobs}")
+
+        self.jobs = jobs
+        self.executor = executor
+        self.settings = {
+            'config_path': config_path,
+            'algorithm': algorithm,
+            'batch_password': batch_password
+        }
+
+    @classmethod
+    def auto_jobs(cls, input_files: List[str], output_folder: str, kdf_params=None) -> int:
+        """
+        自动选择并行任务数：不超过CPU核心数、可用内存能容纳的任务数，
+        以及输出目录剩余空间能同时容纳的最大文件数
+
+        Args:
+            input_files: 待加密的文件
+            output_folder: 输出文件夹
+            kdf_params: 密钥派生参数（scrypt每次派生额外占用内存）
+
+        Returns:
+            并行任务数（至少为1）
+        """
+        jobs = min(os.cpu_count() or 1, max(1, len(input_files)))
+
+        job_memory = cls.JOB_MEMORY
+        if kdf_params is not None and kdf_params.kdf == kdf_params.SCRYPT:
+            job_memory += kdf_params.scrypt_memory()
+        available_memory = _available_memory()
+        if available_memory:
+            jobs = min(jobs, available_memory // job_memory)
+
+        try:
+            free_disk = shutil.disk_usage(output_folder).free
+        except OSError:
+            free_disk = None
+        if free_disk is not None:
+            sizes = sorted((os.path.getsize(path) for path in input_files if os.path.isfile(path)),
+                           reverse=True)
+            needed = 0
+            for count, size in enumerate(sizes[:jobs]):
+                needed += size * cls.JOB_DISK_FACTOR
+                if needed > free_disk:
+                    jobs = count
+                    break
+
+        return max(1, jobs)
+
+    def run(self, func: Callable, tasks: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        并行执行任务，按提交顺序逐个返回结果
+
+        Args:
+            func: 任务函数 func(processor, task) -> 结果字典（进程池要求为模块级函数）
+            tasks: 任务参数列表
+
+        Yields:
+            (任务参数, 结果字典)，结果中的output为任务期间的输出
+
+        Raises:
+            KeyboardInterrupt: 用户中断（尚未开始的任务被取消）
+        """
+        if self.executor == "process":
+            cpu_count = os.cpu_count() or 1
+            pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_process_worker,
+                                       initargs=(max(1, cpu_count // self.jobs),))
+            settings = self.settings
+            processors = None
+        else:
+            pool = ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="batch")
+            # 线程池结束后由当前线程清零各工作者的批量主密钥
+            processors = []
+            settings = dict(self.settings, registry=processors)
+
+        stdout, stderr = sys.stdout, sys.stderr
+        if processors is not None:
+            sys.stdout, sys.stderr = _ThreadOutput(stdout), _ThreadOutput(stderr)
+        completed = False
+        try:
+            futures = [pool.submit(_run_task, func, settings, task) for task in tasks]
+            for task, future in zip(tasks, futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 进程池中工作进程异常退出等无法在任务内捕获的错误
+                    result = {'success': False, 'error': str(e), 'output': ''}
+                yield task, result
+            completed = True
+        finally:
+            # 中断时取消尚未开始的任务，等待正在加密的文件完成后再清零主密钥
+            pool.shutdown(wait=True, cancel_futures=not completed)
+            sys.stdout, sys.stderr = stdout, stderr
+            for processor in processors or []:
+                processor.encryptor.end_batch()
+
+
+def _available_memory() -> Optional[int]:
+    """
+    获取可用物理内存
+
+    Returns:
+        字节数，无法获取时返回None
+    """
+    if sys.platform == 'win32':
+        import ctypes
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys
+        return None
+
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
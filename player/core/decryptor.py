@@ -1,8 +1,14 @@
 # player/core/decryptor.py
+import os
+import struct
 import tempfile
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, Iterable, Iterator, Tuple, BinaryIO
 from ..crypto.base_encryptor import BaseEncryptor
+from ..crypto.key_cache import get_key_cache
+from ..crypto.kdf import KDFParams
 from ..file.encrypted_video import EncryptedVideoFile
+from ..file.block_cache import DecryptedBlockCache
 from ..ffmpeg.ffmpeg_wrapper import FFmpegWrapper
 from ..exceptions.custom_exceptions import CryptoError, PasswordError, FileFormatError
 from ..utils.file_utils import FileUtils
@@ -52,6 +58,33 @@ class Decryptor:
         except Exception as e:
             raise FileFormatError(f"解析文件头失败: {e}")
 
+    def check_password(self, encrypted_file_path: str, password: str) -> bool:
+        """
+        只读取文件头，用密钥校验值检查密码是否正确
+
+        Args:
+            encrypted_file_path: 加密文件路径
+            password: 解密密码
+
+        Returns:
+            是否完成了校验（旧文件没有校验值时返回False，无法提前判断）
+
+        Raises:
+            PasswordError: 密码错误
+            FileFormatError: 文件格式错误
+        """
+        encrypted_file = EncryptedVideoFile(encrypted_file_path, lazy=True)
+        encryption_info = encrypted_file.header.get_encryption_info()
+        if not encryption_info.get('key_check'):
+            return False
+
+        algorithm = encryption_info.get('algorithm', self.algorithm)
+        try:
+            self._prepare_cipher(password, encryption_info)
+        except Exception as e:
+            raise self._decrypt_error(e, algorithm)
+        return True
+
     def decrypt_stream(self, encrypted_data: bytes, password: str,
                        encryption_info: Dict[str, Any]) -> bytes:
         """
@@ -72,80 +105,368 @@ class Decryptor:
         if not self.crypto_algorithm:
             raise CryptoError("解密算法未初始化")
 
+        algorithm = encryption_info.get('algorithm', self.algorithm)
         try:
-            # 从加密信息中获取算法、salt和iv/nonce
-            algorithm = encryption_info.get('algorithm', self.algorithm)
-            salt = encryption_info.get('salt')
-            iv_nonce = encryption_info.get('iv_nonce')
-
-            # 如果算法不匹配，重新初始化算法
-            if algorithm != self.algorithm:
-                from .crypto_factory import CryptoAlgorithmFactory
-                factory = CryptoAlgorithmFactory()
-                self.crypto_algorithm = factory.create_algorithm(algorithm)
-                self.algorithm = algorithm
-
-            # 生成密钥
-            key, _ = self.crypto_algorithm.generate_key(password, salt)
-
-            # 解密数据
-            if algorithm.startswith('AES'):
-                if iv_nonce is None or len(iv_nonce) == 0:
-                    raise CryptoError("解密失败：缺少IV参数", algorithm=algorithm)
-                decrypted_data = self.crypto_algorithm.decrypt(encrypted_data, key, iv=iv_nonce)
-            elif algorithm == 'ChaCha20':
-                if iv_nonce is None or len(iv_nonce) == 0:
-                    raise CryptoError("解密失败：缺少Nonce参数", algorithm=algorithm)
-                decrypted_data = self.crypto_algorithm.decrypt(encrypted_data, key, nonce=iv_nonce)
-            else:
-                raise CryptoError(f"不支持的算法: {algorithm}")
+            key, cipher_params = self._prepare_cipher(password, encryption_info)
+            return self.crypto_algorithm.decrypt(encrypted_data, key, **cipher_params)
+        except Exception as e:
+            raise self._decrypt_error(e, algorithm)
+
+    def decrypt_iter(self, chunks: Iterable[bytes], password: str,
+                     encryption_info: Dict[str, Any]) -> Iterator[bytes]:
+        """
+        流式解密视频流
 
-            return decrypted_data
+        Args:
+            chunks: 加密数据块迭代器
+            password: 解密密码
+            encryption_info: 加密信息（包含算法、salt、iv_nonce等）
+
+        Yields:
+            解密后的数据块
+
+        Raises:
+            PasswordError: 密码错误
+            CryptoError: 解密失败
+        """
+        if not self.crypto_algorithm:
+            raise CryptoError("解密算法未初始化")
 
+        algorithm = encryption_info.get('algorithm', self.algorithm)
+        try:
+            key, cipher_params = self._prepare_cipher(password, encryption_info)
+            yield from self.crypto_algorithm.decrypt_iter(chunks, key, **cipher_params)
         except Exception as e:
-            if "decrypt" in str(e).lower() or "password" in str(e).lower():
-                raise PasswordError("解密失败，密码可能错误", remaining_attempts=3)
+            raise self._decrypt_error(e, algorithm)
+
+    def decrypt_into(self, encrypted_file_path: str, password: str, dst: BinaryIO,
+                     chunk_size: Optional[int] = None) -> int:
+        """
+        把加密文件的视频流分块解密写入文件对象
+
+        Args:
+            encrypted_file_path: 加密文件路径
+            password: 解密密码
+            dst: 输出文件对象
+            chunk_size: 块大小（None表示使用算法建议的块大小）
+
+        Returns:
+            写入的字节数
+
+        Raises:
+            FileFormatError: 文件格式错误
+            PasswordError: 密码错误
+            CryptoError: 解密失败
+        """
+        if not self.crypto_algorithm:
+            raise CryptoError("解密算法未初始化")
+
+        encrypted_file = EncryptedVideoFile(encrypted_file_path, lazy=True)
+        if not encrypted_file.encrypted_size:
+            raise CryptoError("没有加密数据")
+
+        encryption_info = encrypted_file.header.get_encryption_info()
+        algorithm = encryption_info.get('algorithm', self.algorithm)
+        try:
+            key, cipher_params = self._prepare_cipher(password, encryption_info)
+            with open(encrypted_file_path, 'rb') as src:
+                src.seek(encrypted_file.encrypted_offset)
+                return self.crypto_algorithm.decrypt_file(
+                    src, dst, key, chunk_size,
+                    length=encrypted_file.encrypted_size, **cipher_params
+                )
+        except Exception as e:
+            raise self._decrypt_error(e, algorithm)
+
+    def decrypt_file(self, encrypted_file_path: str, output_path: str, password: str,
+                     chunk_size: Optional[int] = None) -> int:
+        """
+        流式解密视频流到指定文件
+
+        Args:
+            encrypted_file_path: 加密文件路径
+            output_path: 输出文件路径
+            password: 解密密码
+            chunk_size: 块大小（None表示使用算法建议的块大小）
+
+        Returns:
+            写入的字节数
+
+        Raises:
+            FileFormatError: 文件格式错误
+            PasswordError: 密码错误
+            CryptoError: 解密失败
+        """
+        try:
+            with open(output_path, 'wb') as f:
+                return self.decrypt_into(encrypted_file_path, password, f, chunk_size)
+        except Exception as e:
+            # 失败时不留下不完整的输出文件
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            if isinstance(e, (FileFormatError, PasswordError, CryptoError)):
+                raise e
             else:
-                raise CryptoError(f"解密失败: {e}", algorithm=algorithm)
+                raise CryptoError(f"解密到文件失败: {e}")
 
-    def decrypt_to_temp_file(self, encrypted_file_path: str, password: str) -> str:
+    def decrypt_range(self, encrypted_file_path: str, password: str,
+                      offset: int, length: int) -> bytes:
         """
-        解密视频流到临时文件
+        随机访问解密：只读取并解密视频流中的一段，不处理前面的数据
+
+        CTR模式按偏移计算计数器块，ChaCha20使用seek，CBC模式借用前一个密文块作为IV。
 
         Args:
             encrypted_file_path: 加密文件路径
             password: 解密密码
+            offset: 视频流（明文）中的起始偏移
+            length: 读取长度（超出末尾的部分被截断）
 
         Returns:
-            临时文件路径
+            解密后的数据
+
+        Raises:
+            FileFormatError: 文件格式错误
+            PasswordError: 密码错误
+            CryptoError: 解密失败或算法不支持随机访问
+        """
+        if not self.crypto_algorithm:
+            raise CryptoError("解密算法未初始化")
+        if offset < 0 or length < 0:
+            raise CryptoError(f"无效的解密范围: offset={offset}, length={length}")
+
+        encrypted_file = EncryptedVideoFile(encrypted_file_path, lazy=True)
+        encryption_info = encrypted_file.header.get_encryption_info()
+        algorithm = encryption_info.get('algorithm', self.algorithm)
+        try:
+            key, cipher_params = self._prepare_cipher(password, encryption_info)
+            return self.crypto_algorithm.decrypt_range(
+                encrypted_file.read_encrypted_range, key, offset, length,
+                encrypted_file.encrypted_size, **cipher_params
+            )
+        except Exception as e:
+            raise self._decrypt_error(e, algorithm)
+
+    def open_decrypted_blocks(self, encrypted_file_path: str, password: str,
+                              block_size: int = DecryptedBlockCache.DEFAULT_BLOCK_SIZE,
+                              max_blocks: int = DecryptedBlockCache.DEFAULT_MAX_BLOCKS) -> DecryptedBlockCache:
+        """
+        打开加密文件供按块随机读取（密钥只派生一次）
+
+        Args:
+            encrypted_file_path: 加密文件路径
+            password: 解密密码
+            block_size: 块大小
+            max_blocks: 最多缓存的块数
+
+        Returns:
+            解密块缓存
+
+        Raises:
+            FileFormatError: 文件格式错误
+            PasswordError: 密码错误
+            CryptoError: 算法不支持随机访问
+        """
+        if not self.crypto_algorithm:
+            raise CryptoError("解密算法未初始化")
+
+        encrypted_file = EncryptedVideoFile(encrypted_file_path, lazy=True)
+        encryption_info = encrypted_file.header.get_encryption_info()
+        algorithm = encryption_info.get('algorithm', self.algorithm)
+        try:
+            key, cipher_params = self._prepare_cipher(password, encryption_info)
+            return DecryptedBlockCache(encrypted_file, self.crypto_algorithm, key, cipher_params,
+                                       block_size, max_blocks)
+        except Exception as e:
+            raise self._decrypt_error(e, algorithm)
+
+    def iter_decrypted_file(self, encrypted_file_path: str, password: str,
+                            chunk_size: Optional[int] = None,
+                            cancel_event: Optional[threading.Event] = None) -> Iterator[bytes]:
+        """
+        分块迭代加密文件解密后的视频流（供管道播放等边解密边消费的场景）
+
+        Args:
+            encrypted_file_path: 加密文件路径
+            password: 解密密码
+            chunk_size: 块大小（None表示使用算法建议的块大小）
+            cancel_event: 取消事件（每解密一块检查一次，置位后抛出CryptoError）
+
+        Yields:
+            解密后的数据块
 
         Raises:
             FileFormatError: 文件格式错误
             PasswordError: 密码错误
             CryptoError: 解密失败
         """
+        if not self.crypto_algorithm:
+            raise CryptoError("解密算法未初始化")
+
+        encrypted_file = EncryptedVideoFile(encrypted_file_path, lazy=True)
+        if not encrypted_file.encrypted_size:
+            raise CryptoError("没有加密数据")
+
+        encryption_info = encrypted_file.header.get_encryption_info()
+        chunk_size = chunk_size or self.crypto_algorithm.preferred_chunk_size()
+        for chunk in self.decrypt_iter(encrypted_file.iter_encrypted_chunks(chunk_size),
+                                       password, encryption_info):
+            if cancel_event is not None and cancel_event.is_set():
+                raise CryptoError("解密已取消")
+            yield chunk
+
+    def is_pipe_playable(self, encrypted_file_path: str, password: str) -> bool:
+        """
+        判断解密后的视频流能否通过管道顺序播放
+
+        MP4的moov在mdat之后时播放器必须先seek到文件末尾，无法从管道播放；
+        这里用随机访问解密只读取顶层box头部判断moov的位置，非MP4格式视为可以。
+
+        Args:
+            encrypted_file_path: 加密文件路径
+            password: 解密密码
+
+        Returns:
+            是否可以管道播放（算法不支持随机访问时返回False）
+
+        Raises:
+            PasswordError: 密码错误
+        """
         try:
-            # 加载加密文件
-            encrypted_file = EncryptedVideoFile(encrypted_file_path)
+            total = EncryptedVideoFile(encrypted_file_path, lazy=True).encrypted_size
+            offset = 0
+            while offset + 8 <= total:
+                box_header = self.decrypt_range(encrypted_file_path, password, offset, 16)
+                size, box_type = struct.unpack('>I4s', box_header[:8])
+                if offset == 0 and box_type != b'ftyp':
+                    return True
+                if box_type == b'moov':
+                    return True
+                if box_type == b'mdat':
+                    return False
+                if size == 1 and len(box_header) >= 16:
+                    size = struct.unpack('>Q', box_header[8:16])[0]
+                if size < 8:
+                    return False
+                offset += size
+            return False
+        except PasswordError:
+            raise
+        except (CryptoError, FileFormatError, struct.error):
+            return False
+
+    def _prepare_cipher(self, password: str, encryption_info: Dict[str, Any]) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        根据加密信息切换算法并派生密钥
+
+        Args:
+            password: 解密密码
+            encryption_info: 加密信息
+
+        Returns:
+            (密钥, 算法参数字典)
+        """
+        # 从加密信息中获取算法、salt和iv/nonce
+        algorithm = encryption_info.get('algorithm', self.algorithm)
+        salt = encryption_info.get('salt')
+        iv_nonce = encryption_info.get('iv_nonce')
+
+        # 如果算法不匹配，重新初始化算法
+        if algorithm != self.algorithm:
+            from .crypto_factory import CryptoAlgorithmFactory
+            factory = CryptoAlgorithmFactory()
+            self.crypto_algorithm = factory.create_algorithm(algorithm)
+            self.algorithm = algorithm
+
+        # 按文件中记录的参数生成密钥（旧文件使用默认参数；同一密码和salt重复出现时直接使用进程内缓存）
+        kdf_params = encryption_info.get('kdf_params') or KDFParams()
+        key = get_key_cache().get_or_derive(
+            password, salt, kdf_params.kdf, kdf_params.cost,
+            lambda: self.crypto_algorithm.generate_key(password, salt, kdf_params=kdf_params)[0]
+        )
+
+        # 批量密钥层级：上面得到的是整批文件共用的主密钥，再用HKDF派生文件密钥
+        file_salt = encryption_info.get('file_salt')
+        if file_salt:
+            key = self.crypto_algorithm.derive_file_key(key, file_salt)
+
+        # 有密钥校验值时在读取任何加密数据之前识别错误密码（旧文件没有校验值则跳过）
+        key_check = encryption_info.get('key_check')
+        if key_check and not self.crypto_algorithm.verify_key_check(key, key_check):
+            raise PasswordError("密码错误", remaining_attempts=3)
 
-            # 获取加密信息
-            encryption_info = encrypted_file.header.get_encryption_info()
+        if algorithm.startswith('AES'):
+            if iv_nonce is None or len(iv_nonce) == 0:
+                raise CryptoError("解密失败：缺少IV参数", algorithm=algorithm)
+            return key, {'iv': iv_nonce}
+        elif algorithm == 'ChaCha20':
+            if iv_nonce is None or len(iv_nonce) == 0:
+                raise CryptoError("解密失败：缺少Nonce参数", algorithm=algorithm)
+            return key, {'nonce': iv_nonce}
+        else:
+            raise CryptoError(f"不支持的算法: {algorithm}")
 
-            # 解密视频流
-            encrypted_data = encrypted_file.extract_encrypted_section()
-            if not encrypted_data:
-                raise CryptoError("没有加密数据")
+    @staticmethod
+    def _decrypt_error(e: Exception, algorithm: str) -> Exception:
+        """把解密过程中的异常转换为对外的异常类型"""
+        if isinstance(e, PasswordError):
+            return e
+        if "decrypt" in str(e).lower() or "password" in str(e).lower():
+            return PasswordError("解密失败，密码可能错误", remaining_attempts=3)
+        else:
+            return CryptoError(f"解密失败: {e}", algorithm=algorithm)
 
-            decrypted_data = self.decrypt_stream(encrypted_data, password, encryption_info)
+    def decrypt_to_temp_file(self, encrypted_file_path: str, password: str,
+                             memory_limit: int = 0,
+                             cancel_event: Optional[threading.Event] = None) -> str:
+        """
+        解密视频流到临时文件
+
+        视频流不超过memory_limit时在Linux上写入内存文件（memfd或/dev/shm），
+        明文不落盘；超过上限或平台不支持时写入磁盘临时文件。
+        用完后调用FileUtils.remove_temp_file释放。
+
+        Args:
+            encrypted_file_path: 加密文件路径
+            password: 解密密码
+            memory_limit: 使用内存文件的最大视频流大小（0表示总是写入磁盘）
+            cancel_event: 取消事件（每解密一块检查一次，置位后删除临时文件并抛出CryptoError）
+
+        Returns:
+            临时文件路径
+
+        Raises:
+            FileFormatError: 文件格式错误
+            PasswordError: 密码错误
+            CryptoError: 解密失败
+        """
+        temp_path = None
+        try:
+            memory_file = None
+            if memory_limit > 0:
+                encrypted_size = EncryptedVideoFile(encrypted_file_path, lazy=True).encrypted_size
+                if encrypted_size <= memory_limit:
+                    memory_file = FileUtils.create_memory_file()
+
+            if memory_file is not None:
+                temp_file, temp_path = memory_file
+            else:
+                temp_file = tempfile.NamedTemporaryFile(suffix='.mp4', delete=False)
+                temp_path = temp_file.name
 
-            # 将解密后的数据写入临时文件
-            temp_file = tempfile.NamedTemporaryFile(suffix='.mp4', delete=False)
-            temp_file.write(decrypted_data)
-            temp_file.close()
+            # 分块解密视频流并直接写入临时文件
+            with temp_file:
+                if cancel_event is None:
+                    self.decrypt_into(encrypted_file_path, password, temp_file)
+                else:
+                    for chunk in self.iter_decrypted_file(encrypted_file_path, password,
+                                                          cancel_event=cancel_event):
+                        temp_file.write(chunk)
 
-            return temp_file.name
+            return temp_path
 
         except Exception as e:
+            FileUtils.remove_temp_file(temp_path)
             if isinstance(e, (FileFormatError, PasswordError, CryptoError)):
                 raise e
             else:
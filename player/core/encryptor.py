@@ -1,8 +1,12 @@
 # player/core/encryptor.py
 import os
-from typing import Optional
+import hashlib
+import hmac
+import secrets
+from typing import Optional, Iterable, Iterator, Tuple
 from ..crypto.base_encryptor import BaseEncryptor
-from ..ffmpeg.ffmpeg_wrapper import FFmpegWrapper
+from ..crypto.kdf import KDFParams, load_configured_kdf_params
+from ..ffmpeg.toolchain import get_ffmpeg_wrapper
 from ..file.encrypted_video import EncryptedVideoFile
 from ..file.file_header import FileHeader
 from ..exceptions.custom_exceptions import CryptoError, FFmpegError
@@ -12,16 +16,33 @@ from ..utils.file_utils import FileUtils
 class Encryptor:
     """加密器"""
 
-    def __init__(self, algorithm: str = "AES-CTR"):
+    # 明文来源：原文件直接加密 / FFmpeg重封装后加密 / 非视频文件直接加密
+    SOURCE_PASSTHROUGH = "passthrough"
+    SOURCE_REMUX = "remux"
+    SOURCE_RAW = "raw"
+
+    def __init__(self, algorithm: str = "AES-CTR", kdf_params: Optional[KDFParams] = None,
+                 pipe_remux: bool = True, remux: str = "auto"):
         """
         初始化加密器
 
         Args:
             algorithm: 加密算法名称
+            kdf_params: 密钥派生参数（默认读取配置文件）
+            pipe_remux: 视频重封装是否通过管道直接送入加密（否则先写入临时MP4）
+            remux: 重封装策略（auto表示兼容的MP4直接加密原文件，always表示总是重封装）
         """
         self.algorithm = algorithm
+        self.kdf_params = kdf_params or load_configured_kdf_params()
+        self.pipe_remux = pipe_remux
+        self.remux = remux
+        # 最近一次加密的明文来源 (来源, 原因)
+        self.last_source: Optional[Tuple[str, str]] = None
+        # 最近一次读取的提示段 (来源文件状态, 注入元数据后的数据)
+        self._notice_memo: Optional[Tuple[tuple, bytes]] = None
         self.crypto_algorithm: Optional[BaseEncryptor] = None
-        self.ffmpeg_wrapper = FFmpegWrapper()
+        self.ffmpeg_wrapper = get_ffmpeg_wrapper()
+        self._batch = None
         self._init_crypto_algorithm()
 
     def _init_crypto_algorithm(self):
@@ -48,19 +69,107 @@ class Encryptor:
             raise CryptoError("加密算法未初始化")
 
         # 生成密钥
-        key, salt = self.crypto_algorithm.generate_key(password)
+        key, encryption_info = self._derive_encryption_key(password)
 
         # 加密数据
         encrypted_data, params = self.crypto_algorithm.encrypt(stream_data, key)
 
         # 准备加密信息
+        encryption_info['iv_nonce'] = params.get('iv') or params.get('nonce')
+
+        return encrypted_data, encryption_info
+
+    def encrypt_iter(self, chunks: Iterable[bytes], password: str) -> Tuple[Iterator[bytes], dict]:
+        """
+        流式加密视频流
+
+        Args:
+            chunks: 明文数据块迭代器
+            password: 加密密码
+
+        Returns:
+            (加密数据块迭代器, 加密信息字典)
+
+        Raises:
+            CryptoError: 加密失败
+        """
+        if not self.crypto_algorithm:
+            raise CryptoError("加密算法未初始化")
+
+        # 生成密钥（加密信息在开始迭代前即可确定）
+        key, encryption_info = self._derive_encryption_key(password)
+        encrypted_chunks, params = self.crypto_algorithm.encrypt_iter(chunks, key)
+
+        encryption_info['iv_nonce'] = params.get('iv') or params.get('nonce')
+
+        return encrypted_chunks, encryption_info
+
+    def begin_batch(self, password: str):
+        """
+        开始批量加密：只用密码和批量salt运行一次密钥派生得到主密钥，
+        之后每个文件用HKDF和各自的随机salt派生文件密钥
+
+        Args:
+            password: 加密密码
+
+        Raises:
+            CryptoError: 密钥派生失败
+        """
+        if not self.crypto_algorithm:
+            raise CryptoError("加密算法未初始化")
+
+        self.end_batch()
+        master_key, batch_salt = self.crypto_algorithm.generate_key(password, kdf_params=self.kdf_params)
+        # 只保存用随机密钥计算的HMAC摘要，用于判断之后传入的密码是否与批量密码一致
+        secret = secrets.token_bytes(32)
+        self._batch = {
+            'secret': secret,
+            'password_digest': self._password_digest(secret, password),
+            'master_key': bytearray(master_key),
+            'salt': batch_salt
+        }
+
+    @staticmethod
+    def _password_digest(secret: bytes, password: str) -> bytes:
+        return hmac.new(secret, password.encode('utf-8'), hashlib.sha256).digest()
+
+    def end_batch(self):
+        """结束批量加密并清零主密钥"""
+        if self._batch:
+            master_key = self._batch['master_key']
+            master_key[:] = b'\x00' * len(master_key)
+            self._batch = None
+
+    def _derive_encryption_key(self, password: str) -> Tuple[bytes, dict]:
+        """
+        派生单个文件的加密密钥
+
+        Args:
+            password: 加密密码
+
+        Returns:
+            (密钥, 不含iv_nonce的加密信息字典)
+        """
+        file_salt = None
+        if self._batch and hmac.compare_digest(
+                self._batch['password_digest'], self._password_digest(self._batch['secret'], password)):
+            # 批量模式：文件密钥 = HKDF(主密钥, 文件salt)
+            file_salt = os.urandom(16)
+            key = self.crypto_algorithm.derive_file_key(self._batch['master_key'], file_salt)
+            salt = self._batch['salt']
+        else:
+            key, salt = self.crypto_algorithm.generate_key(password, kdf_params=self.kdf_params)
+
         encryption_info = {
             'algorithm': self.algorithm,
             'salt': salt,
-            'iv_nonce': params.get('iv') or params.get('nonce')
+            'kdf_params': self.kdf_params,
+            'key_check': self.crypto_algorithm.compute_key_check(key)
         }
+        if file_salt:
+            encryption_info['file_salt'] = file_salt
 
-        return encrypted_data, encryption_info
+        return key, encryption_info
 
     def _is_video_file(self, file_path: str) -> bool:
         """
@@ -76,6 +185,44 @@ class Encryptor:
         ext = os.path.splitext(file_path)[1].lower()
         return ext in video_extensions
     
+    def choose_source(self, plain_video_path: str) -> Tuple[str, str]:
+        """
+        决定明文来源：已是兼容MP4的视频直接加密原文件，否则用FFmpeg重封装
+
+        兼容指：MP4（非QuickTime）、moov位于mdat之前（解密后可以管道播放）、非分片、
+        最多一条视频和一条音频轨道且编码可识别（与重封装默认选择的流一致）。
+
+        Args:
+            plain_video_path: 原始文件路径
+
+        Returns:
+            (来源, 原因)
+        """
+        if not self._is_video_file(plain_video_path):
+            return self.SOURCE_RAW, "非视频文件"
+        if self.remux == "always":
+            return self.SOURCE_REMUX, "配置要求总是重封装"
+
+        from ..utils.video_utils import MP4BoxReader
+        reader = MP4BoxReader(plain_video_path)
+        layout = reader.read_layout()
+        if layout is None or not layout['major_brand']:
+            return self.SOURCE_REMUX, "不是MP4文件"
+        if layout['major_brand'] == 'qt  ':
+            return self.SOURCE_REMUX, "QuickTime MOV"
+        if not layout['moov_before_mdat']:
+            return self.SOURCE_REMUX, "moov位于文件末尾"
+        if layout['fragmented']:
+            return self.SOURCE_REMUX, "分片MP4"
+
+        parsed = reader.read_tracks(layout['moov'])
+        if parsed is None:
+            return self.SOURCE_REMUX, "包含无法识别的轨道或编码"
+        handlers = [track['handler'] for track in parsed[1]]
+        if handlers.count('vide') > 1 or handlers.count('soun') > 1:
+            return self.SOURCE_REMUX, "包含多条视频或音频轨道"
+        return self.SOURCE_PASSTHROUGH, "已是兼容的MP4"
+
     def generate_encrypted_file(self, plain_video_path: str, notice_video_path: Optional[str],
                                 password: str, output_path: str,
                                 metadata_config: Optional[str] = None) -> bool:
@@ -97,59 +244,50 @@ class Encryptor:
             FFmpegError: FFmpeg处理失败
         """
         temp_stream_path = None
-        temp_notice_path = None
         notice_data = b''  # 默认空提示段
         try:
-            # 0. 如果提供了元数据配置且提供了提示视频，先注入到提示视频
-            if metadata_config and os.path.exists(metadata_config) and notice_video_path:
-                from ..metadata.metadata_handler import MetadataHandler
-                metadata_handler = MetadataHandler()
-                metadata = metadata_handler.parse_config_file(metadata_config)
-                
-                if metadata:
-                    # 创建临时文件存储带元数据的提示视频
-                    import tempfile
-                    temp_notice_path = tempfile.mktemp(suffix='.mp4')
-                    metadata_handler.inject_metadata(notice_video_path, metadata, temp_notice_path)
-                    notice_video_path = temp_notice_path
-
-            # 1. 读取文件数据（视频文件使用FFmpeg提取，其他文件直接读取）
+            # 0. 读取提示视频（如果提供了元数据配置，在内存中注入元数据）
+            if notice_video_path and os.path.exists(notice_video_path):
+                notice_data = self._load_notice_data(notice_video_path, metadata_config)
+
+            # 1. 确定明文来源（视频文件使用FFmpeg提取，其他文件直接读取）
             import tempfile
             
-            if self._is_video_file(plain_video_path):
-                # 视频文件：提取视频流
+            chunk_size = self.crypto_algorithm.preferred_chunk_size()
+            self.last_source = self.choose_source(plain_video_path)
+            source = self.last_source[0]
+            if source != self.SOURCE_REMUX:
+                # 非视频文件或已兼容的MP4：直接读取原文件
+                source_chunks = FileUtils.read_file_chunks(plain_video_path, chunk_size)
+            elif self.pipe_remux:
+                # 视频文件：FFmpeg重封装输出到管道，边提取边加密边写入
+                source_chunks = self.ffmpeg_wrapper.iter_video_stream(plain_video_path, chunk_size)
+            else:
+                # 视频文件：提取视频流到临时文件
                 temp_stream_path = tempfile.mktemp(suffix='.mp4')
                 self.ffmpeg_wrapper.extract_video_stream(plain_video_path, temp_stream_path)
-                
-                with open(temp_stream_path, 'rb') as f:
-                    stream_data = f.read()
-            else:
-                # 非视频文件：直接读取
-                with open(plain_video_path, 'rb') as f:
-                    stream_data = f.read()
+                source_chunks = FileUtils.read_file_chunks(temp_stream_path, chunk_size)
 
-            # 3. 加密视频流
-            encrypted_data, encryption_info = self.encrypt_stream(stream_data, password)
-
-            # 4. 读取提示视频数据（如果提供了提示视频）
-            if notice_video_path and os.path.exists(notice_video_path):
-                with open(notice_video_path, 'rb') as f:
-                    notice_data = f.read()
+            # 3. 流式加密视频流（分块读取，不把整个文件载入内存）
+            encrypted_chunks, encryption_info = self.encrypt_iter(source_chunks, password)
 
             # 5. 创建文件头并设置加密信息
             from ..file.file_header import FileHeader
-            header = FileHeader()
+            header = FileHeader(version=FileHeader.CURRENT_VERSION)
             header.set_encryption_info(
                 algorithm=encryption_info['algorithm'],
                 salt=encryption_info['salt'],
-                iv_nonce=encryption_info['iv_nonce']
+                iv_nonce=encryption_info['iv_nonce'],
+                key_check=encryption_info.get('key_check'),
+                file_salt=encryption_info.get('file_salt'),
+                kdf_params=encryption_info.get('kdf_params')
             )
 
             # 6. 创建加密视频文件
             from ..file.encrypted_video import EncryptedVideoFile
             encrypted_file = EncryptedVideoFile()
-            encrypted_file.create_from_parts(notice_data, encrypted_data, header)
-            encrypted_file.save_file(output_path)
+            encrypted_file.create_from_parts(notice_data, None, header)
+            encrypted_file.save_file_stream(output_path, encrypted_chunks)
 
             # 注意：暂时禁用FFmpeg元数据注入，因为它会破坏我们的自定义文件格式
             # 元数据已存储在metadata.txt中，可以在播放时读取
@@ -171,5 +309,37 @@ class Encryptor:
             # 8. 清理临时文件
             if temp_stream_path and os.path.exists(temp_stream_path):
                 os.remove(temp_stream_path)
-            if temp_notice_path and os.path.exists(temp_notice_path):
-                os.remove(temp_notice_path)
+
+    def _load_notice_data(self, notice_video_path: str, metadata_config: Optional[str]) -> bytes:
+        """
+        读取提示视频并注入元数据
+
+        批量加密时提示视频和元数据配置通常不变，结果按两个文件的路径、大小和修改时间复用。
+
+        Args:
+            notice_video_path: 提示视频路径
+            metadata_config: 元数据配置文件路径（可选）
+
+        Returns:
+            提示段数据
+        """
+        sources = [notice_video_path]
+        if metadata_config and os.path.exists(metadata_config):
+            sources.append(metadata_config)
+        cache_key = tuple((os.path.abspath(path), os.stat(path).st_size, os.stat(path).st_mtime_ns)
+                          for path in sources)
+        if self._notice_memo and self._notice_memo[0] == cache_key:
+            return self._notice_memo[1]
+
+        with open(notice_video_path, 'rb') as f:
+            notice_data = f.read()
+
+        if len(sources) > 1:
+            from ..metadata.metadata_handler import MetadataHandler
+            metadata_handler = MetadataHandler()
+            metadata = metadata_handler.parse_config_file(metadata_config)
+            if metadata:
+                notice_data = metadata_handler.inject_metadata_bytes(notice_data, metadata)
+
+        self._notice_memo = (cache_key, notice_data)
+        return notice_data
@@ -2,6 +2,8 @@
 import os
 import hashlib
 from typing import Tuple, Optional
+from ..crypto.key_cache import get_key_cache
+from ..crypto.kdf import KDFParams
 from ..exceptions.custom_exceptions import PasswordError
 
 
@@ -43,12 +45,11 @@ class KeyManager:
         
         try:
             if algorithm == "PBKDF2":
-                key = hashlib.pbkdf2_hmac(
-                    'sha256',
-                    password.encode('utf-8'),
-                    salt,
-                    iterations,
-                    dklen=32
+                # 同一密码和salt重复出现时直接使用进程内缓存（缓存键与Decryptor一致）
+                kdf_params = KDFParams(KDFParams.PBKDF2, iterations=iterations)
+                key = get_key_cache().get_or_derive(
+                    password, salt, kdf_params.kdf, kdf_params.cost,
+                    lambda: kdf_params.derive(password, salt)
                 )
             else:
                 raise PasswordError(f"不支持的密钥派生算法: {algorithm}")
@@ -0,0 +1,299 @@
+# player/core/payload_cache.py
+import atexit
+import hashlib
+import hmac
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, Optional, Tuple
+from ..exceptions.custom_exceptions import VideoEncryptionError
+from ..utils.file_utils import FileUtils
+
+
+class CachedPayload:
+    """缓存中的一份解密后视频流（内存文件或内存中的bytearray）"""
+
+    def __init__(self, size: int, password_digest: bytes, pipe_playable: bool,
+                 path: Optional[str] = None, data: Optional[bytearray] = None):
+        self.size = size
+        self.password_digest = password_digest
+        self.pipe_playable = pipe_playable
+        self.path = path
+        self.data = data
+
+    def iter_chunks(self, chunk_size: int = 4 * 1024 * 1024) -> Iterator[bytes]:
+        """分块迭代视频流"""
+        if self.data is not None:
+            view = memoryview(self.data)
+            for start in range(0, self.size, chunk_size):
+                yield bytes(view[start:start + chunk_size])
+        else:
+            yield from FileUtils.read_file_chunks(self.path, chunk_size)
+
+    def release(self):
+        """释放内存文件或清零数据"""
+        if self.data is not None:
+            self.data[:] = b'\x00' * len(self.data)
+            self.data = None
+        if self.path is not None:
+            FileUtils.remove_temp_file(self.path)
+            self.path = None
+
+
+class PayloadWriter:
+    """边播放边写入缓存的写入器，播放完整结束后commit，否则abort"""
+
+    def __init__(self, cache: 'DecryptedPayloadCache', key: Tuple, password_digest: bytes,
+                 pipe_playable: bool, limit: int):
+        self.cache = cache
+        self.key = key
+        self.password_digest = password_digest
+        self.pipe_playable = pipe_playable
+        self.limit = limit
+        self.size = 0
+        self.complete = False
+        self._file = None
+        self._path = None
+        self._data = None
+
+        memory_file = FileUtils.create_memory_file() if cache.storage == "memfd" else None
+        if memory_file is not None:
+            self._file, self._path = memory_file
+        else:
+            self._data = bytearray()
+
+    def tee(self, chunks) -> Iterator[bytes]:
+        """
+        透传数据块并同时写入缓存
+
+        Args:
+            chunks: 数据块迭代器
+
+        Yields:
+            原样的数据块
+        """
+        for chunk in chunks:
+            if self.size + len(chunk) > self.limit:
+                self._discard()
+            elif self._file is not None:
+                self._file.write(chunk)
+            elif self._data is not None:
+                self._data += chunk
+            self.size += len(chunk)
+            yield chunk
+        self.complete = True
+
+    def commit(self) -> bool:
+        """数据完整时加入缓存，否则丢弃"""
+        if not self.complete or (self._file is None and self._data is None):
+            self.abort()
+            return False
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        entry = CachedPayload(self.size, self.password_digest, self.pipe_playable,
+                              path=self._path, data=self._data)
+        self._path = self._data = None
+        return self.cache.insert(self.key, entry)
+
+    def abort(self):
+        """丢弃已写入的数据"""
+        self._discard()
+
+    def _discard(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        FileUtils.remove_temp_file(self._path)
+        self._path = None
+        if self._data is not None:
+            self._data[:] = b'\x00' * len(self._data)
+            self._data = None
+
+
+class DecryptedPayloadCache:
+    """
+    解密后视频流的进程内缓存（LRU + 字节预算）
+
+    以 (文件路径, 大小, 修改时间, 文件头IV) 为键，同一文件反复播放时跳过密钥派生和解密。
+    数据只保存在内存文件（memfd，不支持时为/dev/shm）或进程内存中，不写入持久存储；
+    命中还要求密码一致（比较用进程内随机密钥计算的HMAC摘要），进程退出时清空。
+    """
+
+    STORAGES = ("memfd", "ram")
+
+    def __init__(self, budget: int = 0, storage: str = "memfd"):
+        """
+        初始化缓存
+
+        Args:
+            budget: 缓存的总字节数上限（0表示禁用）
+            storage: 存储方式（memfd或ram）
+
+        Raises:
+            VideoEncryptionError: 存储方式无效
+        """
+        if storage not in self.STORAGES:
+            raise VideoEncryptionError(f"不支持的缓存存储方式: {storage}")
+
+        self.budget = max(0, budget)
+        self.storage = storage
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple, CachedPayload]' = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+        self._secret = os.urandom(32)
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget > 0
+
+    @staticmethod
+    def make_key(encrypted_path: str, iv_nonce: bytes) -> Tuple:
+        """生成缓存键（文件被替换或修改后自动失效）"""
+        stat = os.stat(encrypted_path)
+        return (os.path.abspath(encrypted_path), stat.st_size, stat.st_mtime_ns, bytes(iv_nonce or b''))
+
+    def _digest(self, password: str) -> bytes:
+        return hmac.new(self._secret, password.encode('utf-8'), hashlib.sha256).digest()
+
+    def lookup(self, key: Tuple, password: str) -> Optional[CachedPayload]:
+        """
+        查找缓存的视频流
+
+        Args:
+            key: 缓存键
+            password: 解密密码（与缓存时的密码不同视为未命中）
+
+        Returns:
+            缓存条目，未命中返回None
+        """
+        if not self.enabled:
+            return None
+
+        digest = self._digest(password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not hmac.compare_digest(entry.password_digest, digest):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def begin(self, key: Tuple, password: str, expected_size: int,
+              pipe_playable: bool) -> Optional[PayloadWriter]:
+        """
+        开始边播放边缓存
+
+        Args:
+            key: 缓存键
+            password: 解密密码
+            expected_size: 预计的视频流大小
+            pipe_playable: 能否通过管道播放
+
+        Returns:
+            写入器，缓存禁用或超出预算时返回None
+        """
+        if not self.enabled or expected_size > self.budget:
+            return None
+        return PayloadWriter(self, key, self._digest(password), pipe_playable, self.budget)
+
+    def adopt(self, key: Tuple, password: str, path: str, pipe_playable: bool) -> bool:
+        """
+        把已解密到内存文件的视频流直接加入缓存（接管其生命周期）
+
+        Args:
+            key: 缓存键
+            password: 解密密码
+            path: 内存文件路径
+            pipe_playable: 能否通过管道播放
+
+        Returns:
+            是否已接管（未接管时调用方负责释放）
+        """
+        if not self.enabled or self.storage != "memfd" or not FileUtils.is_memory_file(path):
+            return False
+        size = os.path.getsize(path)
+        if size > self.budget:
+            return False
+        return self.insert(key, CachedPayload(size, self._digest(password), pipe_playable, path=path))
+
+    def insert(self, key: Tuple, entry: CachedPayload) -> bool:
+        """加入条目并按LRU淘汰超出预算的旧条目"""
+        evicted = []
+        with self._lock:
+            # 同一路径的旧条目（包括文件已被修改的）一并移除
+            for old_key in [k for k in self._entries if k[0] == key[0]]:
+                old = self._entries.pop(old_key)
+                self._used -= old.size
+                evicted.append(old)
+            self._entries[key] = entry
+            self._used += entry.size
+            while self._used > self.budget and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._used -= old.size
+                evicted.append(old)
+        for old in evicted:
+            old.release()
+        return True
+
+    def wipe(self):
+        """释放所有缓存的视频流"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._used = 0
+        for entry in entries:
+            entry.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            统计信息字典（命中、未命中、条目数、占用字节、命中率）
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._used,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+_payload_cache: Optional[DecryptedPayloadCache] = None
+_payload_cache_lock = threading.Lock()
+
+
+def get_payload_cache(config: Optional[Dict[str, Any]] = None) -> DecryptedPayloadCache:
+    """
+    获取进程内共享的解密视频流缓存（首次调用时按配置创建）
+
+    Args:
+        config: 播放器配置（player段），None表示使用默认值（禁用）
+
+    Returns:
+        缓存实例
+    """
+    global _payload_cache
+    with _payload_cache_lock:
+        if _payload_cache is None:
+            config = config or {}
+            _payload_cache = DecryptedPayloadCache(
+                budget=config.get("payload_cache_mb", 0) * 1024 * 1024,
+                storage=config.get("payload_cache_storage", "memfd")
+            )
+        return _payload_cache
+
+
+@atexit.register
+def _wipe_payload_cache():
+    """进程退出时释放缓存的明文"""
+    if _payload_cache is not None:
+        _payload_cache.wipe()
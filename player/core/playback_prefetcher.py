@@ -0,0 +1,267 @@
+# player/core/playback_prefetcher.py
+import os
+import threading
+import time
+from typing import Optional, Iterator, List, Dict, Any
+from .decryptor import Decryptor
+from ..utils.file_utils import FileUtils
+
+
+class PlaybackPrefetcher:
+    """
+    后台准备加密文件的播放数据
+
+    在后台线程中完成密钥派生和密码校验，并预先解密视频流开头的一部分；
+    播放时先输出已解密的数据，再在播放线程中继续解密剩余部分。
+    无法管道播放的文件（moov在末尾）则在后台整体解密到临时文件。
+    提示段播放期间运行，可以把这些耗时隐藏在提示段后面。
+    """
+
+    DEFAULT_PREFETCH_SIZE = 32 * 1024 * 1024
+
+    def __init__(self, encrypted_path: str, password: str, algorithm: str = "AES-CTR",
+                 prefetch_size: int = DEFAULT_PREFETCH_SIZE, stream_playback: bool = True,
+                 memory_limit: int = 0):
+        """
+        初始化预取器
+
+        Args:
+            encrypted_path: 加密文件路径
+            password: 解密密码
+            algorithm: 默认解密算法（文件头中记录的算法优先）
+            prefetch_size: 预先解密的数据量（字节）
+            stream_playback: 是否允许管道播放
+            memory_limit: 解密到临时文件时使用内存文件的大小上限（0表示写入磁盘）
+        """
+        self.encrypted_path = encrypted_path
+        self.password = password
+        self.prefetch_size = prefetch_size
+        self.stream_playback = stream_playback
+        self.memory_limit = memory_limit
+
+        # 使用独立的解密器，后台线程不与调用方共享算法实例
+        self.decryptor = Decryptor(algorithm)
+
+        self.pipe_playable: Optional[bool] = None
+        self.temp_path: Optional[str] = None
+        self.prefetched_size = 0
+        self.prepare_time: Optional[float] = None
+
+        self._buffer: List[bytes] = []
+        self._chunks: Optional[Iterator[bytes]] = None
+        self._error: Optional[Exception] = None
+        self._cancelled = threading.Event()
+        self._password_checked = threading.Event()
+        # 后台线程结束与cleanup之间的交接：由最后离开的一方释放缓冲区和临时文件
+        self._lock = threading.Lock()
+        self._finished = False
+        self._discarded = False
+        self._thread = threading.Thread(target=self._run, name="playback-prefetch", daemon=True)
+
+    def start(self) -> 'PlaybackPrefetcher':
+        """启动后台准备"""
+        self._thread.start()
+        return self
+
+    def _run(self):
+        """后台线程：校验密码、判断播放方式、预解密"""
+        start = time.perf_counter()
+        try:
+            self.decryptor.check_password(self.encrypted_path, self.password)
+            self._password_checked.set()
+            self.pipe_playable = (self.stream_playback and
+                                  self.decryptor.is_pipe_playable(self.encrypted_path, self.password))
+
+            if self.pipe_playable:
+                self._chunks = self.decryptor.iter_decrypted_file(self.encrypted_path, self.password,
+                                                                  cancel_event=self._cancelled)
+                for chunk in self._chunks:
+                    self._buffer.append(chunk)
+                    self.prefetched_size += len(chunk)
+                    if self.prefetched_size >= self.prefetch_size or self._cancelled.is_set():
+                        break
+            else:
+                self.temp_path = self.decryptor.decrypt_to_temp_file(self.encrypted_path, self.password,
+                                                                     self.memory_limit, self._cancelled)
+        except Exception as e:
+            self._error = e
+        finally:
+            self.prepare_time = time.perf_counter() - start
+            self._password_checked.set()
+            with self._lock:
+                self._finished = True
+                if self._discarded:
+                    self._release()
+
+    def done(self) -> bool:
+        """后台准备是否已完成"""
+        return not self._thread.is_alive()
+
+    def wait_password_check(self):
+        """
+        等待密码校验完成（不等待判断播放方式和预解密）
+
+        Raises:
+            PasswordError: 密码错误
+            VideoEncryptionError: 后台准备失败
+        """
+        self._password_checked.wait()
+        if self._error is not None:
+            raise self._error
+
+    def result(self) -> 'PlaybackPrefetcher':
+        """
+        等待后台准备完成
+
+        Returns:
+            预取器本身
+
+        Raises:
+            PasswordError: 密码错误
+            VideoEncryptionError: 解密失败
+        """
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        """
+        迭代解密后的视频流（先输出预解密的数据，再继续解密剩余部分）
+
+        Yields:
+            解密后的数据块
+        """
+        self.result()
+        buffer, self._buffer = self._buffer, []
+        yield from buffer
+        if self._chunks is not None:
+            yield from self._chunks
+
+    def estimated_size(self) -> int:
+        """预取占用的内存/磁盘空间估计（管道播放为预解密量，否则为整个文件）"""
+        file_size = os.path.getsize(self.encrypted_path)
+        return min(self.prefetch_size, file_size) if self.stream_playback else file_size
+
+    def detach_temp_file(self) -> Optional[str]:
+        """交出临时文件的所有权（cleanup不再删除它）"""
+        temp_path, self.temp_path = self.temp_path, None
+        return temp_path
+
+    def cancel(self):
+        """请求停止预取（不等待后台线程结束）"""
+        self._cancelled.set()
+
+    def cleanup(self):
+        """
+        停止预取并清理缓冲区和临时文件
+
+        不等待后台线程：解密在下一个数据块处停止（已写入的临时文件随之删除），
+        无法中途停止的密钥派生在后台完成，线程结束时自行清理。
+        """
+        self._cancelled.set()
+        with self._lock:
+            self._discarded = True
+            if self._finished or self._thread.ident is None:
+                self._release()
+
+    def _release(self):
+        """释放缓冲区和临时文件（调用方持有_lock）"""
+        self._buffer = []
+        self._chunks = None
+        FileUtils.remove_temp_file(self.temp_path)
+        self.temp_path = None
+
+
+class PlaylistPrefetcher:
+    """
+    播放列表预取：当前文件播放时在后台准备后面K个文件
+
+    按播放顺序（已随机打乱的顺序）维护一个预取窗口，总占用不超过预算
+    （按预解密量估计；moov在末尾、需要整体解密到临时文件的旧文件会超出估计）；
+    离开窗口的预取（跳过、提前停止、密码变化）会被取消并清理。
+    """
+
+    def __init__(self, processor, files: List[str], depth: int = 2,
+                 budget: int = 256 * 1024 * 1024):
+        """
+        初始化播放列表预取
+
+        Args:
+            processor: VideoProcessor实例（用于创建单个文件的预取器）
+            files: 按播放顺序排列的文件列表
+            depth: 预取后续文件的个数
+            budget: 预取总占用上限（字节）
+        """
+        self.processor = processor
+        self.files = files
+        self.depth = max(0, depth)
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        self._prefetchers: Dict[int, PlaybackPrefetcher] = {}
+
+    def take(self, index: int, password: str) -> PlaybackPrefetcher:
+        """
+        取出第index个文件的预取器（未预取或密码不同时立即开始准备）
+
+        Args:
+            index: 文件在播放列表中的位置（从0开始）
+            password: 解密密码
+
+        Returns:
+            已启动的PlaybackPrefetcher（调用方负责cleanup）
+        """
+        prefetcher = self._prefetchers.pop(index, None)
+        if prefetcher is not None and prefetcher.password != password:
+            prefetcher.cleanup()
+            prefetcher = None
+
+        if prefetcher is None:
+            self.misses += 1
+            return self.processor.prefetch_playback(self.files[index], password)
+
+        self.hits += 1
+        return prefetcher
+
+    def schedule(self, index: int, password: str):
+        """
+        当前播放第index个文件，在后台准备后面depth个文件
+
+        Args:
+            index: 当前文件位置
+            password: 后续文件使用的密码
+        """
+        window = range(index + 1, min(len(self.files), index + 1 + self.depth))
+
+        # 取消窗口外或密码不同的预取
+        for position in list(self._prefetchers):
+            if position not in window or self._prefetchers[position].password != password:
+                self._prefetchers.pop(position).cleanup()
+
+        used = sum(p.estimated_size() for p in self._prefetchers.values())
+        for position in window:
+            if position in self._prefetchers:
+                continue
+            prefetcher = self.processor.prefetch_playback(self.files[position], password, start=False)
+            size = prefetcher.estimated_size()
+            # 预算不足时不再预取更远的文件
+            if self._prefetchers and used + size > self.budget:
+                break
+            self._prefetchers[position] = prefetcher.start()
+            used += size
+
+    def cancel_all(self):
+        """取消并清理所有预取（不等待正在进行的后台准备）"""
+        for prefetcher in self._prefetchers.values():
+            prefetcher.cleanup()
+        self._prefetchers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取预取统计
+
+        Returns:
+            统计信息字典（命中、未命中、正在预取的文件数）
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'pending': len(self._prefetchers)}
@@ -1,7 +1,8 @@
 # player/core/video_processor.py
 import os
 import sys
-from typing import Optional
+import time
+from typing import Optional, Tuple
 
 # 添加项目根目录到路径
 current_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -44,6 +45,9 @@ class VideoProcessor:
         self.decryptor = None
         self.metadata_handler = None
 
+        # 最近一次播放的统计（提示段结束到正片首帧的间隔等）
+        self.last_play_stats = {}
+
         self._init_components()
 
     def _init_components(self):
@@ -51,11 +55,20 @@ class VideoProcessor:
         # 获取默认算法
         default_algorithm = self.config_manager.get_default_algorithm()
 
-        # 初始化加密器、解密器和元数据处理器
-        self.encryptor = Encryptor(default_algorithm)
+        # 初始化加密器、解密器和元数据处理器（加密使用配置文件中的密钥派生参数）
+        from ..crypto.kdf import KDFParams
+        kdf_params = KDFParams.from_config(self.config.get("encryption", {}))
+        ffmpeg_config = self.config.get("ffmpeg", {})
+        self.encryptor = Encryptor(default_algorithm, kdf_params,
+                                   pipe_remux=ffmpeg_config.get("pipe_remux", True),
+                                   remux=ffmpeg_config.get("remux", "auto"))
         self.decryptor = Decryptor(default_algorithm)
         self.metadata_handler = MetadataHandler()
 
+        # 解密视频流缓存（进程内共享，player.payload_cache_mb为0时禁用）
+        from .payload_cache import get_payload_cache
+        self.payload_cache = get_payload_cache(self.config.get("player", {}))
+
     def encrypt_video(self, input_path: str, output_path: str, password: str,
                       notice_video_path: Optional[str] = None,
                       metadata_config: Optional[str] = None,
@@ -89,8 +102,9 @@ class VideoProcessor:
                 notice_video_path = None
             # 如果没有提供提示视频且不是纯加密模式，则生成默认提示视频
             elif not notice_video_path:
-                temp_notice_path = self._generate_default_notice_video()
-                notice_video_path = temp_notice_path
+                notice_video_path, is_temp = self._generate_default_notice_video()
+                if is_temp:
+                    temp_notice_path = notice_video_path
 
             # 确保输出目录存在
             FileUtils.ensure_directory(os.path.dirname(output_path))
@@ -117,7 +131,7 @@ class VideoProcessor:
                 os.remove(temp_notice_path)
 
     def decrypt_and_play(self, encrypted_path: str, password: str,
-                         skip_notice: bool = False) -> bool:
+                         skip_notice: bool = False, prefetcher=None) -> bool:
         """
         解密并播放视频
 
@@ -125,6 +139,7 @@ class VideoProcessor:
             encrypted_path: 加密文件路径
             password: 解密密码
             skip_notice: 是否跳过提示段
+            prefetcher: 已在后台准备该文件的PlaybackPrefetcher（None表示现在开始准备）
 
         Returns:
             成功/失败
@@ -137,31 +152,41 @@ class VideoProcessor:
             if not os.path.exists(encrypted_path):
                 raise VideoEncryptionError(f"加密文件不存在: {encrypted_path}")
 
-            # 加载加密文件
+            # 加载加密文件（惰性模式，按需读取各段）
             from ..file.encrypted_video import EncryptedVideoFile
-            encrypted_file = EncryptedVideoFile(encrypted_path)
-
-            # 播放提示段（如果不跳过）
-            if not skip_notice:
-                if encrypted_file.notice_data:
+            encrypted_file = EncryptedVideoFile(encrypted_path, lazy=True)
+
+            # 反复播放同一文件时直接使用缓存的解密结果（要求密码与缓存时一致）
+            cache_key = None
+            cached = None
+            if self.payload_cache.enabled:
+                iv_nonce = encrypted_file.header.get_encryption_info().get('iv_nonce')
+                cache_key = self.payload_cache.make_key(encrypted_path, iv_nonce)
+                cached = self.payload_cache.lookup(cache_key, password)
+
+            if cached is not None:
+                if prefetcher is not None:
+                    prefetcher.cleanup()
+                if not skip_notice and encrypted_file.notice_size > 0:
                     self._play_notice_section(encrypted_file)
+                return self._play_cached(cached)
 
-            # 解密视频流到临时文件
-            temp_video_path = self.decryptor.decrypt_to_temp_file(encrypted_path, password)
-
-            # 播放解密后的视频
-            from ..ffmpeg.ffmpeg_wrapper import FFmpegWrapper
-            ffmpeg = FFmpegWrapper()
-
-            # 设置窗口标题
-            title = "加密视频播放器 - 正在播放"
-            success = ffmpeg.play_video(temp_video_path, title=title)
+            # 提示段播放期间在后台派生密钥、校验密码并预解密正片开头
+            if prefetcher is None:
+                prefetcher = self.prefetch_playback(encrypted_path, password)
+            try:
+                # 先确认密码正确再播放提示段，密码错误时不必等提示段放完（预解密仍与提示段并行）
+                prefetcher.wait_password_check()
 
-            # 清理临时文件
-            if os.path.exists(temp_video_path):
-                os.remove(temp_video_path)
+                # 播放提示段（如果不跳过）
+                if not skip_notice:
+                    if encrypted_file.notice_size > 0:
+                        self._play_notice_section(encrypted_file)
 
-            return success
+                return self._play_prefetched(prefetcher, cache_key, password,
+                                             encrypted_file.encrypted_size)
+            finally:
+                prefetcher.cleanup()
 
         except PasswordError:
             raise  # 直接传递密码错误
@@ -171,19 +196,165 @@ class VideoProcessor:
             else:
                 raise VideoEncryptionError(f"解密并播放失败: {e}")
 
-    def _generate_default_notice_video(self) -> str:
+    def prefetch_playback(self, encrypted_path: str, password: str, start: bool = True):
+        """
+        在后台开始准备加密文件的播放数据（密钥派生、密码校验、预解密）
+
+        Args:
+            encrypted_path: 加密文件路径
+            password: 解密密码
+            start: 是否立即启动后台线程
+
+        Returns:
+            PlaybackPrefetcher
+        """
+        from .playback_prefetcher import PlaybackPrefetcher
+        player_config = self.config.get("player", {})
+        prefetcher = PlaybackPrefetcher(
+            encrypted_path, password, self.decryptor.algorithm,
+            prefetch_size=player_config.get("prefetch_mb", 32) * 1024 * 1024,
+            stream_playback=player_config.get("stream_playback", True),
+            memory_limit=player_config.get("memory_buffer_mb", 512) * 1024 * 1024
+        )
+        return prefetcher.start() if start else prefetcher
+
+    def _play_prefetched(self, prefetcher, cache_key=None, password: str = None,
+                         expected_size: int = 0) -> bool:
+        """
+        播放预取器准备好的正片，并统计提示段结束到正片首帧的间隔
+
+        指定cache_key时，完整播放的视频流同时写入解密视频流缓存。
+
+        Args:
+            prefetcher: PlaybackPrefetcher
+            cache_key: 解密视频流缓存键（None表示不缓存）
+            password: 解密密码（缓存命中校验用）
+            expected_size: 预计的视频流大小
+
+        Returns:
+            是否成功
+
+        Raises:
+            PasswordError: 密码错误
+        """
+        from ..ffmpeg.toolchain import get_ffmpeg_wrapper
+
+        start = time.perf_counter()
+        ffmpeg = get_ffmpeg_wrapper()
+
+        # 密码错误等后台异常在这里抛出
+        prefetcher.result()
+        wait_time = time.perf_counter() - start
+
+        # 设置窗口标题
+        title = "加密视频播放器 - 正在播放"
+
+        # 优先边解密边通过管道播放（moov在文件末尾的旧文件已在后台解密到临时文件）
+        if prefetcher.pipe_playable:
+            chunks = prefetcher.iter_chunks()
+            writer = None
+            if cache_key is not None:
+                writer = self.payload_cache.begin(cache_key, password, expected_size, True)
+            if writer is not None:
+                chunks = writer.tee(chunks)
+            success = ffmpeg.play_video(None, title=title, chunks=chunks)
+            if writer is not None:
+                if success:
+                    writer.commit()
+                else:
+                    writer.abort()
+        else:
+            success = ffmpeg.play_video(prefetcher.temp_path, title=title)
+            # 已解密到内存文件的由缓存接管，不再删除
+            if cache_key is not None and self.payload_cache.adopt(cache_key, password,
+                                                                  prefetcher.temp_path, False):
+                prefetcher.detach_temp_file()
+
+        ttff = ffmpeg.last_play_stats.get('ttff')
+        self.last_play_stats = {
+            'prepare_time': prefetcher.prepare_time,
+            'prefetched_bytes': prefetcher.prefetched_size,
+            'wait_time': wait_time,
+            'gap': wait_time + (ttff or 0.0)
+        }
+        print(f"  提示段结束到正片首帧: {self.last_play_stats['gap'] * 1000:.0f} ms"
+              f"（等待后台准备 {wait_time * 1000:.0f} ms）")
+        return success
+
+    def _play_cached(self, cached) -> bool:
+        """
+        播放缓存中的解密视频流
+
+        Args:
+            cached: CachedPayload
+
+        Returns:
+            是否成功
+        """
+        from ..ffmpeg.toolchain import get_ffmpeg_wrapper
+
+        start = time.perf_counter()
+        ffmpeg = get_ffmpeg_wrapper()
+        title = "加密视频播放器 - 正在播放"
+
+        # 内存文件可以直接按路径播放（支持拖动），内存数据通过管道播放
+        if cached.path is not None:
+            success = ffmpeg.play_video(cached.path, title=title)
+        else:
+            success = ffmpeg.play_video(None, title=title, chunks=cached.iter_chunks())
+
+        ttff = ffmpeg.last_play_stats.get('ttff')
+        self.last_play_stats = {
+            'cache_hit': True,
+            'wait_time': 0.0,
+            'gap': (ttff if ttff is not None else time.perf_counter() - start)
+        }
+        stats = self.payload_cache.stats()
+        print(f"  ✓ 使用已缓存的解密视频（缓存命中率 {stats['hit_rate'] * 100:.0f}%）")
+        return success
+
+    def _generate_default_notice_video(self) -> Tuple[str, bool]:
         """
-        生成默认提示视频
+        生成默认提示视频（提示文本相同时复用缓存中已生成的视频）
 
         Returns:
-            提示视频文件路径
+            (提示视频文件路径, 是否为调用方负责删除的临时文件)
         """
         import tempfile
-        from ..ffmpeg.ffmpeg_wrapper import FFmpegWrapper
+        from ..ffmpeg.notice_cache import get_notice_cache
+        from ..ffmpeg.toolchain import get_ffmpeg_wrapper
+
+        ffmpeg = get_ffmpeg_wrapper()
+        notice_text = self._read_default_notice_text()
+        duration = 10
+
+        def render(output_path: str):
+            if not ffmpeg.generate_notice_video({'text': notice_text}, output_path, duration=duration):
+                raise VideoEncryptionError("生成默认提示视频失败")
+
+        notice_cache = get_notice_cache()
+        cache_key = notice_cache.make_key(notice_text, duration, ffmpeg.NOTICE_STYLE,
+                                          ffmpeg.toolchain.version)
+        cached_path = notice_cache.get_or_create(cache_key, render)
+        if cached_path:
+            return cached_path, False
 
-        ffmpeg = FFmpegWrapper()
         temp_file = tempfile.NamedTemporaryFile(suffix='.mp4', delete=False)
+        temp_file.close()
+        try:
+            render(temp_file.name)
+        except Exception:
+            os.remove(temp_file.name)
+            raise
+        return temp_file.name, True
+
+    def _read_default_notice_text(self) -> str:
+        """
+        读取默认提示文本（notice_assets/notice.txt中的notice_text，不存在时使用内置文本）
 
+        Returns:
+            提示文本
+        """
         # 尝试从notice_assets/notice.txt读取notice_text
         notice_text = "本视频为加密内容，请使用官方播放器播放完整视频。\n\n购买地址：https://example.com"
         
@@ -220,24 +391,23 @@ class VideoProcessor:
         else:
             print(f"  警告: 未找到notice_assets/notice.txt文件，使用默认文本")
 
-        assets = {'text': notice_text}
-        success = ffmpeg.generate_notice_video(assets, temp_file.name, duration=10)
-
-        if not success:
-            raise VideoEncryptionError("生成默认提示视频失败")
-
-        return temp_file.name
+        return notice_text
 
     def _play_notice_section(self, encrypted_file):
         """播放提示段"""
-        from ..ffmpeg.ffmpeg_wrapper import FFmpegWrapper
+        from ..ffmpeg.toolchain import get_ffmpeg_wrapper
+
+        # 优先直接从容器中按偏移播放，数据只在内存中时才写入临时文件
+        notice_url = encrypted_file.get_notice_url()
+        if notice_url:
+            get_ffmpeg_wrapper().play_video(notice_url, title="版权提示")
+            return
 
-        # 获取提示段的临时文件
         notice_temp_file = encrypted_file.get_notice_temp_file()
         if notice_temp_file:
             try:
                 # 播放提示视频
-                ffmpeg = FFmpegWrapper()
+                ffmpeg = get_ffmpeg_wrapper()
                 ffmpeg.play_video(notice_temp_file, title="版权提示")
             finally:
                 # 清理临时文件
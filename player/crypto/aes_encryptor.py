@@ -77,32 +77,124 @@ class AESEncryptor(BaseEncryptor):
         except Exception as e:
             raise CryptoError(f"AES解密失败: {e}", algorithm="AES")
     
-    def _encrypt_ctr(self, data: bytes, key: bytes, iv: bytes = None) -> Tuple[bytes, dict]:
-        """CTR模式加密"""
+    def _create_stream_cipher(self, key: bytes, encrypt: bool, **kwargs):
+        """
+        创建流式加解密上下文
+        
+        CTR模式直接复用同一个计数器；CBC模式在块之间缓存不足16字节的尾部，
+        加密时在最后补PKCS7填充，解密时保留最后一个块以便去除填充。
+        """
+        iv = kwargs.get('iv')
         if iv is None:
+            if not encrypt:
+                raise CryptoError(f"{self.mode}模式解密需要IV参数", algorithm=f"AES-{self.mode}")
             import os
-            iv = os.urandom(16)  # 生成16字节随机nonce/IV
+            iv = os.urandom(16)
+        
+        if self.mode == "CTR":
+            from .parallel_engine import SeekableStream
+            stream = SeekableStream(self, key, {'iv': iv})
+            return stream.update, stream.finalize, {'iv': iv}
+        elif self.mode == "CBC":
+            cipher = AES.new(key, AES.MODE_CBC, iv)
+            stream = _CBCStreamEncryptor(cipher) if encrypt else _CBCStreamDecryptor(cipher)
+            return stream.update, stream.finalize, {'iv': iv}
+        else:
+            raise CryptoError(f"不支持的AES模式: {self.mode}", algorithm="AES")
+    
+    def is_seekable(self) -> bool:
+        """CTR模式的密钥流可以定位到任意位置"""
+        return self.mode == "CTR"
+    
+    def create_cipher_at(self, key: bytes, offset: int, **kwargs):
+        """
+        创建定位到指定字节偏移的CTR加解密器
         
-        # 创建计数器
-        counter = Counter.new(64, prefix=iv[:8], initial_value=int.from_bytes(iv[8:], 'big'))
+        IV前8字节为nonce，后8字节为64位计数器初值；偏移对应的块号加到计数器上
+        （按2^64取模，与单个cipher顺序处理时的回绕一致），块内偏移通过丢弃密钥流实现。
         
-        # 创建加密器
+        Args:
+            key: 密钥
+            offset: 数据流中的字节偏移
+            **kwargs: 额外参数（iv）
+            
+        Returns:
+            CTR模式cipher对象
+        """
+        if self.mode != "CTR":
+            raise CryptoError(f"AES-{self.mode}模式不支持定位", algorithm=f"AES-{self.mode}")
+        iv = kwargs.get('iv')
+        if iv is None:
+            raise CryptoError("CTR模式需要IV参数", algorithm="AES-CTR")
+        
+        block, skip = divmod(offset, 16)
+        initial_value = (int.from_bytes(iv[8:], 'big') + block) % (1 << 64)
+        counter = Counter.new(64, prefix=iv[:8], initial_value=initial_value)
         cipher = AES.new(key, AES.MODE_CTR, counter=counter)
-        encrypted = cipher.encrypt(data)
+        if skip:
+            cipher.encrypt(b'\x00' * skip)
+        return cipher
+    
+    def supports_random_access(self) -> bool:
+        """CTR和CBC模式都可以随机访问解密"""
+        return self.mode in ("CTR", "CBC")
+    
+    def decrypt_range(self, read_range, key: bytes, offset: int, length: int,
+                      total_size: int, **kwargs) -> bytes:
+        """
+        随机访问解密
+        
+        CTR模式直接定位计数器；CBC模式每个明文块只依赖本块和前一个密文块，
+        所以多读一个前置块作为IV即可，范围包含最后一块时去除PKCS7填充。
+        """
+        if self.mode != "CBC":
+            return super().decrypt_range(read_range, key, offset, length, total_size, **kwargs)
+        
+        iv = kwargs.get('iv')
+        if iv is None:
+            raise CryptoError("CBC模式解密需要IV参数", algorithm="AES-CBC")
+        if total_size % 16 != 0:
+            raise CryptoError("CBC密文长度不是16字节的整数倍", algorithm="AES-CBC")
+        
+        end = min(offset + max(0, length), total_size)
+        if offset >= end:
+            return b''
+        
+        first_block = offset // 16
+        last_block = (end - 1) // 16
+        read_start = (first_block - 1) * 16 if first_block else 0
+        data = read_range(read_start, (last_block + 1) * 16 - read_start)
+        if first_block:
+            iv, data = data[:16], data[16:]
+        
+        decrypted = AES.new(key, AES.MODE_CBC, iv).decrypt(data)
+        
+        # 范围包含最后一块时去除填充
+        if (last_block + 1) * 16 == total_size:
+            padding_length = decrypted[-1]
+            decrypted = decrypted[:-padding_length]
+        
+        start = offset - first_block * 16
+        return decrypted[start:start + (end - offset)]
+    
+    def _encrypt_ctr(self, data: bytes, key: bytes, iv: bytes = None) -> Tuple[bytes, dict]:
+        """CTR模式加密（数据较大时由并行引擎分段处理）"""
+        if iv is None:
+            import os
+            iv = os.urandom(16)  # 生成16字节随机nonce/IV
+        
+        from .parallel_engine import get_default_engine
+        encrypted = get_default_engine().process(self, data, key, iv=iv)
         
         return encrypted, {'iv': iv}
     
     def _decrypt_ctr(self, data: bytes, key: bytes, iv: bytes = None) -> bytes:
-        """CTR模式解密"""
+        """CTR模式解密（数据较大时由并行引擎分段处理）"""
         if iv is None:
             raise CryptoError("CTR模式解密需要IV参数", algorithm="AES-CTR")
         
-        # 创建计数器
-        counter = Counter.new(64, prefix=iv[:8], initial_value=int.from_bytes(iv[8:], 'big'))
-        
-        # 创建解密器
-        cipher = AES.new(key, AES.MODE_CTR, counter=counter)
-        return cipher.decrypt(data)
+        from .parallel_engine import get_default_engine
+        return get_default_engine().process(self, data, key, iv=iv)
     
     def _encrypt_cbc(self, data: bytes, key: bytes, iv: bytes = None) -> Tuple[bytes, dict]:
         """CBC模式加密"""
@@ -137,3 +229,49 @@ class AESEncryptor(BaseEncryptor):
     def get_algorithm_name(self) -> str:
         """获取算法名称"""
         return f"AES-{self.mode}"
+
+
+class _CBCStreamEncryptor:
+    """CBC流式加密：缓存不足一个块的尾部数据，结束时补PKCS7填充"""
+    
+    def __init__(self, cipher):
+        self.cipher = cipher
+        self.buffer = b''
+    
+    def update(self, data: bytes) -> bytes:
+        if self.buffer:
+            data = self.buffer + data
+        cut = len(data) - len(data) % 16
+        self.buffer = data[cut:]
+        return self.cipher.encrypt(data[:cut]) if cut else b''
+    
+    def finalize(self) -> bytes:
+        padding_length = 16 - len(self.buffer) % 16
+        return self.cipher.encrypt(self.buffer + bytes([padding_length] * padding_length))
+
+
+class _CBCStreamDecryptor:
+    """CBC流式解密：始终保留最后一个完整块，结束时去除PKCS7填充"""
+    
+    def __init__(self, cipher):
+        self.cipher = cipher
+        self.buffer = b''
+    
+    def update(self, data: bytes) -> bytes:
+        if self.buffer:
+            data = self.buffer + data
+        cut = len(data) - len(data) % 16
+        if cut == len(data):
+            cut -= 16  # 数据恰好按块对齐时，最后一块可能是填充块
+        cut = max(cut, 0)
+        self.buffer = data[cut:]
+        return self.cipher.decrypt(data[:cut]) if cut else b''
+    
+    def finalize(self) -> bytes:
+        if len(self.buffer) != 16:
+            raise CryptoError("CBC密文长度不是16字节的整数倍", algorithm="AES-CBC")
+        decrypted = self.cipher.decrypt(self.buffer)
+        
+        # 去除PKCS7填充
+        padding_length = decrypted[-1]
+        return decrypted[:-padding_length]
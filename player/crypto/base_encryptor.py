@@ -1,14 +1,30 @@
 # player/crypto/base_encryptor.py
 from abc import ABC, abstractmethod
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Iterable, Iterator, Callable, BinaryIO
 import hashlib
+import hmac
 import os
-from ..exceptions.custom_exceptions import CryptoError
+from .kdf import KDFParams
+from ..exceptions.custom_exceptions import CryptoError, VideoEncryptionError
 
 
 class BaseEncryptor(ABC):
     """加密算法基类（抽象类）"""
     
+    # 流式加解密的默认块大小
+    DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+    
+    # 默认密钥派生参数
+    DEFAULT_KDF = KDFParams.PBKDF2
+    DEFAULT_ITERATIONS = KDFParams.DEFAULT_ITERATIONS
+    
+    # 批量密钥层级：主密钥经HKDF按每个文件的随机salt派生文件密钥
+    FILE_KEY_INFO = b'CryptoPlayer file key v1'
+    
+    # 密钥校验值：用派生子密钥对固定常量做HMAC，存入文件头以便快速识别错误密码
+    KEY_CHECK_SIZE = 16
+    KEY_CHECK_LABEL = b'CryptoPlayer key check v1'
+    
     @abstractmethod
     def encrypt(self, data: bytes, key: bytes, **kwargs) -> Tuple[bytes, dict]:
         """
@@ -40,15 +56,17 @@ class BaseEncryptor(ABC):
         pass
     
     def generate_key(self, password: str, salt: Optional[bytes] = None, 
-                    algorithm: str = "PBKDF2", iterations: int = 100000) -> Tuple[bytes, bytes]:
+                    algorithm: str = DEFAULT_KDF, iterations: int = DEFAULT_ITERATIONS,
+                    kdf_params: Optional[KDFParams] = None) -> Tuple[bytes, bytes]:
         """
         从密码派生密钥
         
         Args:
             password: 密码
             salt: 盐值，如果为None则生成随机盐
-            algorithm: 密钥派生算法
-            iterations: 迭代次数
+            algorithm: 密钥派生算法（未提供kdf_params时使用）
+            iterations: 迭代次数（未提供kdf_params时使用）
+            kdf_params: 完整的密钥派生参数（优先于algorithm和iterations）
             
         Returns:
             (密钥, salt)
@@ -56,36 +74,253 @@ class BaseEncryptor(ABC):
         Raises:
             CryptoError: 密钥派生失败
         """
-        if salt is None:
-            salt = os.urandom(16)
-        
         try:
-            if algorithm == "PBKDF2":
-                # 使用PBKDF2派生密钥
-                key = hashlib.pbkdf2_hmac(
-                    'sha256',
-                    password.encode('utf-8'),
-                    salt,
-                    iterations,
-                    dklen=32
-                )
-            elif algorithm == "scrypt":
-                # 使用scrypt派生密钥（更安全但更慢）
-                import hashlib as hl
-                key = hl.scrypt(
-                    password.encode('utf-8'),
-                    salt=salt,
-                    n=2**14,
-                    r=8,
-                    p=1,
-                    dklen=32
-                )
-            else:
-                raise CryptoError(f"不支持的密钥派生算法: {algorithm}", algorithm=algorithm)
+            if kdf_params is None:
+                kdf_params = KDFParams(algorithm, iterations=iterations)
+            
+            if salt is None:
+                salt = os.urandom(kdf_params.salt_length)
+            
+            # PBKDF2-SHA256或scrypt（更安全但更慢）
+            key = kdf_params.derive(password, salt)
             
             return key, salt
         except Exception as e:
-            raise CryptoError(f"密钥派生失败: {e}", algorithm=algorithm)
+            raise CryptoError(f"密钥派生失败: {e}", algorithm=algorithm if kdf_params is None else kdf_params.kdf)
+    
+    @classmethod
+    def derive_file_key(cls, master_key: bytes, file_salt: bytes) -> bytes:
+        """
+        从批量主密钥派生单个文件的密钥（HKDF-SHA256）
+        
+        Args:
+            master_key: 由密码和批量salt派生的主密钥
+            file_salt: 每个文件随机生成的salt
+            
+        Returns:
+            文件密钥
+        """
+        from Crypto.Protocol.KDF import HKDF
+        from Crypto.Hash import SHA256
+        return HKDF(bytes(master_key), len(master_key), file_salt, SHA256, context=cls.FILE_KEY_INFO)
+    
+    @classmethod
+    def compute_key_check(cls, key: bytes) -> bytes:
+        """
+        计算密钥校验值
+        
+        先从密钥派生专用子密钥，再对固定常量做HMAC，校验值不会泄露加密密钥本身。
+        
+        Args:
+            key: 加密密钥
+            
+        Returns:
+            校验值
+        """
+        subkey = hmac.new(key, b'key-check', hashlib.sha256).digest()
+        return hmac.new(subkey, cls.KEY_CHECK_LABEL, hashlib.sha256).digest()[:cls.KEY_CHECK_SIZE]
+    
+    @classmethod
+    def verify_key_check(cls, key: bytes, key_check: bytes) -> bool:
+        """
+        验证密钥校验值（常量时间比较）
+        
+        Args:
+            key: 派生出的密钥
+            key_check: 文件头中保存的校验值
+            
+        Returns:
+            密钥是否正确
+        """
+        return hmac.compare_digest(cls.compute_key_check(key), key_check)
+    
+    def encrypt_iter(self, chunks: Iterable[bytes], key: bytes, **kwargs) -> Tuple[Iterator[bytes], dict]:
+        """
+        流式加密：所有数据块共用同一个加密上下文，内存占用与数据总量无关
+        
+        Args:
+            chunks: 明文数据块迭代器
+            key: 加密密钥
+            **kwargs: 算法特定参数
+            
+        Returns:
+            (密文数据块迭代器, 额外参数如IV)
+        """
+        update, finalize, params = self._create_stream_cipher(key, True, **kwargs)
+        return self._run_stream(chunks, update, finalize), params
+    
+    def decrypt_iter(self, chunks: Iterable[bytes], key: bytes, **kwargs) -> Iterator[bytes]:
+        """
+        流式解密
+        
+        Args:
+            chunks: 密文数据块迭代器
+            key: 解密密钥
+            **kwargs: 算法特定参数
+            
+        Returns:
+            明文数据块迭代器
+        """
+        update, finalize, _ = self._create_stream_cipher(key, False, **kwargs)
+        return self._run_stream(chunks, update, finalize)
+    
+    def encrypt_file(self, src: BinaryIO, dst: BinaryIO, key: bytes,
+                     chunk_size: Optional[int] = None, length: Optional[int] = None,
+                     **kwargs) -> Tuple[int, dict]:
+        """
+        从文件对象流式加密到另一个文件对象
+        
+        Args:
+            src: 明文输入（从当前位置开始读取）
+            dst: 密文输出
+            key: 加密密钥
+            chunk_size: 块大小（None表示使用preferred_chunk_size）
+            length: 读取长度（None表示读到末尾）
+            **kwargs: 算法特定参数
+            
+        Returns:
+            (写入字节数, 额外参数如IV)
+        """
+        chunk_size = chunk_size or self.preferred_chunk_size()
+        stream, params = self.encrypt_iter(self._iter_file(src, chunk_size, length), key, **kwargs)
+        return self._write_stream(stream, dst), params
+    
+    def decrypt_file(self, src: BinaryIO, dst: BinaryIO, key: bytes,
+                     chunk_size: Optional[int] = None, length: Optional[int] = None,
+                     **kwargs) -> int:
+        """
+        从文件对象流式解密到另一个文件对象
+        
+        Args:
+            src: 密文输入（从当前位置开始读取）
+            dst: 明文输出
+            key: 解密密钥
+            chunk_size: 块大小（None表示使用preferred_chunk_size）
+            length: 读取长度（None表示读到末尾）
+            **kwargs: 算法特定参数
+            
+        Returns:
+            写入字节数
+        """
+        chunk_size = chunk_size or self.preferred_chunk_size()
+        stream = self.decrypt_iter(self._iter_file(src, chunk_size, length), key, **kwargs)
+        return self._write_stream(stream, dst)
+    
+    def is_seekable(self) -> bool:
+        """密钥流能否直接定位到任意位置（决定能否并行处理）"""
+        return False
+    
+    def create_cipher_at(self, key: bytes, offset: int, **kwargs):
+        """
+        创建一个已定位到指定字节偏移的加解密器（由可定位的子类实现）
+        
+        Args:
+            key: 密钥
+            offset: 数据流中的字节偏移
+            **kwargs: 算法特定参数
+            
+        Returns:
+            cipher对象（encrypt/decrypt支持output参数）
+            
+        Raises:
+            CryptoError: 算法不支持定位
+        """
+        raise CryptoError(f"{self.get_algorithm_name()} 不支持定位", algorithm=self.get_algorithm_name())
+    
+    def supports_random_access(self) -> bool:
+        """能否不解密前面的数据而直接解密任意一段"""
+        return self.is_seekable()
+    
+    def decrypt_range(self, read_range: Callable[[int, int], bytes], key: bytes,
+                      offset: int, length: int, total_size: int, **kwargs) -> bytes:
+        """
+        随机访问解密：只读取并解密指定范围（默认基于可定位的密钥流实现）
+        
+        Args:
+            read_range: 读取密文的函数 read_range(offset, length) -> bytes
+            key: 解密密钥
+            offset: 明文中的起始偏移
+            length: 读取长度
+            total_size: 密文总大小
+            **kwargs: 算法特定参数
+            
+        Returns:
+            解密后的数据（超出数据末尾的部分被截断）
+            
+        Raises:
+            CryptoError: 算法不支持随机访问
+        """
+        if not self.is_seekable():
+            raise CryptoError(f"{self.get_algorithm_name()} 不支持随机访问解密",
+                              algorithm=self.get_algorithm_name())
+        
+        length = max(0, min(length, total_size - offset))
+        if length == 0:
+            return b''
+        
+        from .parallel_engine import get_default_engine
+        return get_default_engine().process(self, read_range(offset, length), key, offset=offset, **kwargs)
+    
+    def preferred_chunk_size(self) -> int:
+        """流式处理时建议的块大小：可并行的算法一次读够所有工作者处理的数据量"""
+        if self.is_seekable():
+            from .parallel_engine import get_default_engine
+            return max(self.DEFAULT_CHUNK_SIZE, get_default_engine().batch_size)
+        return self.DEFAULT_CHUNK_SIZE
+    
+    def _create_stream_cipher(self, key: bytes, encrypt: bool,
+                              **kwargs) -> Tuple[Callable[[bytes], bytes], Callable[[], bytes], dict]:
+        """
+        创建流式加解密上下文（由支持流式处理的子类实现）
+        
+        Args:
+            key: 密钥
+            encrypt: True为加密，False为解密
+            **kwargs: 算法特定参数
+            
+        Returns:
+            (处理数据块的函数, 结束时输出剩余数据的函数, 额外参数如IV)
+        """
+        raise CryptoError(f"{self.get_algorithm_name()} 不支持流式处理", algorithm=self.get_algorithm_name())
+    
+    def _run_stream(self, chunks: Iterable[bytes], update: Callable[[bytes], bytes],
+                    finalize: Callable[[], bytes]) -> Iterator[bytes]:
+        """驱动流式上下文处理所有数据块"""
+        try:
+            for chunk in chunks:
+                output = update(chunk)
+                if output:
+                    yield output
+            
+            output = finalize()
+            if output:
+                yield output
+        except VideoEncryptionError:
+            # 数据来源的错误（如FFmpeg管道失败）原样抛出
+            raise
+        except Exception as e:
+            raise CryptoError(f"流式处理失败: {e}", algorithm=self.get_algorithm_name())
+    
+    @staticmethod
+    def _iter_file(src: BinaryIO, chunk_size: int, length: Optional[int] = None) -> Iterator[bytes]:
+        """分块读取文件对象"""
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = src.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    
+    @staticmethod
+    def _write_stream(stream: Iterable[bytes], dst: BinaryIO) -> int:
+        """把数据块依次写入文件对象"""
+        written = 0
+        for chunk in stream:
+            dst.write(chunk)
+            written += len(chunk)
+        return written
     
     @abstractmethod
     def get_algorithm_name(self) -> str:
@@ -37,8 +37,9 @@ class ChaCha20Encryptor(BaseEncryptor):
             if nonce is None:
                 nonce = b'\x00' * 12
             
-            cipher = ChaCha20.new(key=key, nonce=nonce)
-            encrypted = cipher.encrypt(data)
+            # 数据较大时由并行引擎分段处理
+            from .parallel_engine import get_default_engine
+            encrypted = get_default_engine().process(self, data, key, nonce=nonce)
             
             return encrypted, {'nonce': nonce}
         except Exception as e:
@@ -64,11 +65,48 @@ class ChaCha20Encryptor(BaseEncryptor):
             if nonce is None:
                 raise CryptoError("ChaCha20解密需要nonce参数", algorithm="ChaCha20")
             
-            cipher = ChaCha20.new(key=key, nonce=nonce)
-            return cipher.decrypt(data)
+            from .parallel_engine import get_default_engine
+            return get_default_engine().process(self, data, key, nonce=nonce)
         except Exception as e:
             raise CryptoError(f"ChaCha20解密失败: {e}", algorithm="ChaCha20")
     
+    def is_seekable(self) -> bool:
+        """ChaCha20的密钥流可以定位到任意位置"""
+        return True
+    
+    def create_cipher_at(self, key: bytes, offset: int, **kwargs):
+        """
+        创建定位到指定字节偏移的ChaCha20加解密器
+        
+        Args:
+            key: 密钥
+            offset: 数据流中的字节偏移
+            **kwargs: 额外参数（nonce）
+            
+        Returns:
+            ChaCha20 cipher对象
+        """
+        nonce = kwargs.get('nonce')
+        if nonce is None:
+            raise CryptoError("ChaCha20需要nonce参数", algorithm="ChaCha20")
+        
+        cipher = ChaCha20.new(key=key, nonce=nonce)
+        if offset:
+            cipher.seek(offset)
+        return cipher
+    
+    def _create_stream_cipher(self, key: bytes, encrypt: bool, **kwargs):
+        """创建流式加解密上下文（大块数据交给并行引擎处理）"""
+        nonce = kwargs.get('nonce')
+        if nonce is None:
+            if not encrypt:
+                raise CryptoError("ChaCha20解密需要nonce参数", algorithm="ChaCha20")
+            nonce = b'\x00' * 12
+        
+        from .parallel_engine import SeekableStream
+        stream = SeekableStream(self, key, {'nonce': nonce})
+        return stream.update, stream.finalize, {'nonce': nonce}
+    
     def get_algorithm_name(self) -> str:
         """获取算法名称"""
         return "ChaCha20"
\ No newline at end of file
@@ -0,0 +1,252 @@
+# player/crypto/kdf.py
+import hashlib
+import os
+import struct
+import time
+from typing import Dict, Any, Optional, Tuple
+from ..exceptions.custom_exceptions import CryptoError
+
+
+class KDFParams:
+    """
+    密钥派生参数（KDF种类及其成本参数）
+
+    写入文件头扩展区，解密时按文件中记录的参数派生密钥；
+    没有记录参数的旧文件使用默认值（PBKDF2-SHA256，100000次迭代）。
+    """
+
+    PBKDF2 = "PBKDF2"
+    SCRYPT = "scrypt"
+
+    # 文件头中的编码：kdf_id(1) + 三个成本参数(各4字节)
+    # PBKDF2: (iterations, 0, 0)；scrypt: (n, r, p)
+    FORMAT = '<B I I I'
+    SIZE = struct.calcsize(FORMAT)
+    _KDF_IDS = {PBKDF2: 1, SCRYPT: 2}
+
+    DEFAULT_ITERATIONS = 100000
+    DEFAULT_SCRYPT_N = 2 ** 14
+    DEFAULT_SCRYPT_R = 8
+    DEFAULT_SCRYPT_P = 1
+    DEFAULT_SALT_LENGTH = 16
+    MAX_SALT_LENGTH = 30  # 文件头reserved字段中salt可用的最大长度
+    KEY_LENGTH = 32
+
+    def __init__(self, kdf: str = PBKDF2, iterations: int = DEFAULT_ITERATIONS,
+                 n: int = DEFAULT_SCRYPT_N, r: int = DEFAULT_SCRYPT_R, p: int = DEFAULT_SCRYPT_P,
+                 salt_length: int = DEFAULT_SALT_LENGTH):
+        """
+        初始化密钥派生参数
+
+        Args:
+            kdf: 密钥派生算法（PBKDF2或scrypt）
+            iterations: PBKDF2迭代次数
+            n: scrypt CPU/内存成本（2的幂）
+            r: scrypt块大小
+            p: scrypt并行度
+            salt_length: 加密时生成的salt长度
+
+        Raises:
+            CryptoError: 参数无效
+        """
+        if kdf not in self._KDF_IDS:
+            raise CryptoError(f"不支持的密钥派生算法: {kdf}", algorithm=kdf)
+        if kdf == self.PBKDF2 and iterations <= 0:
+            raise CryptoError(f"PBKDF2迭代次数必须为正数: {iterations}", algorithm=kdf)
+        if kdf == self.SCRYPT and (n < 2 or n & (n - 1) or r <= 0 or p <= 0):
+            raise CryptoError(f"无效的scrypt参数: n={n}, r={r}, p={p}", algorithm=kdf)
+        if not 8 <= salt_length <= self.MAX_SALT_LENGTH:
+            raise CryptoError(f"salt长度必须在8到{self.MAX_SALT_LENGTH}字节之间: {salt_length}")
+
+        self.kdf = kdf
+        self.iterations = iterations
+        self.n = n
+        self.r = r
+        self.p = p
+        self.salt_length = salt_length
+
+    @property
+    def cost(self) -> Tuple[int, int, int]:
+        """成本参数（同时用作密钥缓存键的一部分）"""
+        if self.kdf == self.SCRYPT:
+            return (self.n, self.r, self.p)
+        return (self.iterations, 0, 0)
+
+    def derive(self, password: str, salt: bytes) -> bytes:
+        """
+        派生密钥
+
+        Args:
+            password: 密码
+            salt: 盐值
+
+        Returns:
+            32字节密钥
+        """
+        if self.kdf == self.SCRYPT:
+            return hashlib.scrypt(
+                password.encode('utf-8'),
+                salt=salt,
+                n=self.n,
+                r=self.r,
+                p=self.p,
+                maxmem=self.scrypt_memory() + 1024 * 1024,
+                dklen=self.KEY_LENGTH
+            )
+        return hashlib.pbkdf2_hmac(
+            'sha256',
+            password.encode('utf-8'),
+            salt,
+            self.iterations,
+            dklen=self.KEY_LENGTH
+        )
+
+    def scrypt_memory(self) -> int:
+        """scrypt派生所需的内存（字节）"""
+        return 128 * self.n * self.r * self.p + 128 * self.n * self.r
+
+    def to_bytes(self) -> bytes:
+        """编码为文件头扩展区中的记录"""
+        return struct.pack(self.FORMAT, self._KDF_IDS[self.kdf], *self.cost)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'KDFParams':
+        """
+        从文件头扩展区记录解码
+
+        Args:
+            data: 记录内容
+
+        Returns:
+            KDFParams实例
+
+        Raises:
+            CryptoError: 记录无效或算法未知
+        """
+        if len(data) < cls.SIZE:
+            raise CryptoError("密钥派生参数记录长度不足")
+
+        kdf_id, a, b, c = struct.unpack(cls.FORMAT, data[:cls.SIZE])
+        names = {v: k for k, v in cls._KDF_IDS.items()}
+        if kdf_id not in names:
+            raise CryptoError(f"未知的密钥派生算法编号: {kdf_id}")
+
+        if names[kdf_id] == cls.SCRYPT:
+            return cls(cls.SCRYPT, n=a, r=b, p=c)
+        return cls(cls.PBKDF2, iterations=a)
+
+    @classmethod
+    def from_config(cls, encryption_config: Dict[str, Any]) -> 'KDFParams':
+        """
+        从配置文件的encryption段创建
+
+        Args:
+            encryption_config: 配置字典（key_derivation、iterations、salt_length、scrypt_n/r/p）
+
+        Returns:
+            KDFParams实例
+        """
+        return cls(
+            kdf=encryption_config.get("key_derivation", cls.PBKDF2),
+            iterations=encryption_config.get("iterations", cls.DEFAULT_ITERATIONS),
+            n=encryption_config.get("scrypt_n", cls.DEFAULT_SCRYPT_N),
+            r=encryption_config.get("scrypt_r", cls.DEFAULT_SCRYPT_R),
+            p=encryption_config.get("scrypt_p", cls.DEFAULT_SCRYPT_P),
+            salt_length=encryption_config.get("salt_length", cls.DEFAULT_SALT_LENGTH)
+        )
+
+    def to_config(self) -> Dict[str, Any]:
+        """转换为配置文件encryption段中的字段"""
+        config = {"key_derivation": self.kdf, "salt_length": self.salt_length}
+        if self.kdf == self.SCRYPT:
+            config.update({"scrypt_n": self.n, "scrypt_r": self.r, "scrypt_p": self.p})
+        else:
+            config["iterations"] = self.iterations
+        return config
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, KDFParams) and self.kdf == other.kdf and self.cost == other.cost
+
+    def __str__(self) -> str:
+        """字符串表示"""
+        if self.kdf == self.SCRYPT:
+            return f"scrypt(n={self.n}, r={self.r}, p={self.p})"
+        return f"PBKDF2-SHA256(iterations={self.iterations})"
+
+
+def load_configured_kdf_params(config_path: Optional[str] = None) -> KDFParams:
+    """
+    读取配置文件中的密钥派生参数（配置文件不存在时使用默认值）
+
+    Args:
+        config_path: 配置文件路径
+
+    Returns:
+        KDFParams实例
+    """
+    from ..config.config_manager import ConfigManager
+    config_manager = ConfigManager(config_path)
+    if not os.path.exists(config_manager.config_file):
+        return KDFParams()
+    return KDFParams.from_config(config_manager.load_config().get("encryption", {}))
+
+
+def measure_kdf(params: KDFParams, rounds: int = 3) -> float:
+    """
+    测量一次密钥派生的耗时（取多次中的最小值）
+
+    Args:
+        params: 密钥派生参数
+        rounds: 测量次数
+
+    Returns:
+        耗时（秒）
+    """
+    salt = os.urandom(params.salt_length)
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        params.derive("calibration", salt)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate_kdf(kdf: str = KDFParams.PBKDF2, target_seconds: float = 0.25,
+                  salt_length: int = KDFParams.DEFAULT_SALT_LENGTH,
+                  max_memory: int = 256 * 1024 * 1024) -> Tuple[KDFParams, float]:
+    """
+    在本机上测量并选出解锁耗时接近目标值的成本参数
+
+    PBKDF2按测得的单次迭代耗时线性推算迭代次数；scrypt固定r=8、p=1，
+    把n逐次翻倍，取耗时不超过目标（且内存不超过上限）的最大值。
+
+    Args:
+        kdf: 密钥派生算法
+        target_seconds: 目标解锁耗时（秒）
+        salt_length: salt长度
+        max_memory: scrypt允许使用的最大内存（字节）
+
+    Returns:
+        (选出的参数, 实测耗时)
+    """
+    if kdf == KDFParams.SCRYPT:
+        best = KDFParams(KDFParams.SCRYPT, n=2 ** 12, salt_length=salt_length)
+        best_time = measure_kdf(best)
+        while True:
+            candidate = KDFParams(KDFParams.SCRYPT, n=best.n * 2, r=best.r, p=best.p,
+                                  salt_length=salt_length)
+            if candidate.scrypt_memory() > max_memory:
+                break
+            elapsed = measure_kdf(candidate)
+            if elapsed > target_seconds:
+                break
+            best, best_time = candidate, elapsed
+        return best, best_time
+
+    # PBKDF2：先用较小的迭代次数测出单次迭代耗时
+    probe = KDFParams(KDFParams.PBKDF2, iterations=20000, salt_length=salt_length)
+    per_iteration = measure_kdf(probe) / probe.iterations
+    iterations = int(target_seconds / per_iteration) // 1000 * 1000
+    params = KDFParams(KDFParams.PBKDF2, iterations=max(iterations, 10000), salt_length=salt_length)
+    return params, measure_kdf(params, rounds=1)
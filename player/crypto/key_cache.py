@@ -0,0 +1,198 @@
+# player/crypto/key_cache.py
+import atexit
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional, Tuple
+
+
+class DerivedKeyCache:
+    """
+    进程内派生密钥缓存（LRU + TTL）
+
+    以 (密码摘要, salt, KDF, KDF参数) 为键缓存派生结果，避免批量处理、重试、
+    重复播放时对同一密码和salt反复运行PBKDF2。密码本身不保存，只保存用进程内
+    随机密钥计算的HMAC摘要；密钥以bytearray保存，淘汰、过期和wipe时清零。
+    """
+
+    DEFAULT_MAX_ENTRIES = 64
+    DEFAULT_TTL = 600  # 秒
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL):
+        """
+        初始化密钥缓存
+
+        Args:
+            max_entries: 最多缓存的密钥数（0表示禁用缓存）
+            ttl: 每个密钥的有效期（秒）
+        """
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple, Tuple[bytearray, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._secret = os.urandom(32)
+
+    def _make_key(self, password: str, salt: bytes, kdf: str, params: Tuple) -> Tuple:
+        """生成缓存键（不保存明文密码）"""
+        digest = hmac.new(self._secret, password.encode('utf-8'), hashlib.sha256).digest()
+        return (digest, bytes(salt), kdf, tuple(params))
+
+    def get(self, password: str, salt: bytes, kdf: str, params: Tuple) -> Optional[bytes]:
+        """
+        查找缓存的派生密钥
+
+        Args:
+            password: 密码
+            salt: 盐值
+            kdf: 密钥派生算法
+            params: KDF参数（如迭代次数）
+
+        Returns:
+            派生密钥，未命中或已过期时返回None
+        """
+        cache_key = self._make_key(password, salt, kdf, params)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[1] < time.monotonic():
+                self._discard(cache_key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return bytes(entry[0])
+
+    def put(self, password: str, salt: bytes, kdf: str, params: Tuple, key: bytes):
+        """
+        保存派生密钥
+
+        Args:
+            password: 密码
+            salt: 盐值
+            kdf: 密钥派生算法
+            params: KDF参数
+            key: 派生密钥
+        """
+        if self.max_entries == 0:
+            return
+
+        cache_key = self._make_key(password, salt, kdf, params)
+        with self._lock:
+            if cache_key in self._entries:
+                self._discard(cache_key)
+            self._entries[cache_key] = (bytearray(key), time.monotonic() + self.ttl)
+
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def get_or_derive(self, password: str, salt: bytes, kdf: str, params: Tuple,
+                      derive: Callable[[], bytes]) -> bytes:
+        """
+        命中时直接返回缓存的密钥，否则调用derive派生并缓存
+
+        Args:
+            password: 密码
+            salt: 盐值
+            kdf: 密钥派生算法
+            params: KDF参数
+            derive: 实际执行密钥派生的函数
+
+        Returns:
+            派生密钥
+        """
+        key = self.get(password, salt, kdf, params)
+        if key is None:
+            # 派生在锁外进行，不阻塞其他线程查询
+            key = derive()
+            self.put(password, salt, kdf, params, key)
+        return key
+
+    def wipe(self):
+        """清零并清空所有缓存的密钥"""
+        with self._lock:
+            for cache_key in list(self._entries):
+                self._discard(cache_key)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            统计信息字典（命中、未命中、当前条目数、命中率）
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+    def _discard(self, cache_key: Tuple):
+        """移除一个条目并清零密钥（调用方持有锁）"""
+        key, _ = self._entries.pop(cache_key)
+        key[:] = b'\x00' * len(key)
+
+
+_key_cache: Optional[DerivedKeyCache] = None
+_key_cache_lock = threading.Lock()
+
+
+def get_key_cache() -> DerivedKeyCache:
+    """
+    获取进程内共享的派生密钥缓存
+
+    Returns:
+        密钥缓存实例
+    """
+    global _key_cache
+    with _key_cache_lock:
+        if _key_cache is None:
+            # 只在配置文件存在时读取，避免在当前目录生成默认配置
+            from ..config.config_manager import ConfigManager
+            config_manager = ConfigManager()
+            config = {}
+            if os.path.exists(config_manager.config_file):
+                config = config_manager.get_key_cache_config()
+            _key_cache = DerivedKeyCache(
+                max_entries=config.get("max_entries", DerivedKeyCache.DEFAULT_MAX_ENTRIES),
+                ttl=config.get("ttl", DerivedKeyCache.DEFAULT_TTL)
+            )
+        return _key_cache
+
+
+def configure_key_cache(max_entries: int = DerivedKeyCache.DEFAULT_MAX_ENTRIES,
+                        ttl: float = DerivedKeyCache.DEFAULT_TTL) -> DerivedKeyCache:
+    """
+    替换进程内共享的派生密钥缓存（旧缓存中的密钥会被清零）
+
+    Args:
+        max_entries: 最多缓存的密钥数（0表示禁用缓存）
+        ttl: 每个密钥的有效期（秒）
+
+    Returns:
+        新的密钥缓存实例
+    """
+    global _key_cache
+    cache = DerivedKeyCache(max_entries, ttl)
+    with _key_cache_lock:
+        previous, _key_cache = _key_cache, cache
+    if previous is not None:
+        previous.wipe()
+    return cache
+
+
+@atexit.register
+def _wipe_key_cache():
+    """进程退出时清零缓存的密钥"""
+    if _key_cache is not None:
+        _key_cache.wipe()
@@ -0,0 +1,209 @@
+# player/crypto/parallel_engine.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional
+from ..exceptions.custom_exceptions import CryptoError
+
+
+def _process_segment(encryptor, key: bytes, params: dict, offset: int, data: bytes) -> bytes:
+    """进程池工作函数：把密钥流定位到offset后处理一个分段"""
+    return encryptor.create_cipher_at(key, offset, **params).encrypt(data)
+
+
+class ParallelCipherEngine:
+    """
+    多核并行流密码引擎
+
+    CTR模式和ChaCha20的密钥流可以按位置独立计算：把数据切成大段，
+    每段把计数器定位到段起点后分别在线程池或进程池中处理，
+    结果与单个cipher从头处理整个数据逐字节一致。
+    """
+
+    DEFAULT_SEGMENT_SIZE = 2 * 1024 * 1024
+    EXECUTORS = ("thread", "process")
+
+    def __init__(self, workers: int = 0, segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 executor: str = "thread"):
+        """
+        初始化并行引擎
+
+        Args:
+            workers: 工作线程/进程数（0表示使用CPU核心数）
+            segment_size: 每个分段的大小
+            executor: 执行器类型（thread或process）
+
+        Raises:
+            CryptoError: 参数无效
+        """
+        if executor not in self.EXECUTORS:
+            raise CryptoError(f"不支持的执行器类型: {executor}")
+        if segment_size <= 0:
+            raise CryptoError(f"分段大小必须为正数: {segment_size}")
+
+        self.workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+        self.segment_size = segment_size
+        self.executor = executor
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def batch_size(self) -> int:
+        """一次能让所有工作者同时处理的数据量"""
+        return self.workers * self.segment_size
+
+    def should_parallelize(self, size: int) -> bool:
+        """数据量是否值得拆分并行处理"""
+        return self.workers > 1 and size > self.segment_size
+
+    def process(self, encryptor, data: bytes, key: bytes, offset: int = 0, **params) -> bytes:
+        """
+        对数据做流密码变换（加密与解密是同一个操作）
+
+        Args:
+            encryptor: 支持定位的加密算法实例
+            data: 输入数据
+            key: 密钥
+            offset: data在整个密钥流中的起始位置
+            **params: 算法参数（iv或nonce）
+
+        Returns:
+            处理后的数据（与输入等长）
+
+        Raises:
+            CryptoError: 算法不支持定位
+        """
+        if not encryptor.is_seekable():
+            raise CryptoError(f"{encryptor.get_algorithm_name()} 不支持并行处理",
+                              algorithm=encryptor.get_algorithm_name())
+
+        total = len(data)
+        if not self.should_parallelize(total):
+            return encryptor.create_cipher_at(key, offset, **params).encrypt(data)
+
+        view = memoryview(data)
+        bounds = [(start, min(start + self.segment_size, total))
+                  for start in range(0, total, self.segment_size)]
+        pool = self._get_pool()
+
+        if self.executor == "process":
+            futures = [pool.submit(_process_segment, encryptor, key, params, offset + start,
+                                   bytes(view[start:end]))
+                       for start, end in bounds]
+            return b''.join(future.result() for future in futures)
+
+        # 线程池：各分段直接写入共享输出缓冲区的对应位置
+        output = bytearray(total)
+        output_view = memoryview(output)
+
+        def run(start: int, end: int):
+            cipher = encryptor.create_cipher_at(key, offset + start, **params)
+            cipher.encrypt(view[start:end], output=output_view[start:end])
+
+        futures = [pool.submit(run, start, end) for start, end in bounds]
+        for future in futures:
+            future.result()
+        return bytes(output)
+
+    def _get_pool(self):
+        """按需创建并复用执行器"""
+        with self._lock:
+            if self._pool is None:
+                if self.executor == "process":
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix="cipher")
+            return self._pool
+
+    def shutdown(self):
+        """关闭执行器"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+class SeekableStream:
+    """
+    基于可定位流密码的流式处理上下文
+
+    小块数据复用同一个cipher顺序处理；遇到大块数据时交给并行引擎，
+    之后再把cipher重新定位到当前位置。
+    """
+
+    def __init__(self, encryptor, key: bytes, params: dict,
+                 engine: Optional[ParallelCipherEngine] = None):
+        self.encryptor = encryptor
+        self.key = key
+        self.params = params
+        self.engine = engine or get_default_engine()
+        self.position = 0
+        self.cipher = None
+
+    def update(self, data: bytes) -> bytes:
+        if self.engine.should_parallelize(len(data)):
+            output = self.engine.process(self.encryptor, data, self.key,
+                                         offset=self.position, **self.params)
+            self.cipher = None
+        else:
+            if self.cipher is None:
+                self.cipher = self.encryptor.create_cipher_at(self.key, self.position, **self.params)
+            output = self.cipher.encrypt(data)
+
+        self.position += len(data)
+        return output
+
+    def finalize(self) -> bytes:
+        return b''
+
+
+_default_engine: Optional[ParallelCipherEngine] = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_engine() -> ParallelCipherEngine:
+    """
+    获取进程内共享的并行引擎（首次使用时按配置文件创建）
+
+    Returns:
+        并行引擎实例
+    """
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            # 只在配置文件存在时读取，避免在当前目录生成默认配置
+            from ..config.config_manager import ConfigManager
+            config_manager = ConfigManager()
+            config = {}
+            if os.path.exists(config_manager.config_file):
+                config = config_manager.get_cipher_engine_config()
+            _default_engine = ParallelCipherEngine(
+                workers=config.get("workers", 0),
+                segment_size=config.get("segment_size", ParallelCipherEngine.DEFAULT_SEGMENT_SIZE),
+                executor=config.get("executor", "thread")
+            )
+        return _default_engine
+
+
+def configure_default_engine(workers: int = 0,
+                             segment_size: int = ParallelCipherEngine.DEFAULT_SEGMENT_SIZE,
+                             executor: str = "thread") -> ParallelCipherEngine:
+    """
+    替换进程内共享的并行引擎（例如命令行指定了工作线程数）
+
+    Args:
+        workers: 工作线程/进程数（0表示使用CPU核心数，1表示单线程）
+        segment_size: 每个分段的大小
+        executor: 执行器类型（thread或process）
+
+    Returns:
+        新的并行引擎实例
+    """
+    global _default_engine
+    engine = ParallelCipherEngine(workers, segment_size, executor)
+    with _default_engine_lock:
+        previous, _default_engine = _default_engine, engine
+    if previous is not None:
+        previous.shutdown()
+    return engine
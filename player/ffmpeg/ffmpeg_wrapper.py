@@ -1,77 +1,60 @@
 # player/ffmpeg/ffmpeg_wrapper.py
 import subprocess
 import os
+import queue
 import tempfile
-from typing import Dict, Optional, List
+import threading
+import time
+from typing import Dict, Optional, List, Iterable, Iterator
 from ..exceptions.custom_exceptions import FFmpegError
+from .probe_cache import get_probe_cache
+from .toolchain import FFmpegToolchain, get_ffmpeg_toolchain
 
 
 class FFmpegWrapper:
     """FFmpeg封装器"""
     
-    def __init__(self, ffmpeg_path: str = None, ffprobe_path: str = None):
+    # 文本提示视频的样式和编码参数（同时作为提示视频缓存键的一部分）
+    NOTICE_STYLE = {
+        'width': 1280,
+        'height': 720,
+        'font': 'sans-serif',
+        'font_size': 36,
+        'codec': 'libx264',
+        'preset': 'fast',
+        'crf': 23
+    }
+    
+    def __init__(self, ffmpeg_path: str = None, ffprobe_path: str = None,
+                 ffplay_path: str = None, toolchain: 'FFmpegToolchain' = None):
         """
         初始化FFmpeg封装器
         
+        未指定任何路径时使用进程内共享的工具链（只检测、验证一次）；
+        需要共享的实例时使用 get_ffmpeg_wrapper()。
+        
         Args:
             ffmpeg_path: ffmpeg可执行文件路径（None表示自动检测）
             ffprobe_path: ffprobe可执行文件路径（None表示自动检测）
-        """
-        # 自动检测FFmpeg路径
-        self.ffmpeg_path = self._detect_ffmpeg_path(ffmpeg_path, 'ffmpeg', 'ffmpeg.exe')
-        self.ffprobe_path = self._detect_ffmpeg_path(ffprobe_path, 'ffprobe', 'ffprobe.exe')
-        
-        # 验证FFmpeg是否可用
-        self._verify_ffmpeg()
-    
-    def _detect_ffmpeg_path(self, provided_path: str = None, 
-                           binary_name: str = "ffmpeg", 
-                           windows_binary: str = "ffmpeg.exe") -> str:
-        """
-        自动检测FFmpeg可执行文件路径
-        
-        优先级：
-        1. 用户提供的路径
-        2. 内置FFmpeg（player/ffmpeg/bin/）
-        3. 系统PATH中的命令
-        
-        Args:
-            provided_path: 用户提供的路径
-            binary_name: Linux/macOS二进制名称
-            windows_binary: Windows可执行文件名
+            ffplay_path: ffplay可执行文件路径（None表示自动检测）
+            toolchain: 已检测的工具链（指定时忽略上面的路径）
             
-        Returns:
-            检测到的FFmpeg路径
+        Raises:
+            FFmpegError: FFmpeg不可用
         """
-        import sys
-        
-        # 1. 如果用户提供了路径，优先使用
-        if provided_path:
-            return provided_path
-        
-        # 2. 检查内置FFmpeg（仅Windows）
-        if sys.platform == 'win32':
-            # 获取player/ffmpeg/bin/目录的绝对路径
-            current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            builtin_ffmpeg_dir = os.path.join(current_dir, 'ffmpeg', 'bin')
-            builtin_ffmpeg = os.path.join(builtin_ffmpeg_dir, windows_binary)
-            
-            if os.path.exists(builtin_ffmpeg):
-                print(f"  ✓ 使用内置FFmpeg: {builtin_ffmpeg}")
-                return builtin_ffmpeg
+        if toolchain is None:
+            if ffmpeg_path or ffprobe_path or ffplay_path:
+                toolchain = FFmpegToolchain(ffmpeg_path, ffprobe_path, ffplay_path).verify()
             else:
-                print(f"  未找到内置FFmpeg: {builtin_ffmpeg}")
+                toolchain = get_ffmpeg_toolchain()
         
-        # 3. 使用系统PATH中的命令
-        return binary_name
-    
-    def _verify_ffmpeg(self):
-        """验证FFmpeg是否可用"""
-        try:
-            subprocess.run([self.ffmpeg_path, '-version'], 
-                          capture_output=True, check=True)
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            raise FFmpegError(f"FFmpeg不可用，请确保 {self.ffmpeg_path} 在PATH中")
+        self.toolchain = toolchain
+        self.ffmpeg_path = toolchain.ffmpeg_path
+        self.ffprobe_path = toolchain.ffprobe_path
+        self.ffplay_path = toolchain.ffplay_path
+        
+        # 最近一次播放的统计（流式播放时包含首帧时间）
+        self.last_play_stats = {}
     
     def extract_video_stream(self, input_path: str, output_path: str, 
                             codec: str = "copy") -> bool:
@@ -97,6 +80,7 @@ class FFmpegWrapper:
             '-c:v', codec,
             '-c:a', 'copy',  # 保留音频
             '-f', 'mp4',  # 使用MP4容器格式以支持视频和音频
+            '-movflags', '+faststart',  # moov放在文件开头，解密后可直接通过管道播放
             output_path,
             '-y'  # 覆盖输出文件
         ]
@@ -113,7 +97,105 @@ class FFmpegWrapper:
                 exit_code=e.returncode
             )
     
-    def generate_notice_video(self, assets: Dict, output_path: str, 
+    def iter_video_stream(self, input_path: str, chunk_size: int = 4 * 1024 * 1024,
+                          codec: str = "copy", read_ahead: int = 2) -> Iterator[bytes]:
+        """
+        重封装视频并从管道分块读取，不生成中间MP4文件
+        
+        管道输出无法回写moov，因此使用分片MP4（moov在开头，同样可以通过管道播放）。
+        后台线程最多预读read_ahead块，FFmpeg重封装与调用方的加密、写入同时进行，
+        内存占用约为 (read_ahead + 1) * chunk_size。
+        
+        Args:
+            input_path: 输入视频路径
+            chunk_size: 每次读取的字节数
+            codec: 视频编码器（copy表示复制，不重新编码）
+            read_ahead: 预读的块数
+            
+        Yields:
+            重封装后的MP4数据块
+            
+        Raises:
+            FFmpegError: FFmpeg执行失败
+        """
+        cmd = [
+            self.ffmpeg_path,
+            '-nostdin',
+            '-v', 'error',
+            '-i', input_path,
+            '-c:v', codec,
+            '-c:a', 'copy',  # 保留音频
+            '-f', 'mp4',
+            '-movflags', 'frag_keyframe+empty_moov+delay_moov+default_base_moof',
+            'pipe:1'
+        ]
+        
+        # 错误输出写入临时文件，避免stderr管道写满阻塞FFmpeg
+        stderr_file = tempfile.TemporaryFile()
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+        except OSError as e:
+            stderr_file.close()
+            raise FFmpegError(f"无法启动FFmpeg: {e}", command=" ".join(cmd))
+        self._enlarge_pipe(process.stdout.fileno())
+        
+        chunks: 'queue.Queue[Optional[bytes]]' = queue.Queue(maxsize=max(1, read_ahead))
+        stop = threading.Event()
+        
+        def read():
+            try:
+                while not stop.is_set():
+                    chunk = process.stdout.read(chunk_size)
+                    if not chunk:
+                        break
+                    chunks.put(chunk)
+            except (OSError, ValueError):
+                pass
+            finally:
+                chunks.put(None)
+        
+        reader = threading.Thread(target=read, name="ffmpeg-remux-reader", daemon=True)
+        reader.start()
+        
+        completed = False
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+            
+            exit_code = process.wait()
+            if exit_code != 0:
+                stderr_file.seek(0)
+                message = stderr_file.read().decode('utf-8', errors='ignore').strip()
+                raise FFmpegError(f"提取视频流失败: {message}", command=" ".join(cmd),
+                                  exit_code=exit_code)
+            completed = True
+        finally:
+            # 调用方提前停止（如写入失败）时结束FFmpeg
+            stop.set()
+            if not completed and process.poll() is None:
+                process.kill()
+            while reader.is_alive():
+                try:
+                    chunks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            process.wait()
+            process.stdout.close()
+            stderr_file.close()
+    
+    @staticmethod
+    def _enlarge_pipe(fd: int, size: int = 1024 * 1024):
+        """增大管道缓冲区（仅Linux），减少大块读写时的进程切换"""
+        try:
+            import fcntl
+            fcntl.fcntl(fd, getattr(fcntl, 'F_SETPIPE_SZ', 1031), size)
+        except (ImportError, OSError):
+            pass
+    
+    def generate_notice_video(self, assets: Dict, output_path: str,
                              duration: int = 10) -> bool:
         """
         生成提示视频
@@ -160,9 +242,10 @@ class FFmpegWrapper:
         
         try:
             # 视频参数
-            width = 1280
-            height = 720
-            font_size = 36
+            style = self.NOTICE_STYLE
+            width = style['width']
+            height = style['height']
+            font_size = style['font_size']
             line_height = font_size + 20
             total_text_height = len(lines) * line_height
             start_y = (height - total_text_height) // 2 + font_size
@@ -178,7 +261,7 @@ class FFmpegWrapper:
                     # 添加阴影和边框效果
                     filter_text = (
                         f"drawtext="
-                        f"font='sans-serif':"
+                        f"font='{style['font']}':"
                         f"fontsize={font_size}:"
                         f"fontcolor=white:"
                         f"x=(w-text_w)/2:"
@@ -200,9 +283,9 @@ class FFmpegWrapper:
                 self.ffmpeg_path,
                 '-f', 'lavfi',
                 '-i', f'color=c=black:s={width}x{height}:d={duration}',
-                '-c:v', 'libx264',
-                '-preset', 'fast',
-                '-crf', '23',
+                '-c:v', style['codec'],
+                '-preset', style['preset'],
+                '-crf', str(style['crf']),
                 '-t', str(duration),
             ]
             
@@ -223,16 +306,21 @@ class FFmpegWrapper:
         except Exception as e:
             raise FFmpegError(f"生成提示视频失败: {str(e)}")
     
-    def play_video(self, video_path: str, title: str = None, 
-                  window_size: str = None, auto_fit: bool = True) -> bool:
+    def play_video(self, video_path: Optional[str], title: str = None, 
+                  window_size: str = None, auto_fit: bool = True,
+                  chunks: Optional[Iterable[bytes]] = None) -> bool:
         """
         播放视频
         
+        指定chunks时为管道模式：ffplay从pipe:0读取，由生产者线程把数据块
+        写入其标准输入，收到第一块数据后即可开始播放，数据不落盘。
+        
         Args:
-            video_path: 视频路径
+            video_path: 视频路径（管道模式下可为None）
             title: 窗口标题
             window_size: 窗口大小（如 "800x600"），如果指定则不使用自动缩放
-            auto_fit: 是否自动适应屏幕（默认True）
+            auto_fit: 是否自动适应屏幕（默认True，管道模式下无法预先获取分辨率）
+            chunks: 视频数据块迭代器（如解密后的数据流）
             
         Returns:
             是否成功
@@ -240,7 +328,10 @@ class FFmpegWrapper:
         import locale
         import sys
         
-        cmd = [self.ffmpeg_path, '-i', video_path]
+        # 共享实例上的统计只反映本次播放，文件模式不产生统计
+        self.last_play_stats = {}
+        stream_mode = chunks is not None
+        cmd = [self.ffplay_path, '-i', 'pipe:0' if stream_mode else video_path]
         
         if title:
             cmd.extend(['-window_title', title])
@@ -249,7 +340,7 @@ class FFmpegWrapper:
         screen_width, screen_height = self._get_screen_size()
         
         # 如果启用了自动适应且未指定窗口大小
-        if auto_fit and window_size is None and screen_width > 0 and screen_height > 0:
+        if auto_fit and not stream_mode and window_size is None and screen_width > 0 and screen_height > 0:
             # 获取视频信息
             try:
                 video_info = self.get_video_info(video_path)
@@ -273,8 +364,8 @@ class FFmpegWrapper:
         if window_size:
             cmd.extend(['-x', window_size.split('x')[0], '-y', window_size.split('x')[1]])
         
-        # 使用ffplay播放（假设ffplay可用）
-        cmd[0] = cmd[0].replace('ffmpeg', 'ffplay')
+        if stream_mode:
+            return self._play_pipe(cmd, chunks)
         
         try:
             # Windows下使用GBK编码处理输出
@@ -285,6 +376,78 @@ class FFmpegWrapper:
             print(f"播放视频失败: {e}")
             return False
     
+    def _play_pipe(self, cmd: List[str], chunks: Iterable[bytes]) -> bool:
+        """
+        管道模式播放：生产者线程写入ffplay标准输入，主线程读取ffplay状态输出
+        
+        首帧时间（TTFF）取ffplay第一次输出播放状态行（M-V/M-A/A-V）的时刻，
+        没有状态行时退化为第一块数据写入管道的时刻。
+        
+        Args:
+            cmd: ffplay命令行（输入为pipe:0）
+            chunks: 视频数据块迭代器
+            
+        Returns:
+            是否成功
+            
+        Raises:
+            Exception: 生产者产生数据时出错（如解密失败）
+        """
+        stats = {'ttff': None, 'first_chunk': None, 'bytes': 0}
+        self.last_play_stats = stats
+        errors = []
+        start = time.perf_counter()
+        
+        try:
+            process = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except Exception as e:
+            print(f"播放视频失败: {e}")
+            return False
+        
+        def produce():
+            try:
+                for chunk in chunks:
+                    process.stdin.write(chunk)
+                    if stats['first_chunk'] is None:
+                        stats['first_chunk'] = time.perf_counter() - start
+                    stats['bytes'] += len(chunk)
+            except (BrokenPipeError, OSError):
+                pass  # 播放器已关闭，停止生产
+            except Exception as e:
+                errors.append(e)
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+        
+        producer = threading.Thread(target=produce, name="ffplay-producer", daemon=True)
+        producer.start()
+        
+        # 状态行以\r结尾，按块读取并查找首个播放状态
+        tail = b''
+        while True:
+            data = process.stderr.read1(4096)
+            if not data:
+                break
+            if stats['ttff'] is None:
+                tail = (tail + data)[-64:]
+                if b'M-V:' in tail or b'M-A:' in tail or b'A-V:' in tail:
+                    stats['ttff'] = time.perf_counter() - start
+        
+        returncode = process.wait()
+        producer.join()
+        
+        if stats['ttff'] is None:
+            stats['ttff'] = stats['first_chunk']
+        if stats['ttff'] is not None:
+            print(f"  首帧时间(TTFF): {stats['ttff'] * 1000:.0f} ms")
+        
+        if errors:
+            raise errors[0]
+        return returncode == 0
+    
     def _get_screen_size(self) -> tuple:
         """
         获取屏幕分辨率
@@ -394,7 +557,7 @@ class FFmpegWrapper:
     
     def get_video_info(self, video_path: str) -> Dict:
         """
-        获取视频信息
+        获取视频信息（文件未修改时使用缓存的ffprobe结果）
         
         Args:
             video_path: 视频路径
@@ -402,6 +565,20 @@ class FFmpegWrapper:
         Returns:
             视频信息字典
         """
+        return get_probe_cache().get(video_path, self._probe)
+    
+    def _probe(self, video_path: str) -> Dict:
+        """获取视频信息：MP4优先直接解析box，无法解析时运行ffprobe"""
+        from ..utils.video_utils import MP4BoxReader
+        
+        if os.path.isfile(video_path):
+            info = MP4BoxReader(video_path).read_info()
+            if info is not None:
+                return info
+        return self._run_ffprobe(video_path)
+    
+    def _run_ffprobe(self, video_path: str) -> Dict:
+        """运行ffprobe获取视频信息"""
         import json
         import sys
         
@@ -0,0 +1,164 @@
+# player/ffmpeg/notice_cache.py
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Dict, Any, Optional
+from .probe_cache import default_cache_dir
+
+
+class NoticeCache:
+    """
+    默认提示视频缓存（按内容寻址）
+
+    以 (提示文本, 时长, 分辨率/字体等样式, FFmpeg版本) 的哈希作为文件名保存生成的提示视频，
+    同一批次以及之后的批次中提示文本不变时不再重复编码。目录总大小超过上限时按最近使用时间
+    （命中时更新文件修改时间）淘汰。多个进程可以共享同一个目录：写入先生成临时文件再原子重命名。
+    """
+
+    DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_size: 缓存目录的总字节数上限（0表示禁用缓存）
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max(0, max_size)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(text: str, duration: int, style: Dict[str, Any], ffmpeg_version: Optional[str]) -> str:
+        """
+        计算缓存键
+
+        Args:
+            text: 提示文本
+            duration: 时长（秒）
+            style: 分辨率、字体、编码参数等
+            ffmpeg_version: FFmpeg版本（升级FFmpeg后重新生成）
+
+        Returns:
+            十六进制哈希
+        """
+        material = json.dumps({
+            'text': text,
+            'duration': duration,
+            'style': style,
+            'ffmpeg': ffmpeg_version or ''
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get_or_create(self, key: str, create: Callable[[str], None]) -> Optional[str]:
+        """
+        获取缓存的提示视频，不存在时调用create生成
+
+        Args:
+            key: 缓存键
+            create: 生成函数，参数为输出路径（.mp4）
+
+        Returns:
+            缓存文件路径（调用方不得删除），缓存禁用或目录不可写时返回None
+
+        Raises:
+            VideoEncryptionError: 生成失败（create抛出的异常原样传递）
+        """
+        if not self.enabled:
+            return None
+
+        path = os.path.join(self.cache_dir, f"{key}.mp4")
+        with self._lock:
+            if os.path.isfile(path):
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                self.hits += 1
+                return path
+
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            except OSError:
+                return None
+
+            self.misses += 1
+            temp_path = os.path.join(self.cache_dir, f"{key}.{os.getpid()}.tmp.mp4")
+            try:
+                create(temp_path)
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+            self._evict(keep=path)
+            return path
+
+    def _evict(self, keep: str):
+        """目录超过上限时删除最久未使用的提示视频（不删除刚写入的文件）"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.mp4') or '.tmp.' in name:
+                continue
+            entry_path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if entry_path == keep:
+                continue
+            try:
+                os.remove(entry_path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            统计信息字典（命中、未命中、缓存目录）
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'cache_dir': self.cache_dir}
+
+
+_notice_cache: Optional[NoticeCache] = None
+_notice_cache_lock = threading.Lock()
+
+
+def get_notice_cache() -> NoticeCache:
+    """
+    获取进程内共享的提示视频缓存
+
+    Returns:
+        缓存实例
+    """
+    global _notice_cache
+    with _notice_cache_lock:
+        if _notice_cache is None:
+            # 只在配置文件存在时读取，避免在当前目录生成默认配置
+            from ..config.config_manager import ConfigManager
+            config_manager = ConfigManager()
+            config = {}
+            if os.path.exists(config_manager.config_file):
+                config = config_manager.get_notice_cache_config()
+            _notice_cache = NoticeCache(
+                cache_dir=config.get("path") or os.path.join(default_cache_dir(), "notices"),
+                max_size=config.get("max_mb", NoticeCache.DEFAULT_MAX_SIZE // (1024 * 1024)) * 1024 * 1024
+            )
+        return _notice_cache
@@ -0,0 +1,229 @@
+# player/ffmpeg/probe_cache.py
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional, Tuple
+
+
+class ProbeCache:
+    """
+    ffprobe结果缓存（内存LRU + SQLite持久化）
+
+    以 (真实路径, 大小, 修改时间) 为键，文件被修改或替换后自动失效；
+    同一个媒体库重复扫描时不再启动ffprobe。数据库超过条目上限时按最近使用时间淘汰。
+    只缓存成功的结果；URL、内存文件等无法stat的路径直接调用ffprobe。
+    """
+
+    DEFAULT_MAX_ENTRIES = 4096
+    MEMORY_ENTRIES = 256
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        初始化缓存
+
+        Args:
+            db_path: SQLite数据库路径（None表示只使用内存缓存）
+            max_entries: 数据库中最多保存的条目数（0表示禁用缓存）
+        """
+        self.db_path = db_path
+        self.max_entries = max(0, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._memory: 'OrderedDict[Tuple, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = self._open_db(db_path) if db_path and self.max_entries else None
+
+    @staticmethod
+    def _open_db(db_path: str) -> Optional[sqlite3.Connection]:
+        """打开数据库，失败时（如目录不可写）退回只使用内存缓存"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            db = sqlite3.connect(db_path, timeout=5, check_same_thread=False,
+                                 isolation_level=None)
+            # WAL + NORMAL：提交时不fsync，命中时更新使用时间的开销可以忽略
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS probe (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    info TEXT NOT NULL,
+                    last_used REAL NOT NULL
+                )""")
+            db.execute("CREATE INDEX IF NOT EXISTS probe_last_used ON probe(last_used)")
+            return db
+        except (OSError, sqlite3.Error):
+            return None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(video_path: str) -> Optional[Tuple]:
+        """
+        生成缓存键
+
+        Args:
+            video_path: 媒体文件路径
+
+        Returns:
+            (真实路径, 大小, 修改时间)，不是普通文件时返回None
+        """
+        from ..utils.file_utils import FileUtils
+
+        if FileUtils.is_memory_file(video_path):
+            return None
+        try:
+            real_path = os.path.realpath(video_path)
+            stat = os.stat(real_path)
+        except (OSError, ValueError):
+            return None
+        if not os.path.isfile(real_path):
+            return None
+        return real_path, stat.st_size, stat.st_mtime_ns
+
+    def get(self, video_path: str, probe: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        获取媒体信息，未命中时调用probe并缓存结果
+
+        Args:
+            video_path: 媒体文件路径
+            probe: 实际执行ffprobe的函数
+
+        Returns:
+            媒体信息字典（每次返回新的副本）
+
+        Raises:
+            FFmpegError: probe失败（失败结果不缓存）
+        """
+        key = self.make_key(video_path) if self.enabled else None
+        if key is None:
+            return probe(video_path)
+
+        text = self._lookup(key)
+        if text is not None:
+            return json.loads(text)
+
+        info = probe(video_path)
+        self._store(key, json.dumps(info, ensure_ascii=False))
+        return info
+
+    def _lookup(self, key: Tuple) -> Optional[str]:
+        """按键查找（先内存后数据库）"""
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return text
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT info FROM probe WHERE path = ? AND size = ? AND mtime_ns = ?",
+                        key).fetchone()
+                    if row is not None:
+                        self._db.execute("UPDATE probe SET last_used = ? WHERE path = ?",
+                                         (time.time(), key[0]))
+                        self._remember(key, row[0])
+                        self.hits += 1
+                        return row[0]
+                except sqlite3.Error:
+                    pass
+
+            self.misses += 1
+            return None
+
+    def _store(self, key: Tuple, text: str):
+        """写入内存和数据库（同一路径的旧结果被替换），超出上限时淘汰最久未使用的条目"""
+        with self._lock:
+            self._remember(key, text)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO probe (path, size, mtime_ns, info, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)", key + (text, time.time()))
+                count = self._db.execute("SELECT COUNT(*) FROM probe").fetchone()[0]
+                if count > self.max_entries:
+                    self._db.execute(
+                        "DELETE FROM probe WHERE path IN "
+                        "(SELECT path FROM probe ORDER BY last_used LIMIT ?)",
+                        (count - self.max_entries,))
+            except sqlite3.Error:
+                pass
+
+    def _remember(self, key: Tuple, text: str):
+        """加入内存缓存（调用方持有锁）"""
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > min(self.MEMORY_ENTRIES, self.max_entries):
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """清空内存和数据库中的缓存"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM probe")
+                except sqlite3.Error:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            统计信息字典（命中、未命中、数据库路径）
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'db_path': self.db_path if self._db is not None else None}
+
+
+def default_cache_dir() -> str:
+    """
+    用户缓存目录（Windows为%LOCALAPPDATA%\\CryptoPlayer，其他平台为$XDG_CACHE_HOME/cryptoplayer）
+
+    Returns:
+        目录路径
+    """
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+        return os.path.join(base, 'CryptoPlayer')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'cryptoplayer')
+
+
+_probe_cache: Optional[ProbeCache] = None
+_probe_cache_lock = threading.Lock()
+
+
+def get_probe_cache() -> ProbeCache:
+    """
+    获取进程内共享的ffprobe结果缓存
+
+    Returns:
+        缓存实例
+    """
+    global _probe_cache
+    with _probe_cache_lock:
+        if _probe_cache is None:
+            # 只在配置文件存在时读取，避免在当前目录生成默认配置
+            from ..config.config_manager import ConfigManager
+            config_manager = ConfigManager()
+            config = {}
+            if os.path.exists(config_manager.config_file):
+                config = config_manager.get_probe_cache_config()
+            _probe_cache = ProbeCache(
+                db_path=config.get("path") or os.path.join(default_cache_dir(), "probe_cache.sqlite3"),
+                max_entries=config.get("max_entries", ProbeCache.DEFAULT_MAX_ENTRIES)
+            )
+        return _probe_cache
@@ -0,0 +1,182 @@
+# player/ffmpeg/toolchain.py
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from typing import Dict, Optional
+from ..exceptions.custom_exceptions import FFmpegError
+
+
+class FFmpegToolchain:
+    """
+    FFmpeg工具链（ffmpeg/ffprobe/ffplay）
+
+    负责检测三个可执行文件的路径并验证ffmpeg可用。进程内通过get_ffmpeg_toolchain()
+    共享一个实例，检测和验证（启动一次 ffmpeg -version）只做一次。
+    """
+
+    BINARIES = ("ffmpeg", "ffprobe", "ffplay")
+
+    def __init__(self, ffmpeg_path: str = None, ffprobe_path: str = None,
+                 ffplay_path: str = None):
+        """
+        检测工具链路径
+
+        Args:
+            ffmpeg_path: ffmpeg可执行文件路径（None表示自动检测）
+            ffprobe_path: ffprobe可执行文件路径（None表示自动检测）
+            ffplay_path: ffplay可执行文件路径（None表示自动检测）
+        """
+        provided = {"ffmpeg": ffmpeg_path, "ffprobe": ffprobe_path, "ffplay": ffplay_path}
+        self.paths: Dict[str, str] = {
+            name: self._detect_path(provided[name], name) for name in self.BINARIES
+        }
+        self.version: Optional[str] = None
+        self._verified = False
+        self._lock = threading.Lock()
+
+    @property
+    def ffmpeg_path(self) -> str:
+        return self.paths["ffmpeg"]
+
+    @property
+    def ffprobe_path(self) -> str:
+        return self.paths["ffprobe"]
+
+    @property
+    def ffplay_path(self) -> str:
+        return self.paths["ffplay"]
+
+    @staticmethod
+    def _detect_path(provided_path: Optional[str], binary_name: str) -> str:
+        """
+        自动检测可执行文件路径
+
+        优先级：
+        1. 用户提供的路径（config.json中的非默认值）
+        2. 内置FFmpeg（player/ffmpeg/bin/，仅Windows）
+        3. 系统PATH中的命令
+
+        Args:
+            provided_path: 用户提供的路径
+            binary_name: 可执行文件名（不含扩展名）
+
+        Returns:
+            检测到的路径
+        """
+        if provided_path and provided_path != binary_name:
+            return provided_path
+
+        if sys.platform == 'win32':
+            builtin_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bin')
+            builtin = os.path.join(builtin_dir, binary_name + '.exe')
+            if os.path.exists(builtin):
+                print(f"  ✓ 使用内置{binary_name}: {builtin}")
+                return builtin
+            print(f"  未找到内置{binary_name}: {builtin}")
+
+        return binary_name
+
+    def is_available(self, binary_name: str) -> bool:
+        """
+        检查可执行文件是否存在（不启动进程）
+
+        Args:
+            binary_name: ffmpeg/ffprobe/ffplay
+
+        Returns:
+            是否可用
+        """
+        return shutil.which(self.paths[binary_name]) is not None
+
+    def verify(self) -> 'FFmpegToolchain':
+        """
+        验证ffmpeg可用（只在第一次调用时启动 ffmpeg -version）
+
+        Returns:
+            工具链本身
+
+        Raises:
+            FFmpegError: ffmpeg不可用
+        """
+        with self._lock:
+            if not self._verified:
+                try:
+                    result = subprocess.run([self.ffmpeg_path, '-version'],
+                                            capture_output=True, check=True)
+                except (subprocess.CalledProcessError, FileNotFoundError):
+                    raise FFmpegError(f"FFmpeg不可用，请确保 {self.ffmpeg_path} 在PATH中")
+                first_line = result.stdout.decode('utf-8', errors='ignore').split('\n', 1)[0]
+                self.version = first_line.strip()
+                self._verified = True
+        return self
+
+    def require(self, binary_name: str) -> str:
+        """
+        获取可执行文件路径，不存在时报错
+
+        Args:
+            binary_name: ffmpeg/ffprobe/ffplay
+
+        Returns:
+            路径
+
+        Raises:
+            FFmpegError: 可执行文件不存在
+        """
+        if binary_name == "ffmpeg":
+            self.verify()
+        elif not self.is_available(binary_name):
+            raise FFmpegError(f"{binary_name}不可用，请确保 {self.paths[binary_name]} 在PATH中")
+        return self.paths[binary_name]
+
+
+_toolchain: Optional[FFmpegToolchain] = None
+_wrapper = None
+_toolchain_lock = threading.Lock()
+
+
+def get_ffmpeg_toolchain() -> FFmpegToolchain:
+    """
+    获取进程内共享的FFmpeg工具链（首次调用时检测路径并验证ffmpeg）
+
+    Returns:
+        已验证的工具链
+
+    Raises:
+        FFmpegError: ffmpeg不可用
+    """
+    global _toolchain
+    with _toolchain_lock:
+        if _toolchain is None:
+            # 只在配置文件存在时读取，避免在当前目录生成默认配置
+            from ..config.config_manager import ConfigManager
+            config_manager = ConfigManager()
+            paths = {}
+            if os.path.exists(config_manager.config_file):
+                paths = config_manager.load_config().get("ffmpeg", {})
+            _toolchain = FFmpegToolchain(paths.get("ffmpeg_path"),
+                                         paths.get("ffprobe_path"),
+                                         paths.get("ffplay_path"))
+        toolchain = _toolchain
+    return toolchain.verify()
+
+
+def get_ffmpeg_wrapper():
+    """
+    获取进程内共享的FFmpegWrapper实例
+
+    Returns:
+        FFmpegWrapper
+
+    Raises:
+        FFmpegError: ffmpeg不可用
+    """
+    global _wrapper
+    toolchain = get_ffmpeg_toolchain()
+    with _toolchain_lock:
+        if _wrapper is None:
+            from .ffmpeg_wrapper import FFmpegWrapper
+            _wrapper = FFmpegWrapper(toolchain=toolchain)
+        return _wrapper
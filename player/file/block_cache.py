@@ -0,0 +1,138 @@
+# player/file/block_cache.py
+import threading
+from collections import OrderedDict
+from typing import Dict, Any
+from ..exceptions.custom_exceptions import CryptoError
+
+
+class DecryptedBlockCache:
+    """
+    按块随机访问解密视频流（带LRU块缓存，线程安全）
+
+    明文视频流被划分为固定大小的块，读取时只解密覆盖请求范围的块，
+    最近使用的块保留在内存中。底层使用算法的decrypt_range：
+    CTR/ChaCha20直接定位计数器，CBC借用前一个密文块作为IV。
+    """
+
+    DEFAULT_BLOCK_SIZE = 1024 * 1024
+    DEFAULT_MAX_BLOCKS = 32
+
+    def __init__(self, encrypted_file, crypto_algorithm, key: bytes, cipher_params: Dict[str, Any],
+                 block_size: int = DEFAULT_BLOCK_SIZE, max_blocks: int = DEFAULT_MAX_BLOCKS):
+        """
+        初始化块缓存
+
+        Args:
+            encrypted_file: 已载入文件头的EncryptedVideoFile（惰性模式）
+            crypto_algorithm: 加密算法实例（需支持随机访问）
+            key: 解密密钥
+            cipher_params: 算法参数（iv或nonce）
+            block_size: 块大小
+            max_blocks: 最多缓存的块数
+
+        Raises:
+            CryptoError: 参数无效或算法不支持随机访问
+        """
+        if block_size <= 0 or block_size % 16 != 0:
+            raise CryptoError(f"块大小必须是16的正整数倍: {block_size}")
+        if not crypto_algorithm.supports_random_access():
+            raise CryptoError(f"{crypto_algorithm.get_algorithm_name()} 不支持随机访问解密",
+                              algorithm=crypto_algorithm.get_algorithm_name())
+
+        self.encrypted_file = encrypted_file
+        self.crypto_algorithm = crypto_algorithm
+        self.key = key
+        self.cipher_params = cipher_params
+        self.block_size = block_size
+        self.max_blocks = max(1, max_blocks)
+        self.hits = 0
+        self.misses = 0
+        self._blocks: 'OrderedDict[int, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = self._plain_size()
+
+    def _plain_size(self) -> int:
+        """明文大小（CBC需要解密最后一块才能知道填充长度）"""
+        total = self.encrypted_file.encrypted_size
+        if self.crypto_algorithm.is_seekable() or total == 0:
+            return total
+        tail_offset = max(0, total - 16)
+        return tail_offset + len(self._decrypt(tail_offset, 16))
+
+    def _decrypt(self, offset: int, length: int) -> bytes:
+        """解密一段明文范围"""
+        return self.crypto_algorithm.decrypt_range(
+            self.encrypted_file.read_encrypted_range, self.key, offset, length,
+            self.encrypted_file.encrypted_size, **self.cipher_params
+        )
+
+    def get_block(self, index: int) -> bytes:
+        """
+        获取一个解密后的块
+
+        Args:
+            index: 块序号
+
+        Returns:
+            块数据（最后一块可能不足block_size）
+        """
+        with self._lock:
+            block = self._blocks.get(index)
+            if block is not None:
+                self._blocks.move_to_end(index)
+                self.hits += 1
+                return block
+            self.misses += 1
+
+        # 解密在锁外进行，多个请求可以同时解密不同的块
+        block = self._decrypt(index * self.block_size, self.block_size)
+
+        with self._lock:
+            self._blocks[index] = block
+            self._blocks.move_to_end(index)
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        return block
+
+    def read(self, offset: int, length: int) -> bytes:
+        """
+        读取明文中的一段数据
+
+        Args:
+            offset: 起始偏移
+            length: 读取长度（超出末尾的部分被截断）
+
+        Returns:
+            解密后的数据
+        """
+        end = min(self.size, offset + max(0, length))
+        if offset < 0 or offset >= end:
+            return b''
+
+        parts = []
+        for index in range(offset // self.block_size, (end - 1) // self.block_size + 1):
+            block_start = index * self.block_size
+            block = self.get_block(index)
+            parts.append(block[max(offset, block_start) - block_start:end - block_start])
+        return b''.join(parts)
+
+    def clear(self):
+        """清空缓存的块"""
+        with self._lock:
+            self._blocks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            统计信息字典（命中、未命中、当前块数、命中率）
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'blocks': len(self._blocks),
+                'hit_rate': self.hits / total if total else 0.0
+            }
@@ -0,0 +1,128 @@
+# player/file/decrypting_reader.py
+import io
+from .block_cache import DecryptedBlockCache
+
+
+class DecryptingReader(io.RawIOBase):
+    """
+    可定位的解密文件对象
+
+    把加密文件的视频流包装成普通的只读二进制文件：read/readinto/seek/tell
+    按需从磁盘读取并解密所需的块，最近使用的块保留在小型缓存中。
+    hashlib、zipfile、tarfile、shutil.copyfileobj等可以直接读取加密文件的内容，
+    不需要先解密到临时文件。
+
+    用法::
+
+        with DecryptingReader("lesson01.enc.mp4", password) as f:
+            header = f.read(16)
+            f.seek(-1024, io.SEEK_END)
+    """
+
+    DEFAULT_MAX_BLOCKS = 8
+
+    def __init__(self, encrypted_file_path: str, password: str,
+                 block_size: int = DecryptedBlockCache.DEFAULT_BLOCK_SIZE,
+                 max_blocks: int = DEFAULT_MAX_BLOCKS, decryptor=None):
+        """
+        打开加密文件（密钥只派生一次，错误密码在此处即被识别）
+
+        Args:
+            encrypted_file_path: 加密文件路径
+            password: 解密密码
+            block_size: 解密块大小（16的整数倍）
+            max_blocks: 最多缓存的块数
+            decryptor: 复用的Decryptor实例（None表示新建）
+
+        Raises:
+            FileFormatError: 文件格式错误
+            PasswordError: 密码错误
+            CryptoError: 算法不支持随机访问
+        """
+        super().__init__()
+        if decryptor is None:
+            from ..core.decryptor import Decryptor
+            decryptor = Decryptor()
+
+        self.name = encrypted_file_path
+        self._blocks = decryptor.open_decrypted_blocks(encrypted_file_path, password,
+                                                       block_size, max_blocks)
+        self._position = 0
+
+    @property
+    def size(self) -> int:
+        """解密后视频流的大小"""
+        return self._blocks.size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        """
+        读取数据到缓冲区
+
+        Args:
+            buffer: 可写缓冲区
+
+        Returns:
+            读取的字节数（0表示已到末尾）
+        """
+        self._check_closed()
+        view = memoryview(buffer).cast('B')
+        data = self._blocks.read(self._position, len(view))
+        view[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def readall(self) -> bytes:
+        """读取从当前位置到末尾的全部数据"""
+        self._check_closed()
+        data = self._blocks.read(self._position, self.size - self._position)
+        self._position += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """
+        移动读取位置
+
+        Args:
+            offset: 偏移
+            whence: 参照位置（SEEK_SET/SEEK_CUR/SEEK_END）
+
+        Returns:
+            新的位置
+
+        Raises:
+            ValueError: 位置无效
+        """
+        self._check_closed()
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"无效的whence: {whence}")
+
+        if position < 0:
+            raise ValueError(f"无效的位置: {position}")
+        self._position = position
+        return position
+
+    def tell(self) -> int:
+        self._check_closed()
+        return self._position
+
+    def close(self):
+        """关闭并清空缓存的明文块"""
+        if not self.closed:
+            self._blocks.clear()
+        super().close()
+
+    def _check_closed(self):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
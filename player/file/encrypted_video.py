@@ -1,27 +1,39 @@
 # player/file/encrypted_video.py
 import os
-from typing import Optional, Tuple
-from .file_header import FileHeader
-from ..exceptions.custom_exceptions import FileFormatError
+from typing import Optional, Tuple, Iterator, Iterable
+from .file_header import FileHeader, FileTrailer
+from ..exceptions.custom_exceptions import FileFormatError, VideoEncryptionError
 from ..utils.file_utils import FileUtils
 
 
 class EncryptedVideoFile:
     """加密视频文件"""
     
-    def __init__(self, file_path: str = None):
+    # 惰性模式下搜索文件头、读取分段时使用的块大小
+    CHUNK_SIZE = 1024 * 1024
+    
+    def __init__(self, file_path: str = None, lazy: bool = False):
         """
         初始化加密视频文件
         
         Args:
             file_path: 文件路径
+            lazy: 惰性模式，只记录各段偏移，不把文件内容读入内存
         """
         self.file_path = file_path
+        self.lazy = lazy
         self.header: Optional[FileHeader] = None
+        self.trailer: Optional[FileTrailer] = None
         self.notice_data: Optional[bytes] = None
         self.encrypted_data: Optional[bytes] = None
         self.file_size: int = 0
         
+        # 各段在文件中的位置（两种模式下都会记录）
+        self.notice_size: int = 0
+        self.header_offset: int = 0
+        self.encrypted_offset: int = 0
+        self.encrypted_size: int = 0
+        
         if file_path:
             self.load_file()
     
@@ -33,6 +45,7 @@ class EncryptedVideoFile:
         1. 提示段（完整MP4文件，通用播放器可播放）
         2. 文件头（包含加密信息和加密数据大小）
         3. 加密视频流数据
+        4. 索引尾（仅v2，记录文件头偏移和各段长度）
         
         Returns:
             是否成功
@@ -46,6 +59,13 @@ class EncryptedVideoFile:
         try:
             self.file_size = os.path.getsize(self.file_path)
             
+            # v2文件：通过索引尾直接定位文件头
+            if self._load_from_trailer():
+                return True
+            
+            if self.lazy:
+                return self._load_offsets()
+            
             with open(self.file_path, 'rb') as f:
                 # 读取整个文件到内存（用于搜索文件头位置）
                 file_data = f.read()
@@ -63,11 +83,14 @@ class EncryptedVideoFile:
             # 读取文件头
             header_data = file_data[header_pos:header_pos + FileHeader.HEADER_SIZE]
             self.header = FileHeader.from_bytes(header_data)
+            self._check_legacy_header()
             
             # 读取加密数据
             encrypted_data_start = header_pos + FileHeader.HEADER_SIZE
             self.encrypted_data = file_data[encrypted_data_start:]
             
+            self._set_offsets(header_pos, FileHeader.HEADER_SIZE, len(self.encrypted_data))
+            
             # 验证加密数据大小
             if self.header.encrypted_size > 0 and len(self.encrypted_data) != self.header.encrypted_size:
                 raise FileFormatError(
@@ -78,6 +101,117 @@ class EncryptedVideoFile:
         except Exception as e:
             raise FileFormatError(f"加载文件失败: {e}")
     
+    def _load_offsets(self) -> bool:
+        """
+        惰性加载：只读取文件头并记录各段偏移，内存占用与文件大小无关
+        
+        Returns:
+            是否成功
+        """
+        with open(self.file_path, 'rb') as f:
+            header_pos = self._find_header_offset(f)
+            if header_pos == -1:
+                raise FileFormatError("找不到有效的文件头标记")
+            
+            f.seek(header_pos)
+            self.header = FileHeader.from_bytes(f.read(FileHeader.HEADER_SIZE))
+            self._check_legacy_header()
+        
+        encrypted_size = self.file_size - header_pos - FileHeader.HEADER_SIZE
+        self._set_offsets(header_pos, FileHeader.HEADER_SIZE, encrypted_size)
+        
+        if self.header.encrypted_size > 0 and encrypted_size != self.header.encrypted_size:
+            raise FileFormatError(
+                f"加密数据大小不匹配: 期望 {self.header.encrypted_size}, 实际 {encrypted_size}"
+            )
+        
+        return True
+    
+    def _load_from_trailer(self) -> bool:
+        """
+        通过v2索引尾定位各段：一次seek到文件末尾读取索引尾，再读取一次文件头
+        
+        Returns:
+            是否为有效的v2文件（False时应按v1方式搜索文件头）
+        """
+        trailer_size = FileTrailer.TRAILER_SIZE
+        if self.file_size < FileHeader.HEADER_SIZE + trailer_size:
+            return False
+        
+        with open(self.file_path, 'rb') as f:
+            f.seek(-trailer_size, os.SEEK_END)
+            trailer = FileTrailer.from_bytes(f.read(trailer_size))
+            if trailer is None:
+                return False
+            
+            encrypted_offset = self.file_size - trailer_size - trailer.encrypted_size
+            header_size = encrypted_offset - trailer.header_offset
+            if header_size < FileHeader.HEADER_SIZE:
+                return False
+            
+            f.seek(trailer.header_offset)
+            header_data = f.read(header_size)
+            try:
+                header = FileHeader.from_bytes(header_data)
+            except FileFormatError:
+                return False
+            if header.version < FileHeader.VERSION_TRAILER or header.size != header_size:
+                return False
+            
+            if not self.lazy:
+                f.seek(0)
+                self.notice_data = f.read(trailer.notice_size)
+                f.seek(encrypted_offset)
+                self.encrypted_data = f.read(trailer.encrypted_size)
+        
+        self.header = header
+        self.trailer = trailer
+        self._set_offsets(trailer.header_offset, header_size, trailer.encrypted_size)
+        return True
+    
+    def _check_legacy_header(self):
+        """按v1方式搜索到的文件头不应是v2版本（v2文件必须带有效的索引尾）"""
+        if self.header.version >= FileHeader.VERSION_TRAILER:
+            raise FileFormatError(f"v{self.header.version}文件缺少有效的索引尾")
+    
+    def _find_header_offset(self, f) -> int:
+        """
+        分块搜索文件头魔数"ENCV"的位置（与一次性读取后find的结果一致）
+        
+        Args:
+            f: 已打开的文件对象
+            
+        Returns:
+            文件头偏移，找不到返回-1
+        """
+        magic_bytes = b'ENCV'
+        overlap = len(magic_bytes) - 1
+        tail = b''
+        position = 0  # tail起始位置在文件中的偏移
+        
+        f.seek(0)
+        while True:
+            chunk = f.read(self.CHUNK_SIZE)
+            if not chunk:
+                return -1
+            
+            window = tail + chunk
+            found = window.find(magic_bytes)
+            if found != -1:
+                return position + found
+            
+            # 保留末尾几个字节，防止魔数跨块
+            keep = min(overlap, len(window))
+            position += len(window) - keep
+            tail = window[len(window) - keep:]
+    
+    def _set_offsets(self, header_pos: int, header_size: int, encrypted_size: int):
+        """记录各段在文件中的位置"""
+        self.notice_size = header_pos
+        self.header_offset = header_pos
+        self.encrypted_offset = header_pos + header_size
+        self.encrypted_size = encrypted_size
+    
     def save_file(self, output_path: str) -> bool:
         """
         保存文件
@@ -86,6 +220,7 @@ class EncryptedVideoFile:
         1. 提示段（完整MP4文件，通用播放器可播放）
         2. 文件头（包含加密信息和加密数据大小）
         3. 加密视频流数据
+        4. 索引尾（仅v2）
         
         Args:
             output_path: 输出路径
@@ -109,11 +244,79 @@ class EncryptedVideoFile:
             if self.encrypted_data:
                 file_data += self.encrypted_data
             
+            # v2：在文件末尾写入索引尾
+            if self.header.version >= FileHeader.VERSION_TRAILER:
+                notice_size = len(self.notice_data) if self.notice_data else 0
+                self.trailer = FileTrailer(notice_size, notice_size, self.header.encrypted_size)
+                file_data += self.trailer.to_bytes()
+            
             return FileUtils.write_file_safe(output_path, file_data)
         except Exception as e:
             raise FileFormatError(f"保存文件失败: {e}")
     
-    def create_from_parts(self, notice_data: bytes, encrypted_data: bytes, 
+    def save_file_stream(self, output_path: str, encrypted_chunks: Iterable[bytes]) -> int:
+        """
+        流式保存文件：加密数据边产生边写入磁盘，不在内存中拼接整个文件
+        
+        先写入提示段和占位文件头，写完加密数据后再回填文件头中的加密数据大小。
+        写入过程使用临时文件，完成后原子替换目标文件。
+        
+        Args:
+            output_path: 输出路径
+            encrypted_chunks: 加密数据块迭代器
+            
+        Returns:
+            加密数据大小
+            
+        Raises:
+            FileFormatError: 保存失败
+        """
+        if not self.header:
+            raise FileFormatError("没有文件头，无法保存")
+        
+        temp_path = f"{output_path}.tmp"
+        try:
+            notice_size = len(self.notice_data) if self.notice_data else 0
+            
+            with open(temp_path, 'wb') as f:
+                if self.notice_data:
+                    f.write(self.notice_data)
+                
+                # 占位文件头（加密数据大小稍后回填，文件头长度不变）
+                f.write(self.header.to_bytes())
+                
+                encrypted_size = 0
+                for chunk in encrypted_chunks:
+                    f.write(chunk)
+                    encrypted_size += len(chunk)
+                self.header.encrypted_size = encrypted_size
+                
+                # v2：在文件末尾写入索引尾
+                if self.header.version >= FileHeader.VERSION_TRAILER:
+                    self.trailer = FileTrailer(notice_size, notice_size, encrypted_size)
+                    f.write(self.trailer.to_bytes())
+                
+                # 回填文件头
+                f.seek(notice_size)
+                f.write(self.header.to_bytes())
+            
+            os.replace(temp_path, output_path)
+        except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            if isinstance(e, VideoEncryptionError):
+                raise
+            raise FileFormatError(f"保存文件失败: {e}")
+        
+        # 保存后加密段改为按需从新文件读取
+        self.file_path = output_path
+        self.lazy = True
+        self.encrypted_data = None
+        self.file_size = os.path.getsize(output_path)
+        self._set_offsets(notice_size, self.header.size, encrypted_size)
+        return encrypted_size
+    
+    def create_from_parts(self, notice_data: bytes, encrypted_data: bytes,
                          header: FileHeader) -> 'EncryptedVideoFile':
         """
         从各部分创建加密视频文件
@@ -134,6 +337,10 @@ class EncryptedVideoFile:
         if self.header and encrypted_data:
             self.header.encrypted_size = len(encrypted_data)
         
+        self._set_offsets(len(notice_data) if notice_data else 0,
+                          header.size if header else FileHeader.HEADER_SIZE,
+                          len(encrypted_data) if encrypted_data else 0)
+        
         return self
     
     def extract_notice_section(self) -> Optional[bytes]:
@@ -141,8 +348,10 @@ class EncryptedVideoFile:
         提取提示段
         
         Returns:
-            提示段数据
+            提示段数据（惰性模式下从磁盘读取）
         """
+        if self.notice_data is None and self.lazy and self.file_path:
+            return b''.join(self.iter_notice_chunks())
         return self.notice_data
     
     def extract_encrypted_section(self) -> Optional[bytes]:
@@ -150,10 +359,84 @@ class EncryptedVideoFile:
         提取加密段
         
         Returns:
-            加密数据
+            加密数据（惰性模式下从磁盘读取）
         """
+        if self.encrypted_data is None and self.lazy and self.file_path:
+            return b''.join(self.iter_encrypted_chunks())
         return self.encrypted_data
     
+    def iter_notice_chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        分块迭代提示段
+        
+        Args:
+            chunk_size: 块大小
+            
+        Yields:
+            提示段数据块
+        """
+        return self._iter_section(self.notice_data, 0, self.notice_size, 0, None, chunk_size)
+    
+    def iter_encrypted_chunks(self, chunk_size: int = CHUNK_SIZE, offset: int = 0,
+                              length: Optional[int] = None) -> Iterator[bytes]:
+        """
+        分块迭代加密段
+        
+        Args:
+            chunk_size: 块大小
+            offset: 加密段内的起始偏移
+            length: 读取长度（None表示读到加密段末尾）
+            
+        Yields:
+            加密数据块
+        """
+        return self._iter_section(self.encrypted_data, self.encrypted_offset,
+                                  self.encrypted_size, offset, length, chunk_size)
+    
+    def read_encrypted_range(self, offset: int, length: int) -> bytes:
+        """
+        读取加密段内的一段数据
+        
+        Args:
+            offset: 加密段内的起始偏移
+            length: 读取长度
+            
+        Returns:
+            加密数据
+        """
+        return b''.join(self.iter_encrypted_chunks(offset=offset, length=length))
+    
+    def _iter_section(self, data: Optional[bytes], section_offset: int, section_size: int,
+                      offset: int, length: Optional[int], chunk_size: int) -> Iterator[bytes]:
+        """按段迭代数据：已载入内存时切片，否则从磁盘分块读取"""
+        offset = max(0, min(offset, section_size))
+        end = section_size if length is None else min(section_size, offset + max(0, length))
+        
+        if data is not None:
+            view = memoryview(data)
+            for start in range(offset, end, chunk_size):
+                yield bytes(view[start:min(start + chunk_size, end)])
+            return
+        
+        if not self.file_path or end <= offset:
+            return
+        
+        yield from FileUtils.read_file_chunks(self.file_path, chunk_size,
+                                              section_offset + offset, end - offset)
+    
+    def get_notice_url(self) -> Optional[str]:
+        """
+        获取直接读取容器内提示段的FFmpeg输入地址（subfile协议，不复制数据）
+        
+        提示段是位于文件开头的完整MP4，用start/end偏移即可让FFmpeg/ffplay直接播放。
+        
+        Returns:
+            subfile地址，没有提示段或数据不在磁盘上时返回None
+        """
+        if not self.notice_size or not self.file_path or not os.path.exists(self.file_path):
+            return None
+        return f"subfile,,start,0,end,{self.notice_size},,:{os.path.abspath(self.file_path)}"
+    
     def get_notice_temp_file(self) -> Optional[str]:
         """
         获取提示段的临时文件路径
@@ -161,12 +444,13 @@ class EncryptedVideoFile:
         Returns:
             临时文件路径
         """
-        if not self.notice_data:
+        if not self.notice_data and not self.notice_size:
             return None
         
         import tempfile
         temp_file = tempfile.NamedTemporaryFile(suffix='.mp4', delete=False)
-        temp_file.write(self.notice_data)
+        for chunk in self.iter_notice_chunks():
+            temp_file.write(chunk)
         temp_file.close()
         return temp_file.name
     
@@ -180,9 +464,9 @@ class EncryptedVideoFile:
         if not self.header:
             return False, "缺少文件头"
         
-        notice_size = len(self.notice_data) if self.notice_data else 0
-        encrypted_size = len(self.encrypted_data) if self.encrypted_data else 0
-        expected_size = notice_size + FileHeader.HEADER_SIZE + encrypted_size
+        encrypted_size = self.encrypted_size
+        trailer_size = FileTrailer.TRAILER_SIZE if self.header.version >= FileHeader.VERSION_TRAILER else 0
+        expected_size = self.encrypted_offset + encrypted_size + trailer_size
         
         if expected_size > 0 and self.file_size != expected_size:
             return False, f"文件大小不匹配: 期望 {expected_size}, 实际 {self.file_size}"
@@ -196,8 +480,6 @@ class EncryptedVideoFile:
     def __str__(self) -> str:
         """字符串表示"""
         if self.header:
-            notice_size = len(self.notice_data) if self.notice_data else 0
-            encrypted_size = len(self.encrypted_data) if self.encrypted_data else 0
-            return (f"EncryptedVideoFile(notice={notice_size} bytes, "
-                    f"encrypted={encrypted_size} bytes, header={self.header})")
+            return (f"EncryptedVideoFile(notice={self.notice_size} bytes, "
+                    f"encrypted={self.encrypted_size} bytes, header={self.header})")
         return "EncryptedVideoFile(未加载)"
@@ -1,7 +1,8 @@
 # player/file/file_header.py
 import struct
-from typing import Dict, Any
-from ..exceptions.custom_exceptions import FileFormatError
+from typing import Dict, Any, Optional
+from ..crypto.kdf import KDFParams
+from ..exceptions.custom_exceptions import FileFormatError, CryptoError
 
 
 class FileHeader:
@@ -10,8 +11,25 @@ class FileHeader:
     FORMAT = '4s B Q 64s'  # magic(4), version(1), encrypted_size(8), reserved(64)
     HEADER_SIZE = struct.calcsize(FORMAT)
     
+    # v2起固定部分之后附带扩展区：ext_length(4) + 若干 tag(1) + length(2) + value 记录，
+    # 用于保存reserved字段放不下的信息
+    EXT_LENGTH_FORMAT = '<I'
+    EXT_LENGTH_SIZE = struct.calcsize(EXT_LENGTH_FORMAT)
+    EXT_RECORD_FORMAT = '<B H'
+    EXT_RECORD_SIZE = struct.calcsize(EXT_RECORD_FORMAT)
+    
+    VERSION_LEGACY = 1   # 提示段 + 文件头 + 加密数据，需搜索魔数定位文件头
+    VERSION_TRAILER = 2  # 在v1基础上增加文件头扩展区和文件末尾的索引尾
+    CURRENT_VERSION = VERSION_TRAILER
+    
+    # 扩展区tag
+    EXT_KEY_CHECK = 1    # 密钥校验值
+    EXT_FILE_SALT = 2    # 批量密钥层级中每个文件的HKDF salt（salt字段保存批量salt）
+    EXT_KDF_PARAMS = 3   # 密钥派生算法及成本参数
+    
     def __init__(self, magic: bytes = b'ENCV', version: int = 1, 
-                 encrypted_size: int = 0, reserved: bytes = b''):
+                 encrypted_size: int = 0, reserved: bytes = b'',
+                 extensions: Dict[int, bytes] = None):
         """
         初始化文件头
         
@@ -20,10 +38,12 @@ class FileHeader:
             version: 版本号
             encrypted_size: 加密数据大小
             reserved: 预留字段
+            extensions: 扩展字段 {tag: value}（仅v2及以上写入文件）
         """
         self.magic = magic
         self.version = version
         self.encrypted_size = encrypted_size
+        self.extensions: Dict[int, bytes] = dict(extensions) if extensions else {}
         
         # 确保reserved长度为64字节
         if len(reserved) < 64:
@@ -35,6 +55,13 @@ class FileHeader:
         # 加密信息（存储在reserved中）
         self.encryption_info = {}
     
+    @property
+    def size(self) -> int:
+        """文件头在文件中占用的总字节数（含扩展区）"""
+        if self.version < self.VERSION_TRAILER:
+            return self.HEADER_SIZE
+        return self.HEADER_SIZE + self.EXT_LENGTH_SIZE + len(self._pack_extensions())
+    
     def to_bytes(self) -> bytes:
         """
         转换为字节
@@ -42,11 +69,25 @@ class FileHeader:
         Returns:
             字节表示
         """
-        return struct.pack(self.FORMAT, 
+        data = struct.pack(self.FORMAT, 
                           self.magic, 
                           self.version, 
                           self.encrypted_size, 
                           self.reserved)
+        
+        if self.version >= self.VERSION_TRAILER:
+            ext_data = self._pack_extensions()
+            data += struct.pack(self.EXT_LENGTH_FORMAT, len(ext_data)) + ext_data
+        
+        return data
+    
+    def _pack_extensions(self) -> bytes:
+        """编码扩展区记录"""
+        ext_data = b''
+        for tag in sorted(self.extensions):
+            value = self.extensions[tag]
+            ext_data += struct.pack(self.EXT_RECORD_FORMAT, tag, len(value)) + value
+        return ext_data
     
     @classmethod
     def from_bytes(cls, data: bytes) -> 'FileHeader':
@@ -54,7 +95,7 @@ class FileHeader:
         从字节解析文件头
         
         Args:
-            data: 字节数据
+            data: 字节数据（v2文件头需包含完整扩展区）
             
         Returns:
             FileHeader实例
@@ -76,18 +117,73 @@ class FileHeader:
                     actual_format=magic.decode('ascii', errors='replace')
                 )
             
-            return cls(magic, version, encrypted_size, reserved)
+            extensions = {}
+            if version >= cls.VERSION_TRAILER and len(data) > cls.HEADER_SIZE:
+                extensions = cls._unpack_extensions(data[cls.HEADER_SIZE:])
+            
+            return cls(magic, version, encrypted_size, reserved, extensions)
         except struct.error as e:
             raise FileFormatError(f"解析文件头失败: {e}")
     
-    def set_encryption_info(self, algorithm: str, salt: bytes, iv_nonce: bytes):
+    @classmethod
+    def read_from(cls, f) -> 'FileHeader':
+        """
+        从文件当前位置读取文件头（自动读取v2扩展区）
+        
+        Args:
+            f: 已定位到文件头的文件对象
+            
+        Returns:
+            FileHeader实例
+        """
+        data = f.read(cls.HEADER_SIZE)
+        
+        # version字段位于魔数之后
+        if len(data) < cls.HEADER_SIZE or data[4] < cls.VERSION_TRAILER:
+            return cls.from_bytes(data)
+        
+        length_data = f.read(cls.EXT_LENGTH_SIZE)
+        if len(length_data) < cls.EXT_LENGTH_SIZE:
+            raise FileFormatError("文件头扩展区长度不足")
+        ext_length = struct.unpack(cls.EXT_LENGTH_FORMAT, length_data)[0]
+        
+        return cls.from_bytes(data + length_data + f.read(ext_length))
+    
+    @classmethod
+    def _unpack_extensions(cls, data: bytes) -> Dict[int, bytes]:
+        """解码扩展区记录"""
+        if len(data) < cls.EXT_LENGTH_SIZE:
+            raise FileFormatError("文件头扩展区长度不足")
+        
+        ext_length = struct.unpack(cls.EXT_LENGTH_FORMAT, data[:cls.EXT_LENGTH_SIZE])[0]
+        ext_data = data[cls.EXT_LENGTH_SIZE:cls.EXT_LENGTH_SIZE + ext_length]
+        if len(ext_data) < ext_length:
+            raise FileFormatError("文件头扩展区数据不完整")
+        
+        extensions = {}
+        pos = 0
+        while pos + cls.EXT_RECORD_SIZE <= len(ext_data):
+            tag, length = struct.unpack(cls.EXT_RECORD_FORMAT, ext_data[pos:pos + cls.EXT_RECORD_SIZE])
+            pos += cls.EXT_RECORD_SIZE
+            extensions[tag] = ext_data[pos:pos + length]
+            pos += length
+        
+        return extensions
+    
+    def set_encryption_info(self, algorithm: str, salt: bytes, iv_nonce: bytes,
+                            key_check: Optional[bytes] = None,
+                            file_salt: Optional[bytes] = None,
+                            kdf_params: Optional[KDFParams] = None):
         """
         设置加密信息到reserved字段
         
         Args:
             algorithm: 加密算法
-            salt: 盐值
+            salt: 盐值（批量模式下为批量salt）
             iv_nonce: IV/Nonce
+            key_check: 密钥校验值（存入扩展区，仅v2及以上写入文件）
+            file_salt: 批量模式下派生文件密钥的salt（存入扩展区）
+            kdf_params: 密钥派生参数（存入扩展区）
         """
         # 简单编码：algorithm(16) + salt_len(1) + salt + iv_len(1) + iv
         algorithm_bytes = algorithm.encode('utf-8').ljust(16, b'\x00')
@@ -101,6 +197,13 @@ class FileHeader:
             info_data = info_data[:64]
         
         self.reserved = info_data.ljust(64, b'\x00')
+        
+        if key_check:
+            self.extensions[self.EXT_KEY_CHECK] = key_check
+        if file_salt:
+            self.extensions[self.EXT_FILE_SALT] = file_salt
+        if kdf_params:
+            self.extensions[self.EXT_KDF_PARAMS] = kdf_params.to_bytes()
     
     def get_encryption_info(self) -> Dict[str, Any]:
         """
@@ -121,11 +224,26 @@ class FileHeader:
             iv_len = self.reserved[iv_start] if iv_start < 64 else 0
             iv = self.reserved[iv_start+1:iv_start+1+iv_len] if iv_len > 0 else b''
             
-            return {
+            info = {
                 'algorithm': algorithm_bytes.decode('utf-8', errors='ignore'),
                 'salt': salt,
                 'iv_nonce': iv
             }
+            
+            # 旧文件没有密钥校验值
+            if self.EXT_KEY_CHECK in self.extensions:
+                info['key_check'] = self.extensions[self.EXT_KEY_CHECK]
+            if self.EXT_FILE_SALT in self.extensions:
+                info['file_salt'] = self.extensions[self.EXT_FILE_SALT]
+            
+            # 没有记录密钥派生参数的文件使用默认参数
+            if self.EXT_KDF_PARAMS in self.extensions:
+                try:
+                    info['kdf_params'] = KDFParams.from_bytes(self.extensions[self.EXT_KDF_PARAMS])
+                except CryptoError as e:
+                    raise FileFormatError(f"文件头中的密钥派生参数无效: {e}")
+            
+            return info
         
         return {}
     
@@ -134,3 +252,66 @@ class FileHeader:
         info = self.get_encryption_info()
         return (f"FileHeader(magic={self.magic}, version={self.version}, "
                 f"encrypted_size={self.encrypted_size}, algorithm={info.get('algorithm', 'N/A')})")
+
+
+class FileTrailer:
+    """v2文件末尾的固定长度索引尾，用于O(1)定位文件头"""
+    
+    FORMAT = '<4s B Q Q Q'  # magic(4), version(1), header_offset(8), notice_size(8), encrypted_size(8)
+    TRAILER_SIZE = struct.calcsize(FORMAT)
+    MAGIC = b'ENCT'
+    
+    def __init__(self, header_offset: int = 0, notice_size: int = 0,
+                 encrypted_size: int = 0, version: int = FileHeader.VERSION_TRAILER):
+        """
+        初始化索引尾
+        
+        Args:
+            header_offset: 文件头偏移
+            notice_size: 提示段长度
+            encrypted_size: 加密数据长度
+            version: 版本号
+        """
+        self.header_offset = header_offset
+        self.notice_size = notice_size
+        self.encrypted_size = encrypted_size
+        self.version = version
+    
+    def to_bytes(self) -> bytes:
+        """
+        转换为字节
+        
+        Returns:
+            字节表示
+        """
+        return struct.pack(self.FORMAT,
+                          self.MAGIC,
+                          self.version,
+                          self.header_offset,
+                          self.notice_size,
+                          self.encrypted_size)
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Optional['FileTrailer']:
+        """
+        从字节解析索引尾
+        
+        Args:
+            data: 文件末尾TRAILER_SIZE字节
+            
+        Returns:
+            FileTrailer实例，不是有效索引尾时返回None（例如v1文件）
+        """
+        if len(data) != cls.TRAILER_SIZE:
+            return None
+        
+        magic, version, header_offset, notice_size, encrypted_size = struct.unpack(cls.FORMAT, data)
+        if magic != cls.MAGIC or notice_size != header_offset:
+            return None
+        
+        return cls(header_offset, notice_size, encrypted_size, version)
+    
+    def __str__(self) -> str:
+        """字符串表示"""
+        return (f"FileTrailer(version={self.version}, header_offset={self.header_offset}, "
+                f"notice_size={self.notice_size}, encrypted_size={self.encrypted_size})")
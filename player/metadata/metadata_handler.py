@@ -1,11 +1,13 @@
 # player/metadata/metadata_handler.py
 import json
+import os
 import re
 from typing import Dict, Any, List, Tuple
 from pathlib import Path
 from ..exceptions.custom_exceptions import MetadataError
 from ..utils.file_utils import FileUtils
 from ..metadata.metadata_validator import MetadataValidator
+from ..metadata.mp4_tag_writer import MP4TagWriter
 
 
 class MetadataHandler:
@@ -101,23 +103,65 @@ class MetadataHandler:
             if output_path is None:
                 output_path = video_path
 
-            # 使用FFmpeg添加元数据
-            from ..ffmpeg.ffmpeg_wrapper import FFmpegWrapper
-            ffmpeg = FFmpegWrapper()
-
-            # 过滤出白名单内的字段
-            whitelist = self.validator.whitelist
-            filtered_metadata = {k: v for k, v in metadata.items() if k in whitelist}
-
-            # 调用FFmpeg添加元数据
-            success = ffmpeg.add_metadata(video_path, output_path, filtered_metadata)
-            if not success:
-                raise MetadataError("FFmpeg添加元数据失败")
+            with open(video_path, 'rb') as f:
+                data = f.read()
+            data = self.inject_metadata_bytes(data, metadata)
 
+            # 先写入临时文件再替换，output_path与video_path相同时也不会损坏原文件
+            temp_path = f"{output_path}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, output_path)
             return True
         except Exception as e:
             raise MetadataError(f"注入元数据失败: {e}")
 
+    def inject_metadata_bytes(self, data: bytes, metadata: Dict[str, str]) -> bytes:
+        """
+        将元数据注入内存中的MP4数据
+
+        优先直接改写moov/udta/meta/ilst（不启动进程），文件结构不支持时改用FFmpeg。
+
+        Args:
+            data: MP4文件内容
+            metadata: 元数据字典（只写入白名单字段）
+
+        Returns:
+            注入元数据后的MP4文件内容
+
+        Raises:
+            MetadataError: 注入元数据失败
+        """
+        whitelist = self.validator.whitelist
+        filtered_metadata = {k: v for k, v in metadata.items() if k in whitelist}
+
+        try:
+            return MP4TagWriter(whitelist).write(data, filtered_metadata)
+        except MetadataError as e:
+            if e.field:
+                raise
+        return self._inject_with_ffmpeg(data, filtered_metadata)
+
+    def _inject_with_ffmpeg(self, data: bytes, metadata: Dict[str, str]) -> bytes:
+        """通过FFmpeg添加元数据（非MP4或分片MP4等原生写入不支持的情况）"""
+        import tempfile
+        from ..ffmpeg.toolchain import get_ffmpeg_wrapper
+
+        ffmpeg = get_ffmpeg_wrapper()
+        input_path = tempfile.mktemp(suffix='.mp4')
+        output_path = tempfile.mktemp(suffix='.mp4')
+        try:
+            with open(input_path, 'wb') as f:
+                f.write(data)
+            if not ffmpeg.add_metadata(input_path, output_path, metadata):
+                raise MetadataError("FFmpeg添加元数据失败")
+            with open(output_path, 'rb') as f:
+                return f.read()
+        finally:
+            for path in (input_path, output_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
     def generate_udta_json(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """
         生成用户数据盒子（udta）的JSON内容
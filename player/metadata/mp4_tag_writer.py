@@ -0,0 +1,201 @@
+# player/metadata/mp4_tag_writer.py
+import struct
+import time
+from typing import Dict, List, Tuple
+from ..exceptions.custom_exceptions import MetadataError
+
+
+class MP4TagWriter:
+    """
+    MP4元数据写入器（纯Python，直接修改内存中的文件数据）
+
+    把白名单字段写入 moov/udta/meta/ilst（iTunes风格，与 ffmpeg -metadata 写入的位置相同），
+    creation_time写入mvhd。只重建moov，媒体数据原样保留；moov位于mdat之前时同步调整
+    stco/co64中的块偏移。分片MP4等无法安全修改的文件抛出MetadataError，由调用方改用FFmpeg。
+    """
+
+    # 字段 -> ilst条目类型（与FFmpeg的mov封装/解封装映射一致）
+    ILST_KEYS = {
+        'title': b'\xa9nam',
+        'artist': b'\xa9ART',
+        'comment': b'\xa9cmt',
+        'description': b'desc',
+        'copyright': b'cprt',
+        'encoder': b'\xa9too'
+    }
+
+    # 1904-01-01（MP4时间起点）到1970-01-01的秒数
+    MP4_EPOCH_OFFSET = 2082844800
+
+    CONTAINERS = (b'trak', b'mdia', b'minf', b'stbl')
+
+    def __init__(self, whitelist: List[str]):
+        """
+        初始化写入器
+
+        Args:
+            whitelist: 允许写入的字段（MetadataValidator.whitelist）
+        """
+        self.whitelist = whitelist
+
+    @staticmethod
+    def _walk(data, start: int, end: int) -> List[Tuple[bytes, int, int, int]]:
+        """
+        遍历box（必须恰好覆盖[start, end)）
+
+        Returns:
+            [(类型, box起始, 内容起始, box结束), ...]
+
+        Raises:
+            MetadataError: box结构无效
+        """
+        boxes = []
+        position = start
+        while position < end:
+            if position + 8 > end:
+                raise MetadataError("MP4 box结构无效")
+            size, box_type = struct.unpack_from('>I4s', data, position)
+            header = 8
+            if size == 1:
+                if position + 16 > end:
+                    raise MetadataError("MP4 box结构无效")
+                size = struct.unpack_from('>Q', data, position + 8)[0]
+                header = 16
+            elif size == 0:
+                size = end - position
+            if size < header or position + size > end:
+                raise MetadataError("MP4 box结构无效")
+            boxes.append((box_type, position, position + header, position + size))
+            position += size
+        return boxes
+
+    @staticmethod
+    def _box(box_type: bytes, payload: bytes) -> bytes:
+        return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+    def _build_items(self, metadata: Dict[str, str]) -> Dict[bytes, bytes]:
+        """生成ilst条目（类型 -> 完整条目box）"""
+        items = {}
+        for key, value in metadata.items():
+            if key not in self.whitelist or key not in self.ILST_KEYS:
+                continue
+            # data box：类型1表示UTF-8文本，locale为0
+            data_box = self._box(b'data', struct.pack('>II', 1, 0) + value.encode('utf-8'))
+            items[self.ILST_KEYS[key]] = self._box(self.ILST_KEYS[key], data_box)
+        return items
+
+    def _build_meta(self, data, meta_range, items: Dict[bytes, bytes]) -> bytes:
+        """生成新的meta box：保留原有ilst中未被覆盖的条目和其他子box"""
+        kept_items = []
+        other_children = []
+        if meta_range is not None:
+            _, _, content_start, box_end = meta_range
+            # ISO meta是full box（4字节版本/标志），QuickTime的meta直接包含子box
+            if data[content_start + 4:content_start + 8] != b'hdlr':
+                content_start += 4
+            for child_type, child_start, child_content, child_end in self._walk(data, content_start, box_end):
+                if child_type == b'ilst':
+                    for item_type, item_start, _, item_end in self._walk(data, child_content, child_end):
+                        if item_type not in items:
+                            kept_items.append(bytes(data[item_start:item_end]))
+                elif child_type not in (b'hdlr', b'free'):
+                    other_children.append(bytes(data[child_start:child_end]))
+
+        hdlr = self._box(b'hdlr', struct.pack('>II4s', 0, 0, b'mdir') + b'appl' + b'\x00' * 9)
+        ilst = self._box(b'ilst', b''.join(kept_items) + b''.join(items.values()))
+        return self._box(b'meta', b'\x00\x00\x00\x00' + hdlr + ilst + b''.join(other_children))
+
+    def _build_udta(self, data, udta_range, items: Dict[bytes, bytes]) -> bytes:
+        """生成新的udta box（替换其中的meta，其余子box保留）"""
+        children = []
+        meta_range = None
+        if udta_range is not None:
+            _, _, content_start, box_end = udta_range
+            for child in self._walk(data, content_start, box_end):
+                if child[0] == b'meta' and meta_range is None:
+                    meta_range = child
+                else:
+                    children.append(bytes(data[child[1]:child[3]]))
+        return self._box(b'udta', b''.join(children) + self._build_meta(data, meta_range, items))
+
+    def _patch_mvhd(self, mvhd: bytearray, creation_time: str):
+        """把creation_time（YYYY-MM-DD HH:MM:SS，本地时间，与FFmpeg一致）写入mvhd"""
+        try:
+            timestamp = int(time.mktime(time.strptime(creation_time, '%Y-%m-%d %H:%M:%S')))
+        except (ValueError, OverflowError):
+            raise MetadataError(f"creation_time格式不正确: {creation_time}", field='creation_time')
+        value = timestamp + self.MP4_EPOCH_OFFSET
+        header = 16 if struct.unpack_from('>I', mvhd, 0)[0] == 1 else 8
+        if mvhd[header] == 1:
+            struct.pack_into('>Q', mvhd, header + 4, value)
+        else:
+            struct.pack_into('>I', mvhd, header + 4, value & 0xFFFFFFFF)
+
+    def _shift_chunk_offsets(self, moov: bytearray, start: int, end: int, threshold: int, delta: int):
+        """调整stco/co64中位于threshold之后的块偏移"""
+        for box_type, _, content_start, box_end in self._walk(moov, start, end):
+            if box_type in self.CONTAINERS:
+                self._shift_chunk_offsets(moov, content_start, box_end, threshold, delta)
+            elif box_type in (b'stco', b'co64'):
+                count = struct.unpack_from('>I', moov, content_start + 4)[0]
+                entry_format = '>I' if box_type == b'stco' else '>Q'
+                entry_size = struct.calcsize(entry_format)
+                position = content_start + 8
+                if position + count * entry_size > box_end:
+                    raise MetadataError("stco/co64条目数无效")
+                for _ in range(count):
+                    offset = struct.unpack_from(entry_format, moov, position)[0]
+                    if offset >= threshold:
+                        offset += delta
+                        if box_type == b'stco' and offset > 0xFFFFFFFF:
+                            raise MetadataError("块偏移超出stco范围")
+                        struct.pack_into(entry_format, moov, position, offset)
+                    position += entry_size
+
+    def write(self, data: bytes, metadata: Dict[str, str]) -> bytes:
+        """
+        写入元数据
+
+        Args:
+            data: 原MP4文件内容
+            metadata: 元数据字典（只写入白名单字段）
+
+        Returns:
+            新的MP4文件内容
+
+        Raises:
+            MetadataError: 文件结构不支持（由调用方改用FFmpeg）
+        """
+        top_level = self._walk(data, 0, len(data))
+        types = [box[0] for box in top_level]
+        if b'ftyp' not in types or types.count(b'moov') != 1:
+            raise MetadataError("不是单个moov的MP4文件")
+        if b'moof' in types or b'mfra' in types:
+            raise MetadataError("不支持修改分片MP4")
+
+        moov_range = top_level[types.index(b'moov')]
+        _, moov_start, moov_content, moov_end = moov_range
+        items = self._build_items(metadata)
+        creation_time = metadata.get('creation_time') if 'creation_time' in self.whitelist else None
+
+        children = []
+        udta_range = None
+        for child in self._walk(data, moov_content, moov_end):
+            child_type, child_start, _, child_end = child
+            if child_type == b'udta' and udta_range is None:
+                udta_range = child
+            elif child_type == b'mvhd' and creation_time:
+                mvhd = bytearray(data[child_start:child_end])
+                self._patch_mvhd(mvhd, creation_time)
+                children.append(bytes(mvhd))
+            else:
+                children.append(bytes(data[child_start:child_end]))
+        children.append(self._build_udta(data, udta_range, items))
+
+        new_moov = bytearray(self._box(b'moov', b''.join(children)))
+        delta = len(new_moov) - (moov_end - moov_start)
+        if delta:
+            # moov之后的媒体数据整体移动delta字节
+            self._shift_chunk_offsets(new_moov, 8, len(new_moov), moov_end, delta)
+
+        return bytes(data[:moov_start]) + bytes(new_moov) + bytes(data[moov_end:])
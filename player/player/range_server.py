@@ -0,0 +1,174 @@
+# player/player/range_server.py
+import mimetypes
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import quote, unquote
+from ..exceptions.custom_exceptions import VideoEncryptionError
+
+
+class _RangeRequestHandler(BaseHTTPRequestHandler):
+    """处理GET/HEAD请求，支持单个Range范围"""
+
+    RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+    # 所有响应都带Content-Length，可以保持连接（播放器拖动时会连续发出范围请求）
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body: bool):
+        server = self.server.range_server
+        if unquote(self.path.split('?', 1)[0]) != server.url_path:
+            self.send_error(404)
+            return
+
+        size = server.blocks.size
+        byte_range = self._parse_range(self.headers.get('Range'), size)
+        if byte_range is None:
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{size}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        start, end = byte_range
+        if self.headers.get('Range'):
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end - 1}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Type', server.content_type)
+        self.send_header('Content-Length', str(end - start))
+        self.end_headers()
+
+        if not send_body:
+            return
+
+        # 按块解密并发送，播放器拖动进度时会主动断开连接
+        try:
+            block_size = server.blocks.block_size
+            position = start
+            while position < end:
+                length = min(end, (position // block_size + 1) * block_size) - position
+                self.wfile.write(server.blocks.read(position, length))
+                position += length
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+
+    def _parse_range(self, header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+        """解析Range头，返回[start, end)；无Range时返回整个文件，无法满足时返回None"""
+        if not header:
+            return 0, size
+
+        match = self.RANGE_PATTERN.match(header.strip())
+        if not match or match.group(1) == match.group(2) == '':
+            return None  # 不支持多段范围
+
+        first, last = match.group(1), match.group(2)
+        if first == '':
+            # bytes=-N 表示最后N个字节
+            start = max(0, size - int(last))
+            end = size
+        else:
+            start = int(first)
+            end = size if last == '' else min(size, int(last) + 1)
+
+        if start >= size or start >= end:
+            return None
+        return start, end
+
+    def log_message(self, format, *args):
+        """不输出每个请求的访问日志"""
+        pass
+
+
+class DecryptedRangeServer:
+    """
+    本地HTTP范围服务器
+
+    只监听回环地址，把加密文件解密后的视频流以普通HTTP资源的形式提供给播放器，
+    每个请求只解密所请求的字节范围，因此播放器可以任意拖动进度。
+    多个并发请求共享同一个解密块缓存。
+    """
+
+    def __init__(self, blocks, name: str = "video.mp4", port: int = 0):
+        """
+        初始化范围服务器
+
+        Args:
+            blocks: 解密块缓存（DecryptedBlockCache）
+            name: URL中的文件名（同时决定Content-Type）
+            port: 监听端口（0表示自动分配）
+
+        Raises:
+            VideoEncryptionError: 端口无法监听
+        """
+        self.blocks = blocks
+        self.url_path = '/' + name
+        self.content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+        try:
+            self._httpd = ThreadingHTTPServer(('127.0.0.1', port), _RangeRequestHandler)
+        except OSError as e:
+            raise VideoEncryptionError(f"无法启动本地服务器: {e}")
+        self._httpd.daemon_threads = True
+        self._httpd.range_server = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """播放地址"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{quote(self.url_path)}"
+
+    def start(self) -> str:
+        """
+        在后台线程中启动服务
+
+        Returns:
+            播放地址
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                            name="range-server", daemon=True)
+            self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        """在当前线程中提供服务（直到被中断）"""
+        self._httpd.serve_forever()
+
+    def stop(self):
+        """停止服务并清空解密块缓存"""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+        self.blocks.clear()
+
+
+def serve_name(encrypted_path: str) -> str:
+    """
+    根据加密文件名推断URL中的文件名（去掉.enc后缀，默认.mp4）
+
+    Args:
+        encrypted_path: 加密文件路径
+
+    Returns:
+        文件名
+    """
+    name = os.path.basename(encrypted_path)
+    for suffix in ('.enc.mp4', '.enc'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    root, ext = os.path.splitext(name)
+    return name if ext else root + '.mp4'
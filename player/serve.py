@@ -0,0 +1,62 @@
+# player/serve.py - 本地HTTP范围服务器（python -m player.serve 加密文件）
+import argparse
+import getpass
+import os
+import sys
+
+from .core.decryptor import Decryptor
+from .file.block_cache import DecryptedBlockCache
+from .player.range_server import DecryptedRangeServer, serve_name
+from .exceptions.custom_exceptions import VideoEncryptionError
+
+
+def main():
+    """解密加密文件并通过回环地址提供可拖动进度的HTTP播放地址"""
+    parser = argparse.ArgumentParser(description='本地HTTP范围服务器：边解密边播放，支持拖动进度')
+    parser.add_argument('input_file', help='加密文件路径')
+    parser.add_argument('-p', '--password', help='解密密码（可选，不提供则交互输入）')
+    parser.add_argument('--port', type=int, default=0, help='监听端口（默认自动分配）')
+    parser.add_argument('--block-size', type=int, default=DecryptedBlockCache.DEFAULT_BLOCK_SIZE // 1024,
+                       help='解密块大小（KB，默认1024）')
+    parser.add_argument('--cache-blocks', type=int, default=DecryptedBlockCache.DEFAULT_MAX_BLOCKS,
+                       help='最多缓存的解密块数（默认32）')
+    parser.add_argument('--play', action='store_true', help='启动ffplay播放，播放结束后退出')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input_file):
+        print(f"错误: 文件不存在: {args.input_file}")
+        sys.exit(1)
+
+    password = args.password or getpass.getpass("请输入解密密码: ")
+
+    try:
+        blocks = Decryptor().open_decrypted_blocks(args.input_file, password,
+                                                   args.block_size * 1024, args.cache_blocks)
+        server = DecryptedRangeServer(blocks, serve_name(args.input_file), args.port)
+    except VideoEncryptionError as e:
+        print(f"✗ 无法打开: {e}")
+        sys.exit(1)
+
+    url = server.url
+    print(f"✓ 播放地址: {url}")
+    print(f"  视频大小: {blocks.size / 1024 / 1024:.2f} MB（仅监听127.0.0.1）")
+
+    try:
+        if args.play:
+            from .ffmpeg.toolchain import get_ffmpeg_wrapper
+            server.start()
+            get_ffmpeg_wrapper().play_video(url, title="加密视频播放器 - 正在播放", auto_fit=False)
+        else:
+            print("  用任意播放器打开上面的地址，按 Ctrl+C 停止")
+            server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n已停止")
+    finally:
+        stats = blocks.stats()
+        print(f"  解密块缓存: 命中 {stats['hits']}，未命中 {stats['misses']}")
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,47 @@
 # player/utils/file_utils.py
 import os
+import sys
 import hashlib
-from typing import Generator, Optional
+import tempfile
+import threading
+from typing import Generator, Optional, BinaryIO, Tuple
 from pathlib import Path
 
 
+# 内存文件路径 -> 保持内存文件存活的文件描述符
+_memory_files = {}
+_memory_files_lock = threading.Lock()
+
+
 class FileUtils:
     """文件操作工具类"""
     
     @staticmethod
-    def read_file_chunks(file_path: str, chunk_size: int = 8192) -> Generator[bytes, None, None]:
+    def read_file_chunks(file_path: str, chunk_size: int = 8192, offset: int = 0,
+                         length: Optional[int] = None) -> Generator[bytes, None, None]:
         """
         分块读取大文件
         
         Args:
             file_path: 文件路径
             chunk_size: 块大小
+            offset: 起始偏移
+            length: 读取长度（None表示读到文件末尾）
             
         Yields:
             数据块
         """
         with open(file_path, 'rb') as f:
-            while True:
-                chunk = f.read(chunk_size)
+            if offset:
+                f.seek(offset)
+            remaining = length
+            while remaining is None or remaining > 0:
+                read_size = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = f.read(read_size)
                 if not chunk:
                     break
+                if remaining is not None:
+                    remaining -= len(chunk)
                 yield chunk
     
     @staticmethod
@@ -100,4 +117,75 @@ class FileUtils:
         except Exception:
             if os.path.exists(temp_path):
                 os.remove(temp_path)
-            return False
\ No newline at end of file
+            return False
+    
+    @staticmethod
+    def create_memory_file(suffix: str = '.mp4') -> Optional[Tuple[BinaryIO, str]]:
+        """
+        创建只存在于内存中的临时文件（Linux）
+        
+        优先使用memfd_create，通过/proc/<pid>/fd/N提供给子进程（如ffplay）按路径打开
+        和seek；不支持时退回/dev/shm（tmpfs）。数据不会写入持久存储。
+        
+        Args:
+            suffix: 退回/dev/shm时的文件后缀
+            
+        Returns:
+            (可写文件对象, 路径)，平台不支持时返回None；
+            写完后关闭文件对象，用完后调用remove_temp_file释放
+        """
+        if not sys.platform.startswith('linux'):
+            return None
+        
+        if hasattr(os, 'memfd_create'):
+            try:
+                fd = os.memfd_create('decrypted-video')
+                # 复制一个描述符保持内存文件存活，写入用的文件对象可以正常关闭
+                keep_fd = os.dup(fd)
+                path = f"/proc/{os.getpid()}/fd/{keep_fd}"
+                with _memory_files_lock:
+                    _memory_files[path] = keep_fd
+                return os.fdopen(fd, 'wb'), path
+            except OSError:
+                pass
+        
+        if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+            temp_file = tempfile.NamedTemporaryFile(suffix=suffix, dir='/dev/shm', delete=False)
+            return temp_file, temp_file.name
+        
+        return None
+    
+    @staticmethod
+    def remove_temp_file(file_path: Optional[str]):
+        """
+        删除临时文件（内存文件则关闭其描述符释放内存）
+        
+        Args:
+            file_path: 临时文件路径
+        """
+        if not file_path:
+            return
+        with _memory_files_lock:
+            keep_fd = _memory_files.pop(file_path, None)
+        if keep_fd is not None:
+            os.close(keep_fd)
+        elif os.path.exists(file_path):
+            os.remove(file_path)
+    
+    @staticmethod
+    def is_memory_file(file_path: Optional[str]) -> bool:
+        """
+        判断路径是否为create_memory_file创建的内存文件
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            是否为内存文件（memfd或/dev/shm）
+        """
+        if not file_path:
+            return False
+        with _memory_files_lock:
+            if file_path in _memory_files:
+                return True
+        return file_path.startswith('/dev/shm/')
@@ -1,10 +1,329 @@
 # player/utils/video_utils.py
 import json
+import os
+import struct
 import subprocess
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 from ..exceptions.custom_exceptions import FFmpegError
 
 
+class MP4BoxReader:
+    """
+    MP4/MOV box解析器（只读取文件头部的少量数据）
+
+    从moov/mvhd/tkhd/mdhd/hdlr/stsd中读出时长、分辨率、编码格式以及moov是否位于mdat之前，
+    生成与ffprobe -show_format -show_streams相同结构的信息字典。
+    无法确定的情况（非MP4、分片MP4、加密轨道、未知编码、字幕/数据轨道等）返回None，
+    由调用方改用ffprobe。
+    """
+
+    # 最多读取的moov大小（超过时改用ffprobe）
+    MAX_MOOV_SIZE = 64 * 1024 * 1024
+
+    # 样本描述fourcc -> (ffprobe编码名, 编码全称)
+    VIDEO_CODECS = {
+        'avc1': ('h264', 'H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10'),
+        'avc3': ('h264', 'H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10'),
+        'hvc1': ('hevc', 'H.265 / HEVC (High Efficiency Video Coding)'),
+        'hev1': ('hevc', 'H.265 / HEVC (High Efficiency Video Coding)'),
+        'av01': ('av1', 'Alliance for Open Media AV1'),
+        'vp09': ('vp9', 'Google VP9'),
+        'mp4v': ('mpeg4', 'MPEG-4 part 2'),
+    }
+    AUDIO_CODECS = {
+        'mp4a': ('aac', 'AAC (Advanced Audio Coding)'),
+        'ac-3': ('ac3', 'ATSC A/52A (AC-3)'),
+        'ec-3': ('eac3', 'ATSC A/52B (AC-3, E-AC-3)'),
+        'Opus': ('opus', 'Opus (Opus Interactive Audio Codec)'),
+        'fLaC': ('flac', 'FLAC (Free Lossless Audio Codec)'),
+    }
+    # mp4a中esds的objectTypeIndication（MPEG-4/MPEG-2 AAC，MPEG-1/2音频）
+    AAC_OBJECT_TYPES = (0x40, 0x66, 0x67, 0x68)
+    MP3_OBJECT_TYPES = (0x69, 0x6B)
+    # QuickTime声音描述版本 -> 子box起始偏移（版本2的布局不同，不支持）
+    SOUND_ENTRY_SIZES = {0: 28, 1: 44}
+
+    def __init__(self, video_path: str):
+        """
+        初始化解析器
+
+        Args:
+            video_path: 视频文件路径
+        """
+        self.video_path = video_path
+
+    @staticmethod
+    def iter_boxes(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[str, int, int]]:
+        """
+        遍历内存中的box
+
+        Args:
+            data: 数据
+            start: 起始偏移
+            end: 结束偏移（None表示数据末尾）
+
+        Yields:
+            (box类型, 内容起始偏移, 内容结束偏移)
+        """
+        end = len(data) if end is None else end
+        position = start
+        while position + 8 <= end:
+            size, box_type = struct.unpack_from('>I4s', data, position)
+            header = 8
+            if size == 1:
+                if position + 16 > end:
+                    return
+                size = struct.unpack_from('>Q', data, position + 8)[0]
+                header = 16
+            elif size == 0:
+                size = end - position
+            if size < header or position + size > end:
+                return
+            yield box_type.decode('latin-1'), position + header, position + size
+            position += size
+
+    def _find(self, data: bytes, start: int, end: int, box_type: str) -> Optional[Tuple[int, int]]:
+        """查找第一个指定类型的子box，返回内容范围"""
+        for child_type, child_start, child_end in self.iter_boxes(data, start, end):
+            if child_type == box_type:
+                return child_start, child_end
+        return None
+
+    def read_layout(self) -> Optional[Dict[str, Any]]:
+        """
+        读取顶层box布局和moov内容
+
+        Returns:
+            {'major_brand', 'moov_before_mdat', 'fragmented', 'moov', 'size'}，
+            不是MP4或没有moov时返回None
+        """
+        try:
+            file_size = os.path.getsize(self.video_path)
+            with open(self.video_path, 'rb') as f:
+                major_brand = None
+                moov = None
+                moov_before_mdat = None
+                fragmented = False
+                position = 0
+                while position + 8 <= file_size:
+                    f.seek(position)
+                    header = f.read(16)
+                    size, box_type = struct.unpack_from('>I4s', header)
+                    box_type = box_type.decode('latin-1')
+                    header_size = 8
+                    if size == 1:
+                        size = struct.unpack_from('>Q', header, 8)[0]
+                        header_size = 16
+                    elif size == 0:
+                        size = file_size - position
+                    if size < header_size:
+                        return None
+
+                    if position == 0:
+                        # 第一个box必须是ftyp（或QuickTime的wide/free/mdat等）
+                        if box_type == 'ftyp':
+                            major_brand = header[header_size:header_size + 4].decode('latin-1')
+                        elif box_type not in ('wide', 'free', 'skip', 'mdat', 'moov'):
+                            return None
+
+                    if box_type == 'moov':
+                        if size > self.MAX_MOOV_SIZE:
+                            return None
+                        f.seek(position + header_size)
+                        moov = f.read(size - header_size)
+                        if moov_before_mdat is None:
+                            moov_before_mdat = True
+                    elif box_type == 'mdat' and moov_before_mdat is None:
+                        moov_before_mdat = False
+                    elif box_type == 'moof':
+                        fragmented = True
+                        break
+                    position += size
+        except (OSError, struct.error):
+            return None
+
+        if moov is None:
+            return None
+        return {
+            'major_brand': major_brand,
+            'moov_before_mdat': bool(moov_before_mdat),
+            'fragmented': fragmented,
+            'moov': moov,
+            'size': file_size
+        }
+
+    def read_tracks(self, moov: bytes) -> Optional[Tuple[float, List[Dict[str, Any]]]]:
+        """
+        解析moov中的电影时长和各轨道信息
+
+        Args:
+            moov: moov box的内容
+
+        Returns:
+            (时长秒数, 轨道列表)，遇到无法解析的内容时返回None
+        """
+        mvhd = self._find(moov, 0, len(moov), 'mvhd')
+        if mvhd is None or self._find(moov, 0, len(moov), 'mvex') is not None:
+            return None
+        timescale, duration = self._read_time(moov, mvhd[0], 12, 20)
+        if not timescale or not duration:
+            return None
+
+        tracks = []
+        for box_type, start, end in self.iter_boxes(moov):
+            if box_type != 'trak':
+                continue
+            track = self._read_track(moov, start, end)
+            if track is None:
+                return None
+            tracks.append(track)
+
+        if not tracks:
+            return None
+        return duration / timescale, tracks
+
+    @staticmethod
+    def _read_time(data: bytes, start: int, v0_offset: int, v1_offset: int) -> Tuple[int, int]:
+        """读取mvhd/mdhd中的timescale和duration（按version选择32/64位布局）"""
+        if data[start] == 1:
+            return struct.unpack_from('>IQ', data, start + v1_offset)
+        return struct.unpack_from('>II', data, start + v0_offset)
+
+    def _read_track(self, data: bytes, start: int, end: int) -> Optional[Dict[str, Any]]:
+        """解析一个trak，只支持视频和音频轨道"""
+        mdia = self._find(data, start, end, 'mdia')
+        if mdia is None:
+            return None
+        mdhd = self._find(data, mdia[0], mdia[1], 'mdhd')
+        hdlr = self._find(data, mdia[0], mdia[1], 'hdlr')
+        minf = self._find(data, mdia[0], mdia[1], 'minf')
+        stbl = self._find(data, minf[0], minf[1], 'stbl') if minf else None
+        stsd = self._find(data, stbl[0], stbl[1], 'stsd') if stbl else None
+        if not (mdhd and hdlr and stsd):
+            return None
+
+        handler = data[hdlr[0] + 8:hdlr[0] + 12].decode('latin-1')
+        timescale, duration = self._read_time(data, mdhd[0], 12, 20)
+        entries = list(self.iter_boxes(data, stsd[0] + 8, stsd[1]))
+        if not entries or not timescale:
+            return None
+        codec_tag, entry_start, entry_end = entries[0]
+
+        track = {
+            'handler': handler,
+            'codec_tag': codec_tag,
+            'timescale': timescale,
+            'duration': duration / timescale
+        }
+        if handler == 'vide':
+            if codec_tag not in self.VIDEO_CODECS or entry_start + 28 > entry_end:
+                return None
+            track['codec'] = self.VIDEO_CODECS[codec_tag]
+            track['width'], track['height'] = struct.unpack_from('>HH', data, entry_start + 24)
+        elif handler == 'soun':
+            if codec_tag not in self.AUDIO_CODECS or entry_start + 28 > entry_end:
+                return None
+            entry_size = self.SOUND_ENTRY_SIZES.get(struct.unpack_from('>H', data, entry_start + 8)[0])
+            if entry_size is None:
+                return None
+            track['codec'] = self.AUDIO_CODECS[codec_tag]
+            track['channels'] = struct.unpack_from('>H', data, entry_start + 16)[0]
+            track['sample_rate'] = struct.unpack_from('>I', data, entry_start + 24)[0] >> 16
+            if codec_tag == 'mp4a':
+                object_type = self._read_object_type(data, entry_start + entry_size, entry_end)
+                if object_type in self.MP3_OBJECT_TYPES:
+                    track['codec'] = ('mp3', 'MP3 (MPEG audio layer 3)')
+                elif object_type not in self.AAC_OBJECT_TYPES:
+                    return None
+        else:
+            return None
+        return track
+
+    def _read_object_type(self, data: bytes, start: int, end: int) -> Optional[int]:
+        """读取mp4a样本描述中esds的objectTypeIndication"""
+        esds = self._find(data, start, end, 'esds')
+        if esds is None:
+            # QuickTime把esds放在wave box中
+            wave = self._find(data, start, end, 'wave')
+            esds = self._find(data, wave[0], wave[1], 'esds') if wave else None
+        if esds is None:
+            return None
+        position = esds[0] + 4
+        expected_tags = (0x03, 0x04)
+        try:
+            for tag in expected_tags:
+                if data[position] != tag:
+                    return None
+                position += 1
+                # 描述符长度为1-4字节的变长整数
+                for _ in range(4):
+                    position += 1
+                    if not data[position - 1] & 0x80:
+                        break
+                if tag == 0x03:
+                    flags = data[position + 2]
+                    position += 3
+                    if flags & 0x80:
+                        position += 2
+                    if flags & 0x40:
+                        position += 1 + data[position]
+                    if flags & 0x20:
+                        position += 2
+            return data[position]
+        except IndexError:
+            return None
+
+    def read_info(self) -> Optional[Dict[str, Any]]:
+        """
+        生成与ffprobe输出结构相同的信息字典
+
+        Returns:
+            {'format': {...}, 'streams': [...]}，无法解析时返回None
+        """
+        layout = self.read_layout()
+        if layout is None or layout['fragmented']:
+            return None
+        parsed = self.read_tracks(layout['moov'])
+        if parsed is None:
+            return None
+        duration, tracks = parsed
+
+        streams = []
+        for index, track in enumerate(tracks):
+            codec_name, codec_long_name = track['codec']
+            stream = {
+                'index': index,
+                'codec_name': codec_name,
+                'codec_long_name': codec_long_name,
+                'codec_type': 'video' if track['handler'] == 'vide' else 'audio',
+                'codec_tag_string': track['codec_tag'],
+                'time_base': f"1/{track['timescale']}",
+                'duration': f"{track['duration']:.6f}"
+            }
+            if track['handler'] == 'vide':
+                stream['width'] = track['width']
+                stream['height'] = track['height']
+            else:
+                stream['sample_rate'] = str(track['sample_rate'])
+                stream['channels'] = track['channels']
+            streams.append(stream)
+
+        size = layout['size']
+        return {
+            'format': {
+                'filename': self.video_path,
+                'nb_streams': len(streams),
+                'format_name': 'mov,mp4,m4a,3gp,3g2,mj2',
+                'format_long_name': 'QuickTime / MOV',
+                'duration': f"{duration:.6f}",
+                'size': str(size),
+                'bit_rate': str(int(size * 8 / duration)),
+                'tags': {'major_brand': layout['major_brand']} if layout['major_brand'] else {}
+            },
+            'streams': streams
+        }
+
+
 class VideoUtils:
     """视频相关工具类"""
     
@@ -19,7 +338,7 @@ class VideoUtils:
     
     def get_video_info(self, video_path: str) -> Dict[str, Any]:
         """
-        获取视频基本信息
+        获取视频基本信息（文件未修改时使用缓存的ffprobe结果）
         
         Args:
             video_path: 视频文件路径
@@ -30,6 +349,19 @@ class VideoUtils:
         Raises:
             FFmpegError: ffprobe执行失败
         """
+        from ..ffmpeg.probe_cache import get_probe_cache
+        return get_probe_cache().get(video_path, self._probe)
+    
+    def _probe(self, video_path: str) -> Dict[str, Any]:
+        """获取视频信息：MP4优先直接解析box，无法解析时运行ffprobe"""
+        if os.path.isfile(video_path):
+            info = MP4BoxReader(video_path).read_info()
+            if info is not None:
+                return info
+        return self._run_ffprobe(video_path)
+    
+    def _run_ffprobe(self, video_path: str) -> Dict[str, Any]:
+        """运行ffprobe获取视频信息"""
         import sys
         
         cmd = [
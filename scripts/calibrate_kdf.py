@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# scripts/calibrate_kdf.py
+import sys
+import os
+import json
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from player.config.config_manager import ConfigManager
+from player.crypto.kdf import KDFParams, calibrate_kdf, measure_kdf, load_configured_kdf_params
+from player.exceptions.custom_exceptions import VideoEncryptionError
+
+
+def main():
+    """测量本机密钥派生速度并选出达到目标解锁耗时的参数"""
+    parser = argparse.ArgumentParser(description='校准密钥派生参数（解锁耗时与安全强度的权衡）')
+    parser.add_argument('--target-ms', type=float, default=250,
+                       help='目标解锁耗时（毫秒，默认250）')
+    parser.add_argument('--kdf', choices=[KDFParams.PBKDF2, KDFParams.SCRYPT], default=None,
+                       help='密钥派生算法（默认使用配置文件中的key_derivation）')
+    parser.add_argument('--max-memory-mb', type=int, default=256,
+                       help='scrypt允许使用的最大内存（MB，默认256）')
+    parser.add_argument('--config', default='config.json',
+                       help='配置文件路径（默认: config.json）')
+    parser.add_argument('--write', action='store_true',
+                       help='把校准结果写入配置文件')
+
+    args = parser.parse_args()
+
+    try:
+        current = load_configured_kdf_params(args.config)
+        kdf = args.kdf or current.kdf
+
+        print(f"当前参数: {current}")
+        print(f"当前解锁耗时: {measure_kdf(current) * 1000:.1f} ms")
+        print(f"正在校准 {kdf}，目标 {args.target_ms:.0f} ms ...")
+
+        params, elapsed = calibrate_kdf(kdf, args.target_ms / 1000, current.salt_length,
+                                        args.max_memory_mb * 1024 * 1024)
+
+        print(f"推荐参数: {params}")
+        print(f"实测解锁耗时: {elapsed * 1000:.1f} ms")
+        print(f"配置项: {json.dumps(params.to_config(), ensure_ascii=False)}")
+
+        if args.write:
+            # 直接修改用户配置文件中的encryption段，不写入其他默认值
+            config = {}
+            if os.path.exists(args.config):
+                with open(args.config, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+            config.setdefault("encryption", {}).update(params.to_config())
+            if not ConfigManager(args.config).save_config(config):
+                sys.exit(1)
+            print(f"✓ 已写入配置文件: {args.config}")
+            print("  新加密的文件将使用新参数，已有文件按各自文件头中的参数解密")
+
+    except VideoEncryptionError as e:
+        print(f"校准失败: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n用户中断操作")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,11 @@ import sys
 import argparse
 import getpass
 import subprocess
-import tempfile
+import threading
+import time
 import glob
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 import hashlib
 from Crypto.Cipher import AES
 from Crypto.Util import Counter
@@ -18,6 +19,9 @@ from Crypto.Util import Counter
 class SimpleDecryptor:
     """简易解密播放器"""
     
+    # 进程内只检查一次FFmpeg（批量处理时会创建多个实例）
+    _ffmpeg_checked = False
+    
     def __init__(self):
         """初始化解密器"""
         # 检查FFmpeg是否可用
@@ -25,6 +29,8 @@ class SimpleDecryptor:
     
     def _check_ffmpeg(self):
         """检查FFmpeg是否安装"""
+        if type(self)._ffmpeg_checked:
+            return
         try:
             subprocess.run(['ffmpeg', '-version'], 
                           capture_output=True, check=True)
@@ -32,6 +38,7 @@ class SimpleDecryptor:
             print("错误: 请先安装FFmpeg并将其添加到PATH中")
             print("下载地址: https://ffmpeg.org/download.html")
             sys.exit(1)
+        type(self)._ffmpeg_checked = True
     
     def decrypt_and_play(self, input_path: str, password: str, 
                         skip_notice: bool = False) -> bool:
@@ -62,21 +69,15 @@ class SimpleDecryptor:
                 
                 notice_length = int.from_bytes(header[5:9], 'big')
                 
-                # 读取提示段
-                notice_data = f.read(notice_length) if not skip_notice else f.seek(notice_length)
-                
-                # 剩余的是加密数据
-                encrypted_data = f.read()
+                # 提示段紧跟在文件头之后，剩余的是加密数据（播放时再分块读取）
+                data_offset = 9 + notice_length
             
             # 2. 如果不跳过提示，先播放提示
-            if not skip_notice and notice_data:
-                self._play_notice(notice_data)
-            
-            # 3. 解密视频流
-            decrypted_data = self._decrypt_data(encrypted_data, password)
+            if not skip_notice and notice_length:
+                self._play_notice(input_path, 9, notice_length)
             
-            # 4. 播放解密后的视频
-            return self._play_video_stream(decrypted_data)
+            # 3. 边解密边播放
+            return self._play_video_stream(self._iter_decrypted(input_path, data_offset, password))
             
         except Exception as e:
             print(f"✗ 播放失败: {e}")
@@ -84,21 +85,12 @@ class SimpleDecryptor:
             traceback.print_exc()
             return False
     
-    def _play_notice(self, notice_data: bytes):
-        """播放提示段"""
-        # 将提示数据写入临时文件
-        temp_file = tempfile.NamedTemporaryFile(suffix='.mp4', delete=False)
-        temp_file.write(notice_data)
-        temp_file.close()
-        
-        try:
-            print("播放提示段...")
-            cmd = ['ffplay', '-autoexit', '-window_title', '版权提示', temp_file.name]
-            subprocess.run(cmd, capture_output=True)
-        finally:
-            # 清理临时文件
-            if os.path.exists(temp_file.name):
-                os.remove(temp_file.name)
+    def _play_notice(self, input_path: str, offset: int, length: int):
+        """播放提示段（通过subfile协议直接读取文件中的这段数据，不复制到临时文件）"""
+        print("播放提示段...")
+        notice_url = f"subfile,,start,{offset},end,{offset + length},,:{os.path.abspath(input_path)}"
+        cmd = ['ffplay', '-autoexit', '-window_title', '版权提示', notice_url]
+        subprocess.run(cmd, capture_output=True)
     
     def _decrypt_data(self, encrypted_data: bytes, password: str) -> bytes:
         """解密数据"""
@@ -113,30 +105,67 @@ class SimpleDecryptor:
         # 解密数据
         return cipher.decrypt(encrypted_data)
     
-    def _play_video_stream(self, video_data: bytes) -> bool:
-        """播放视频流"""
-        # 将视频数据写入临时文件
-        temp_file = tempfile.NamedTemporaryFile(suffix='.h264', delete=False)
-        temp_file.write(video_data)
-        temp_file.close()
+    def _iter_decrypted(self, input_path: str, data_offset: int, password: str,
+                        chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """分块读取并解密数据（与_decrypt_data结果一致）"""
+        key = hashlib.sha256(password.encode()).digest()
+        iv = b'\x00' * 16
+        counter = Counter.new(128, initial_value=int.from_bytes(iv, 'big'))
+        cipher = AES.new(key, AES.MODE_CTR, counter=counter)
         
-        try:
-            print("播放视频...")
-            # 使用ffplay播放
-            cmd = [
-                'ffplay',
-                '-window_title', '加密视频播放器',
-                '-autoexit',
-                temp_file.name
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True)
-            return result.returncode == 0
-            
-        finally:
-            # 清理临时文件
-            if os.path.exists(temp_file.name):
-                os.remove(temp_file.name)
+        with open(input_path, 'rb') as f:
+            f.seek(data_offset)
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield cipher.decrypt(chunk)
+    
+    def _play_video_stream(self, chunks: Iterator[bytes]) -> bool:
+        """播放视频流（ffplay从管道读取，解密后的数据不写入磁盘）"""
+        print("播放视频...")
+        cmd = [
+            'ffplay',
+            '-window_title', '加密视频播放器',
+            '-autoexit',
+            'pipe:0'
+        ]
+        
+        start = time.perf_counter()
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        
+        def produce():
+            try:
+                for chunk in chunks:
+                    process.stdin.write(chunk)
+            except OSError:
+                pass  # 播放器已关闭
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+        
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        
+        # ffplay开始播放后会输出状态行（M-V/M-A/A-V），以此计算首帧时间
+        ttff = None
+        tail = b''
+        while True:
+            data = process.stderr.read1(4096)
+            if not data:
+                break
+            if ttff is None:
+                tail = (tail + data)[-64:]
+                if b'M-V:' in tail or b'M-A:' in tail or b'A-V:' in tail:
+                    ttff = time.perf_counter() - start
+                    print(f"首帧时间(TTFF): {ttff * 1000:.0f} ms")
+        
+        returncode = process.wait()
+        producer.join()
+        return returncode == 0
 
 
 def decrypt_single():
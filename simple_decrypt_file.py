@@ -44,42 +44,38 @@ class FileDecryptor:
             (是否成功, 消息)
         """
         try:
-            # 加载加密文件
-            encrypted_file = EncryptedVideoFile(input_path)
+            # 加载加密文件（惰性模式，按需读取各段）
+            encrypted_file = EncryptedVideoFile(input_path, lazy=True)
             
             print(f"输入文件: {input_path}")
-            print(f"提示段大小: {len(encrypted_file.notice_data)} 字节")
-            print(f"加密段大小: {len(encrypted_file.encrypted_data)} 字节")
+            print(f"提示段大小: {encrypted_file.notice_size} 字节")
+            print(f"加密段大小: {encrypted_file.encrypted_size} 字节")
             
             # 获取加密信息
             encryption_info = encrypted_file.header.get_encryption_info()
             algorithm = encryption_info.get('algorithm', 'N/A')
             print(f"加密算法: {algorithm}")
             
-            # 解密数据
-            encrypted_data = encrypted_file.extract_encrypted_section()
-            decrypted_data = self.decryptor.decrypt_stream(encrypted_data, password, encryption_info)
-            print(f"✓ 解密完成，解密后大小: {len(decrypted_data)} 字节")
-            
-            # 保存解密后的文件
+            # 保存解密后的文件（分块解密并直接写入输出文件）
             output_dir = os.path.dirname(output_path)
             if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir)
             
-            with open(output_path, 'wb') as f:
-                f.write(decrypted_data)
+            decrypted_size = self.decryptor.decrypt_file(input_path, output_path, password)
+            print(f"✓ 解密完成，解密后大小: {decrypted_size} 字节")
             
             print(f"✓ 解密文件已保存: {output_path}")
             
             # 保存提示段（载体视频）
             notice_output = None
-            if save_notice and len(encrypted_file.notice_data) > 0:
+            if save_notice and encrypted_file.notice_size > 0:
                 notice_output = os.path.splitext(output_path)[0] + "_notice" + os.path.splitext(output_path)[1]
                 if not output_path.endswith('.mp4'):
                     notice_output = os.path.splitext(output_path)[0] + "_notice.mp4"
                 
                 with open(notice_output, 'wb') as f:
-                    f.write(encrypted_file.notice_data)
+                    for chunk in encrypted_file.iter_notice_chunks():
+                        f.write(chunk)
                 print(f"✓ 提示段（载体视频）已保存: {notice_output}")
             
             return True, f"解密成功: {output_path}"
@@ -19,6 +19,9 @@ import json
 class SimpleEncryptor:
     """简易加密器"""
     
+    # 进程内只检查一次FFmpeg（批量处理时会创建多个实例）
+    _ffmpeg_checked = False
+    
     def __init__(self):
         """初始化加密器"""
         # 检查FFmpeg是否可用
@@ -26,6 +29,8 @@ class SimpleEncryptor:
     
     def _check_ffmpeg(self):
         """检查FFmpeg是否安装"""
+        if type(self)._ffmpeg_checked:
+            return
         try:
             subprocess.run(['ffmpeg', '-version'], 
                           capture_output=True, check=True)
@@ -33,6 +38,7 @@ class SimpleEncryptor:
             print("错误: 请先安装FFmpeg并将其添加到PATH中")
             print("下载地址: https://ffmpeg.org/download.html")
             sys.exit(1)
+        type(self)._ffmpeg_checked = True
     
     def encrypt_video(self, input_path: str, output_path: str, 
                      password: str, notice_duration: int = 10) -> bool:
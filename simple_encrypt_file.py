@@ -14,6 +14,7 @@ from player.core.encryptor import Encryptor
 from player.core.decryptor import Decryptor
 from player.file.encrypted_video import EncryptedVideoFile
 from player.file.file_header import FileHeader
+from player.utils.file_utils import FileUtils
 from player.exceptions.custom_exceptions import CryptoError, FileFormatError
 
 
@@ -49,23 +50,24 @@ class FileEncryptor:
             是否成功
         """
         try:
-            # 读取输入文件
-            with open(input_path, 'rb') as f:
-                file_data = f.read()
-            
             print(f"输入文件: {input_path}")
-            print(f"文件大小: {len(file_data)} 字节")
+            print(f"文件大小: {os.path.getsize(input_path)} 字节")
             
-            # 加密数据
-            encrypted_data, encryption_info = self.encryptor.encrypt_stream(file_data, password)
-            print(f"✓ 加密完成，加密后大小: {len(encrypted_data)} 字节")
+            # 流式加密数据（分块读取，写文件时边加密边写入）
+            encrypted_chunks, encryption_info = self.encryptor.encrypt_iter(
+                FileUtils.read_file_chunks(input_path, self.encryptor.crypto_algorithm.preferred_chunk_size()),
+                password
+            )
             
             # 创建文件头
-            header = FileHeader()
+            header = FileHeader(version=FileHeader.CURRENT_VERSION)
             header.set_encryption_info(
                 algorithm=encryption_info['algorithm'],
                 salt=encryption_info['salt'],
-                iv_nonce=encryption_info['iv_nonce']
+                iv_nonce=encryption_info['iv_nonce'],
+                key_check=encryption_info.get('key_check'),
+                file_salt=encryption_info.get('file_salt'),
+                kdf_params=encryption_info.get('kdf_params')
             )
             
             # 准备提示段数据（载体视频）
@@ -77,8 +79,9 @@ class FileEncryptor:
             
             # 创建加密文件
             encrypted_file = EncryptedVideoFile()
-            encrypted_file.create_from_parts(notice_data, encrypted_data, header)
-            encrypted_file.save_file(output_path)
+            encrypted_file.create_from_parts(notice_data, None, header)
+            encrypted_size = encrypted_file.save_file_stream(output_path, encrypted_chunks)
+            print(f"✓ 加密完成，加密后大小: {encrypted_size} 字节")
             
             print(f"✓ 加密文件已保存: {output_path}")
             
@@ -112,25 +115,20 @@ class FileEncryptor:
             是否成功
         """
         try:
-            # 加载加密文件
-            encrypted_file = EncryptedVideoFile(input_path)
+            # 加载加密文件（惰性模式，按需读取各段）
+            encrypted_file = EncryptedVideoFile(input_path, lazy=True)
             
             print(f"输入文件: {input_path}")
-            print(f"提示段大小: {len(encrypted_file.notice_data)} 字节")
-            print(f"加密段大小: {len(encrypted_file.encrypted_data)} 字节")
+            print(f"提示段大小: {encrypted_file.notice_size} 字节")
+            print(f"加密段大小: {encrypted_file.encrypted_size} 字节")
             
             # 获取加密信息
             encryption_info = encrypted_file.header.get_encryption_info()
             print(f"加密算法: {encryption_info.get('algorithm', 'N/A')}")
             
-            # 解密数据
-            encrypted_data = encrypted_file.extract_encrypted_section()
-            decrypted_data = self.decryptor.decrypt_stream(encrypted_data, password, encryption_info)
-            print(f"✓ 解密完成，解密后大小: {len(decrypted_data)} 字节")
-            
-            # 保存解密后的文件
-            with open(output_path, 'wb') as f:
-                f.write(decrypted_data)
+            # 分块解密并直接写入输出文件
+            decrypted_size = self.decryptor.decrypt_file(input_path, output_path, password)
+            print(f"✓ 解密完成，解密后大小: {decrypted_size} 字节")
             
             print(f"✓ 解密文件已保存: {output_path}")
             return True
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# test_batch_pool.py - 测试批量加密工作池的结果顺序、输出收集和工作者隔离
+
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from player.core.batch_pool import BatchWorkerPool
+from player.exceptions.custom_exceptions import VideoEncryptionError
+
+# 先提交的任务耗时更长，完成顺序与提交顺序相反
+DELAYS = [0.3, 0.2, 0.1, 0.0, 0.05]
+
+
+def _sleep_task(processor, task):
+    """休眠后返回结果（进程池要求为模块级函数）"""
+    print(f"task {task['index']} start")
+    time.sleep(task['delay'])
+    print(f"task {task['index']} end")
+    if task.get('fail'):
+        raise ValueError(f"task {task['index']} failed")
+    return {'success': True, 'index': task['index'], 'pid': os.getpid(),
+            'batch': processor.encryptor._batch is not None, 'processor': id(processor)}
+
+
+def _tasks(fail_index=None):
+    return [{'index': index, 'delay': delay, 'fail': index == fail_index}
+            for index, delay in enumerate(DELAYS)]
+
+
+def test_result_order():
+    """测试1: 线程池和进程池都按提交顺序返回结果，每个任务的输出单独收集"""
+    print("测试1: 结果顺序与输出收集")
+    for executor in BatchWorkerPool.EXECUTORS:
+        stdout = sys.stdout
+        pool = BatchWorkerPool(jobs=3, executor=executor)
+        results = list(pool.run(_sleep_task, _tasks(fail_index=2)))
+        assert sys.stdout is stdout
+
+        assert [task['index'] for task, _ in results] == list(range(len(DELAYS)))
+        for task, result in results:
+            if task['index'] == 2:
+                assert not result['success'] and result['error'] == "task 2 failed"
+                assert result['output'].startswith("task 2 start\ntask 2 end\n")
+                assert "ValueError" in result['output']
+                continue
+            assert result['success'] and result['index'] == task['index']
+            assert result['output'] == f"task {task['index']} start\ntask {task['index']} end\n"
+            assert not result['batch']
+            if executor == "process":
+                assert result['pid'] != os.getpid()
+            else:
+                assert result['pid'] == os.getpid()
+
+        # 每个工作者复用自己的VideoProcessor
+        workers = {result['processor'] for _, result in results if result['success']}
+        assert 1 <= len(workers) <= 3
+        print(f"  ✓ {executor}")
+    print()
+
+
+def test_batch_password():
+    """测试2: 批量密钥模式下每个工作者派生主密钥，结束后清零"""
+    print("测试2: 批量密钥模式")
+    processors = []
+
+    def keep_processor(processor, task):
+        processors.append(processor)
+        return _sleep_task(processor, task)
+
+    pool = BatchWorkerPool(jobs=2, executor="thread", batch_password="test-password")
+    results = [result for _, result in pool.run(keep_processor, _tasks())]
+    assert all(result['success'] and result['batch'] for result in results)
+    assert processors and all(processor.encryptor._batch is None for processor in processors)
+    print("  ✓ 主密钥在结束后清零")
+    print()
+
+
+def test_invalid_arguments():
+    """测试3: 参数校验和自动选择并行任务数"""
+    print("测试3: 参数与自动并行数")
+    for kwargs in ({'executor': 'cluster'}, {'jobs': 0}):
+        try:
+            BatchWorkerPool(**kwargs)
+        except VideoEncryptionError:
+            continue
+        raise AssertionError(f"{kwargs} 未报错")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = []
+        for index in range(3):
+            path = os.path.join(temp_dir, f"{index}.mp4")
+            with open(path, 'wb') as f:
+                f.write(b'x' * 1024)
+            files.append(path)
+        jobs = BatchWorkerPool.auto_jobs(files, temp_dir)
+        assert 1 <= jobs <= min(3, os.cpu_count() or 1)
+        assert BatchWorkerPool.auto_jobs([], temp_dir) == 1
+    print("  ✓ 无效参数报错，自动并行数不超过文件数和CPU核心数")
+    print()
+
+
+def main():
+    """运行所有测试"""
+    print("=" * 60)
+    print("批量加密工作池测试")
+    print("=" * 60)
+    print()
+
+    test_result_order()
+    test_batch_password()
+    test_invalid_arguments()
+
+    print("=" * 60)
+    print("测试完成")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
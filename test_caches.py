@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# test_caches.py - 测试派生密钥缓存、解密视频流缓存、ffprobe结果缓存和提示视频缓存
+
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from player.crypto.key_cache import DerivedKeyCache
+from player.core.payload_cache import DecryptedPayloadCache
+from player.ffmpeg.probe_cache import ProbeCache
+from player.ffmpeg.notice_cache import NoticeCache
+from player.exceptions.custom_exceptions import VideoEncryptionError, FFmpegError
+
+SALT = b'0123456789abcdef'
+COST = (1000, 0, 0)
+
+
+def test_key_cache():
+    """测试1: 派生密钥缓存的命中、TTL过期、LRU淘汰和清零"""
+    print("测试1: 派生密钥缓存")
+    cache = DerivedKeyCache(max_entries=2, ttl=60)
+    derived = []
+
+    def derive(key):
+        def run():
+            derived.append(key)
+            return key
+        return run
+
+    key_a = cache.get_or_derive("a", SALT, "PBKDF2", COST, derive(b'A' * 32))
+    assert cache.get_or_derive("a", SALT, "PBKDF2", COST, derive(b'X' * 32)) == key_a
+    assert derived == [b'A' * 32]
+    # 密码、salt、KDF或成本参数不同都是不同的条目
+    assert cache.get("b", SALT, "PBKDF2", COST) is None
+    assert cache.get("a", b'other-salt-value', "PBKDF2", COST) is None
+    assert cache.get("a", SALT, "scrypt", COST) is None
+    assert cache.get("a", SALT, "PBKDF2", (2000, 0, 0)) is None
+    print("  ✓ 命中与缓存键")
+
+    # LRU：访问a之后再加入c，淘汰最久未使用的b
+    cache.put("b", SALT, "PBKDF2", COST, b'B' * 32)
+    assert cache.get("a", SALT, "PBKDF2", COST) == b'A' * 32
+    stored_b = cache._entries[cache._make_key("b", SALT, "PBKDF2", COST)][0]
+    cache.put("c", SALT, "PBKDF2", COST, b'C' * 32)
+    assert cache.get("b", SALT, "PBKDF2", COST) is None
+    assert stored_b == bytearray(32)
+    assert cache.get("a", SALT, "PBKDF2", COST) is not None
+    assert cache.stats()['entries'] == 2
+    print("  ✓ LRU淘汰并清零")
+
+    stored = [entry[0] for entry in cache._entries.values()]
+    cache.wipe()
+    assert cache.stats()['entries'] == 0
+    assert all(key == bytearray(len(key)) for key in stored)
+    print("  ✓ wipe清零")
+
+    short = DerivedKeyCache(ttl=0.05)
+    short.put("a", SALT, "PBKDF2", COST, b'A' * 32)
+    assert short.get("a", SALT, "PBKDF2", COST) == b'A' * 32
+    time.sleep(0.1)
+    assert short.get("a", SALT, "PBKDF2", COST) is None
+    print("  ✓ TTL过期")
+
+    disabled = DerivedKeyCache(max_entries=0)
+    disabled.put("a", SALT, "PBKDF2", COST, b'A' * 32)
+    assert disabled.get("a", SALT, "PBKDF2", COST) is None
+    print("  ✓ max_entries=0禁用缓存")
+    print()
+
+
+def _cache_payload(cache, key, password, data):
+    """模拟一次完整播放：数据经过写入器后提交到缓存"""
+    writer = cache.begin(key, password, len(data), True)
+    assert writer is not None
+    assert b''.join(writer.tee([data[:10], data[10:]])) == data
+    return writer.commit()
+
+
+def test_payload_cache():
+    """测试2: 解密视频流缓存的命中、密码校验和按预算淘汰"""
+    print("测试2: 解密视频流缓存")
+    try:
+        DecryptedPayloadCache(1024, storage="disk")
+    except VideoEncryptionError:
+        pass
+    else:
+        raise AssertionError("无效的存储方式未报错")
+
+    disabled = DecryptedPayloadCache()
+    assert not disabled.enabled and disabled.begin(('/a', 1, 1, b''), "pw", 1, True) is None
+
+    for storage in DecryptedPayloadCache.STORAGES:
+        cache = DecryptedPayloadCache(budget=100, storage=storage)
+        key_a = ('/a', 40, 1, b'iv')
+        key_b = ('/b', 40, 1, b'iv')
+        key_c = ('/c', 40, 1, b'iv')
+
+        assert cache.lookup(key_a, "pw") is None
+        assert _cache_payload(cache, key_a, "pw", b'a' * 40)
+        entry = cache.lookup(key_a, "pw")
+        assert entry is not None and b''.join(entry.iter_chunks(16)) == b'a' * 40
+        # 密码不同视为未命中
+        assert cache.lookup(key_a, "other") is None
+
+        # 超出预算时淘汰最久未使用的条目并释放其数据
+        assert _cache_payload(cache, key_b, "pw", b'b' * 40)
+        entry_b = cache._entries[key_b]
+        assert cache.lookup(key_a, "pw") is not None
+        assert _cache_payload(cache, key_c, "pw", b'c' * 40)
+        assert cache.lookup(key_b, "pw") is None
+        assert entry_b.data is None and entry_b.path is None
+        assert cache.lookup(key_a, "pw") is not None and cache.lookup(key_c, "pw") is not None
+        assert cache.stats()['bytes'] == 80
+
+        # 没有完整播放的不缓存，超出预算的不开始缓存
+        writer = cache.begin(('/d', 40, 1, b'iv'), "pw", 40, True)
+        next(writer.tee(iter([b'd' * 20, b'd' * 20])))
+        assert not writer.commit()
+        assert cache.lookup(('/d', 40, 1, b'iv'), "pw") is None
+        assert cache.begin(('/d', 101, 1, b'iv'), "pw", 101, True) is None
+
+        # 同一路径的新版本替换旧条目
+        key_a2 = ('/a', 41, 2, b'iv')
+        assert _cache_payload(cache, key_a2, "pw", b'A' * 41)
+        assert cache.lookup(key_a, "pw") is None
+        assert b''.join(cache.lookup(key_a2, "pw").iter_chunks()) == b'A' * 41
+
+        cache.wipe()
+        assert cache.stats()['entries'] == 0 and cache.stats()['bytes'] == 0
+        print(f"  ✓ {storage}")
+
+    # 文件被修改或文件头IV不同时缓存键随之变化
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "video.enc.mp4")
+        with open(path, 'wb') as f:
+            f.write(b'x' * 10)
+        key = DecryptedPayloadCache.make_key(path, b'iv')
+        assert DecryptedPayloadCache.make_key(path, b'iv') == key
+        assert DecryptedPayloadCache.make_key(path, b'other-iv') != key
+        with open(path, 'wb') as f:
+            f.write(b'y' * 11)
+        assert DecryptedPayloadCache.make_key(path, b'iv') != key
+        print("  ✓ 缓存键随文件变化")
+    print()
+
+
+def test_probe_cache():
+    """测试3: ffprobe结果缓存在文件大小或修改时间变化时失效，并持久化到数据库"""
+    print("测试3: ffprobe结果缓存")
+    calls = []
+
+    def probe(path):
+        calls.append(path)
+        with open(path, 'rb') as f:
+            return {'format': {'size': str(len(f.read()))}}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "cache", "probe.sqlite3")
+        path = os.path.join(temp_dir, "video.mp4")
+        with open(path, 'wb') as f:
+            f.write(b'x' * 10)
+
+        cache = ProbeCache(db_path)
+        info = cache.get(path, probe)
+        assert info == {'format': {'size': '10'}} and len(calls) == 1
+        # 命中时返回新的副本，调用方修改结果不影响缓存
+        info['format']['size'] = 'changed'
+        assert cache.get(path, probe) == {'format': {'size': '10'}} and len(calls) == 1
+        print("  ✓ 命中")
+
+        # 大小变化
+        with open(path, 'wb') as f:
+            f.write(b'y' * 11)
+        assert cache.get(path, probe) == {'format': {'size': '11'}} and len(calls) == 2
+
+        # 大小不变、修改时间变化
+        stat = os.stat(path)
+        with open(path, 'wb') as f:
+            f.write(b'z' * 11)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert cache.get(path, probe) == {'format': {'size': '11'}} and len(calls) == 3
+        assert cache.get(path, probe) and len(calls) == 3
+        print("  ✓ 大小或修改时间变化后失效")
+
+        # 新实例（新进程）从数据库读取
+        reopened = ProbeCache(db_path)
+        assert reopened.get(path, probe) == {'format': {'size': '11'}} and len(calls) == 3
+        assert reopened.stats()['hits'] == 1
+        print("  ✓ 持久化")
+
+        # 失败的结果不缓存
+        def failing_probe(path):
+            calls.append(path)
+            raise FFmpegError("probe failed")
+
+        other = os.path.join(temp_dir, "broken.mp4")
+        with open(other, 'wb') as f:
+            f.write(b'broken')
+        for _ in range(2):
+            try:
+                cache.get(other, failing_probe)
+            except FFmpegError:
+                pass
+            else:
+                raise AssertionError("probe失败未报错")
+        assert len(calls) == 5
+        print("  ✓ 失败结果不缓存")
+
+        # 禁用时每次都调用probe
+        disabled = ProbeCache(None, max_entries=0)
+        disabled.get(path, probe)
+        disabled.get(path, probe)
+        assert len(calls) == 7
+        print("  ✓ max_entries=0禁用缓存")
+
+        # Windows下数据库文件打开时无法删除临时目录
+        for opened in (cache, reopened):
+            opened._db.close()
+    print()
+
+
+def test_notice_cache():
+    """测试4: 提示视频按内容寻址，内容相同时只生成一次"""
+    print("测试4: 提示视频缓存")
+    style = {'size': '1280x720', 'font_size': 48}
+    key = NoticeCache.make_key("版权提示", 10, style, "6.0")
+    assert NoticeCache.make_key("版权提示", 10, dict(style), "6.0") == key
+    for other in (NoticeCache.make_key("其他提示", 10, style, "6.0"),
+                  NoticeCache.make_key("版权提示", 5, style, "6.0"),
+                  NoticeCache.make_key("版权提示", 10, dict(style, font_size=32), "6.0"),
+                  NoticeCache.make_key("版权提示", 10, style, "7.0")):
+        assert other != key
+    print("  ✓ 缓存键只由内容决定")
+
+    created = []
+
+    def create(content):
+        def run(output_path):
+            assert output_path.endswith('.mp4')
+            created.append(content)
+            with open(output_path, 'wb') as f:
+                f.write(content)
+        return run
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = NoticeCache(os.path.join(temp_dir, "notices"), max_size=250)
+        path = cache.get_or_create(key, create(b'a' * 100))
+        assert os.path.basename(path) == f"{key}.mp4"
+        assert cache.get_or_create(key, create(b'x' * 100)) == path
+        with open(path, 'rb') as f:
+            assert f.read() == b'a' * 100
+        assert created == [b'a' * 100] and cache.stats()['hits'] == 1
+        # 另一个实例（下一个批次）共享同一目录
+        assert NoticeCache(cache.cache_dir).get_or_create(key, create(b'x' * 100)) == path
+        assert len(created) == 1
+        print("  ✓ 相同内容只生成一次")
+
+        # 生成失败时异常原样传递，不留下文件
+        def failing(output_path):
+            with open(output_path, 'wb') as f:
+                f.write(b'partial')
+            raise VideoEncryptionError("生成默认提示视频失败")
+
+        try:
+            cache.get_or_create("failed", failing)
+        except VideoEncryptionError:
+            pass
+        else:
+            raise AssertionError("生成失败未报错")
+        assert sorted(os.listdir(cache.cache_dir)) == [f"{key}.mp4"]
+        print("  ✓ 生成失败不留下文件")
+
+        # 超过上限时淘汰最久未使用的文件，保留刚写入的
+        os.utime(path, (time.time() - 100, time.time() - 100))
+        second = cache.get_or_create("second", create(b'b' * 100))
+        third = cache.get_or_create("third", create(b'c' * 100))
+        assert not os.path.exists(path)
+        assert os.path.exists(second) and os.path.exists(third)
+        print("  ✓ 按最近使用时间淘汰")
+
+    assert NoticeCache(temp_dir, max_size=0).get_or_create(key, create(b'x')) is None
+    print("  ✓ max_size=0禁用缓存")
+    print()
+
+
+def main():
+    """运行所有测试"""
+    print("=" * 60)
+    print("缓存测试")
+    print("=" * 60)
+    print()
+
+    test_key_cache()
+    test_payload_cache()
+    test_probe_cache()
+    test_notice_cache()
+
+    print("=" * 60)
+    print("测试完成")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# test_container.py - 测试容器格式（v1/v2）往返和索引尾校验
+
+import os
+import sys
+import tempfile
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from player.core.crypto_factory import CryptoAlgorithmFactory
+from player.core.decryptor import Decryptor
+from player.crypto.kdf import KDFParams
+from player.file.encrypted_video import EncryptedVideoFile
+from player.file.file_header import FileHeader, FileTrailer
+from player.exceptions.custom_exceptions import FileFormatError
+
+PASSWORD = "test-password"
+# 测试用较低的迭代次数（文件头中记录参数，解密时按记录的参数派生）
+KDF_PARAMS = KDFParams(KDFParams.PBKDF2, iterations=1000)
+ALGORITHMS = ["AES-CTR", "AES-CBC", "ChaCha20"]
+
+
+def _plain_data(size):
+    """可重复的测试明文（不含魔数）"""
+    return bytes((i * 7 + i // 251) % 256 for i in range(size)).replace(b'ENCV', b'encv')
+
+
+def _write_encrypted(path, plain, notice, algorithm="AES-CTR", version=FileHeader.CURRENT_VERSION):
+    """按Encryptor的流程（流式加密 + save_file_stream）生成加密文件"""
+    crypto = CryptoAlgorithmFactory().create_algorithm(algorithm)
+    # v1文件头没有扩展区，不记录KDF参数，解密时使用默认参数
+    kdf_params = KDF_PARAMS if version >= FileHeader.VERSION_TRAILER else KDFParams()
+    key, salt = crypto.generate_key(PASSWORD, kdf_params=kdf_params)
+    chunk_size = 64 * 1024
+    chunks = (plain[i:i + chunk_size] for i in range(0, len(plain), chunk_size))
+    encrypted_chunks, params = crypto.encrypt_iter(chunks, key)
+
+    header = FileHeader(version=version)
+    header.set_encryption_info(
+        algorithm=algorithm,
+        salt=salt,
+        iv_nonce=params.get('iv') or params.get('nonce'),
+        key_check=crypto.compute_key_check(key),
+        kdf_params=kdf_params
+    )
+    encrypted_file = EncryptedVideoFile()
+    if version >= FileHeader.VERSION_TRAILER:
+        encrypted_file.create_from_parts(notice, None, header)
+        encrypted_file.save_file_stream(path, encrypted_chunks)
+    else:
+        # v1文件：整体写入，没有索引尾
+        encrypted_file.create_from_parts(notice, b''.join(encrypted_chunks), header)
+        encrypted_file.save_file(path)
+
+
+def _decrypt(path):
+    fd, output_path = tempfile.mkstemp(suffix='.bin')
+    os.close(fd)
+    try:
+        Decryptor().decrypt_file(path, output_path, PASSWORD)
+        with open(output_path, 'rb') as f:
+            return f.read()
+    finally:
+        os.remove(output_path)
+
+
+def test_v2_roundtrip():
+    """测试1: v2文件（索引尾）加密、加载和解密往返"""
+    print("测试1: v2容器往返")
+    plain = _plain_data(300 * 1024 + 13)
+    # 提示段中出现魔数时，v2仍应通过索引尾定位文件头
+    notice = b'NOTICE' + b'ENCV' + os.urandom(1000)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for algorithm in ALGORITHMS:
+            path = os.path.join(temp_dir, f"{algorithm}.enc.mp4")
+            _write_encrypted(path, plain, notice, algorithm)
+
+            for lazy in (False, True):
+                encrypted_file = EncryptedVideoFile(path, lazy=lazy)
+                assert encrypted_file.trailer is not None
+                assert encrypted_file.header.version == FileHeader.VERSION_TRAILER
+                assert encrypted_file.notice_size == len(notice)
+                assert encrypted_file.encrypted_offset == len(notice) + encrypted_file.header.size
+                assert encrypted_file.encrypted_offset + encrypted_file.encrypted_size + \
+                    FileTrailer.TRAILER_SIZE == os.path.getsize(path)
+                assert b''.join(encrypted_file.iter_notice_chunks()) == notice
+                ok, message = encrypted_file.verify_integrity()
+                assert ok, message
+
+            info = EncryptedVideoFile(path, lazy=True).header.get_encryption_info()
+            assert info['algorithm'] == algorithm
+            assert info['kdf_params'] == KDF_PARAMS
+            assert _decrypt(path) == plain
+            print(f"  ✓ {algorithm}")
+    print()
+
+
+def test_v1_legacy_load():
+    """测试2: v1文件（无索引尾）按搜索魔数的方式加载并解密"""
+    print("测试2: v1容器兼容")
+    plain = _plain_data(100 * 1024)
+    notice = b'LEGACY-NOTICE' * 50
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "legacy.enc.mp4")
+        _write_encrypted(path, plain, notice, version=FileHeader.VERSION_LEGACY)
+
+        for lazy in (False, True):
+            encrypted_file = EncryptedVideoFile(path, lazy=lazy)
+            assert encrypted_file.trailer is None
+            assert encrypted_file.header.version == FileHeader.VERSION_LEGACY
+            assert encrypted_file.notice_size == len(notice)
+            assert encrypted_file.encrypted_offset == len(notice) + FileHeader.HEADER_SIZE
+        assert _decrypt(path) == plain
+        print("  ✓ v1文件加载并解密")
+    print()
+
+
+def test_v2_damaged_trailer_rejected():
+    """测试3: 索引尾缺失或损坏的v2文件报错，而不是按v1方式误解析"""
+    print("测试3: 损坏的v2索引尾")
+    plain = _plain_data(50 * 1024)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "v2.enc.mp4")
+        _write_encrypted(path, plain, b'notice')
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        damaged = {
+            'truncated': data[:-FileTrailer.TRAILER_SIZE],
+            'bad_magic': data[:-FileTrailer.TRAILER_SIZE] + b'XXXX' + data[-FileTrailer.TRAILER_SIZE + 4:],
+        }
+        for name, content in damaged.items():
+            damaged_path = os.path.join(temp_dir, f"{name}.enc.mp4")
+            with open(damaged_path, 'wb') as f:
+                f.write(content)
+            for lazy in (False, True):
+                try:
+                    EncryptedVideoFile(damaged_path, lazy=lazy)
+                except FileFormatError:
+                    continue
+                raise AssertionError(f"{name} (lazy={lazy}) 未报错")
+            print(f"  ✓ {name}")
+    print()
+
+
+def main():
+    """运行所有测试"""
+    print("=" * 60)
+    print("容器格式测试")
+    print("=" * 60)
+    print()
+
+    test_v2_roundtrip()
+    test_v1_legacy_load()
+    test_v2_damaged_trailer_rejected()
+
+    print("=" * 60)
+    print("测试完成")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# test_mp4.py - 测试MP4 box解析和原生元数据写入
+
+import os
+import struct
+import sys
+import tempfile
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from player.metadata.mp4_tag_writer import MP4TagWriter
+from player.utils.video_utils import MP4BoxReader
+from player.exceptions.custom_exceptions import MetadataError
+
+def _box(box_type, payload):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def _full_box(box_type, payload, version=0):
+    return _box(box_type, struct.pack('>I', version << 24) + payload)
+
+
+def _make_mp4(media, moov_first=True):
+    """生成只有一条H.264视频轨道（320x240、2秒）的最小MP4"""
+    ftyp = _box(b'ftyp', b'isom' + struct.pack('>I', 512) + b'isomavc1')
+    mvhd = _full_box(b'mvhd', struct.pack('>IIII', 0, 0, 1000, 2000) + b'\x00' * 80)
+    mdhd = _full_box(b'mdhd', struct.pack('>IIII', 0, 0, 12800, 25600) + b'\x00' * 4)
+    hdlr = _full_box(b'hdlr', b'\x00' * 4 + b'vide' + b'\x00' * 12 + b'Video\x00')
+    avc1 = _box(b'avc1', b'\x00' * 6 + struct.pack('>H', 1) + b'\x00' * 16 +
+                struct.pack('>HH', 320, 240) + b'\x00' * 50)
+    stsd = _full_box(b'stsd', struct.pack('>I', 1) + avc1)
+
+    def build(chunk_offset):
+        stco = _full_box(b'stco', struct.pack('>II', 1, chunk_offset))
+        stbl = _box(b'stbl', stsd + stco)
+        trak = _box(b'trak', _box(b'mdia', mdhd + hdlr + _box(b'minf', stbl)))
+        return _box(b'moov', mvhd + trak)
+
+    mdat = _box(b'mdat', media)
+    moov_size = len(build(0))
+    if moov_first:
+        return ftyp + build(len(ftyp) + moov_size + 8) + mdat
+    return ftyp + mdat + build(len(ftyp) + 8)
+
+
+def _chunk_offset(data):
+    """读取唯一一个stco条目"""
+    position = data.find(b'stco')
+    return struct.unpack_from('>I', data, position + 12)[0]
+
+
+def test_mp4_box_reader():
+    """测试1: 原生解析MP4布局和流信息"""
+    print("测试1: MP4 box解析")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for moov_first in (True, False):
+            path = os.path.join(temp_dir, f"sample_{moov_first}.mp4")
+            with open(path, 'wb') as f:
+                f.write(_make_mp4(os.urandom(1024), moov_first))
+
+            reader = MP4BoxReader(path)
+            layout = reader.read_layout()
+            assert layout['moov_before_mdat'] == moov_first
+            assert not layout['fragmented']
+
+            info = reader.read_info()
+            stream = info['streams'][0]
+            assert stream['codec_type'] == 'video' and stream['codec_name'] == 'h264'
+            assert (stream['width'], stream['height']) == (320, 240)
+            assert abs(float(info['format']['duration']) - 2.0) < 1e-6
+            print(f"  ✓ moov位于{'mdat之前' if moov_first else '文件末尾'}")
+
+        path = os.path.join(temp_dir, "not_mp4.mp4")
+        with open(path, 'wb') as f:
+            f.write(b'not an mp4 file')
+        assert MP4BoxReader(path).read_info() is None
+        print("  ✓ 非MP4文件返回None")
+    print()
+
+
+def test_mp4_tag_writer():
+    """测试2: 原生写入元数据后块偏移仍指向原媒体数据"""
+    print("测试2: MP4元数据写入")
+    media = os.urandom(4096)
+    metadata = {'title': '测试标题', 'artist': 'artist', 'creation_time': '2024-01-02 03:04:05',
+                'not_whitelisted': 'x'}
+    writer = MP4TagWriter(['title', 'artist', 'comment', 'description', 'copyright', 'encoder',
+                           'creation_time'])
+
+    for moov_first in (True, False):
+        source = _make_mp4(media, moov_first)
+        output = writer.write(source, metadata)
+        offset = _chunk_offset(output)
+        assert output[offset:offset + len(media)] == media
+        assert '测试标题'.encode('utf-8') in output and b'\xa9nam' in output and b'\xa9ART' in output
+        assert b'not_whitelisted' not in output
+
+        # 再次写入时替换已有条目
+        rewritten = writer.write(output, {'title': 'new'})
+        offset = _chunk_offset(rewritten)
+        assert rewritten[offset:offset + len(media)] == media
+        assert b'new' in rewritten and '测试标题'.encode('utf-8') not in rewritten
+        assert b'\xa9ART' in rewritten
+        print(f"  ✓ moov位于{'mdat之前' if moov_first else '文件末尾'}")
+
+    try:
+        writer.write(_box(b'ftyp', b'isom\x00\x00\x02\x00') + _box(b'moof', b'') + _box(b'mdat', media), metadata)
+    except MetadataError:
+        print("  ✓ 非单个moov的文件交给FFmpeg处理")
+    else:
+        raise AssertionError("分片MP4未报错")
+    print()
+
+
+def main():
+    """运行所有测试"""
+    print("=" * 60)
+    print("MP4测试")
+    print("=" * 60)
+    print()
+
+    test_mp4_box_reader()
+    test_mp4_tag_writer()
+
+    print("=" * 60)
+    print("测试完成")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
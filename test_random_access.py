@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# test_random_access.py - 测试随机访问解密、本地HTTP范围服务器和可定位的解密文件对象
+
+import hashlib
+import http.client
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from player.core.crypto_factory import CryptoAlgorithmFactory
+from player.core.decryptor import Decryptor
+from player.file.decrypting_reader import DecryptingReader
+from player.file.encrypted_video import EncryptedVideoFile
+from player.file.file_header import FileHeader
+from player.player.range_server import DecryptedRangeServer
+
+PASSWORD = "test-password"
+ALGORITHMS = ["AES-CTR", "AES-CBC", "ChaCha20"]
+
+
+def _plain_data(size):
+    """可重复的测试明文（不含魔数）"""
+    return bytes((i * 7 + i // 251) % 256 for i in range(size)).replace(b'ENCV', b'encv')
+
+
+def _write_encrypted(path, plain, algorithm="AES-CTR"):
+    """流式加密生成v2加密文件（使用默认密钥派生参数）"""
+    crypto = CryptoAlgorithmFactory().create_algorithm(algorithm)
+    key, salt = crypto.generate_key(PASSWORD)
+    chunk_size = 64 * 1024
+    chunks = (plain[i:i + chunk_size] for i in range(0, len(plain), chunk_size))
+    encrypted_chunks, params = crypto.encrypt_iter(chunks, key)
+
+    header = FileHeader(version=FileHeader.CURRENT_VERSION)
+    header.set_encryption_info(algorithm, salt, params.get('iv') or params.get('nonce'))
+    encrypted_file = EncryptedVideoFile()
+    encrypted_file.create_from_parts(b'notice', None, header)
+    encrypted_file.save_file_stream(path, encrypted_chunks)
+    return key, params
+
+
+def test_random_access_decrypt():
+    """测试1: 随机访问解密与顺序解密的对应片段一致"""
+    print("测试1: 随机访问解密")
+    plain = _plain_data(5 * 1024 * 1024 + 17)
+    ranges = [(0, 16), (1, 31), (15, 2), (4095, 70000), (2 * 1024 * 1024 - 3, 3 * 1024 * 1024),
+              (len(plain) - 5, 100), (len(plain), 10), (len(plain) + 100, 10)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        decryptor = Decryptor()
+        for algorithm in ALGORITHMS:
+            path = os.path.join(temp_dir, f"{algorithm}.enc.mp4")
+            key, params = _write_encrypted(path, plain, algorithm)
+
+            for offset, length in ranges:
+                expected = plain[offset:offset + length]
+                assert decryptor.decrypt_range(path, PASSWORD, offset, length) == expected, \
+                    f"{algorithm} offset={offset} length={length}"
+
+            # 可定位的流密码：定位到任意偏移的cipher与从头加密的结果一致
+            crypto = CryptoAlgorithmFactory().create_algorithm(algorithm)
+            if crypto.is_seekable():
+                encrypted_file = EncryptedVideoFile(path, lazy=True)
+                for offset in (0, 5, 16, 1000003):
+                    segment = plain[offset:offset + 4096]
+                    cipher = crypto.create_cipher_at(key, offset, **params)
+                    assert cipher.encrypt(segment) == encrypted_file.read_encrypted_range(offset, len(segment))
+            print(f"  ✓ {algorithm}")
+    print()
+
+
+def _request(server, method, headers=None, path=None):
+    """发送一个请求，返回(状态码, 响应头, 响应体)"""
+    host, port = server._httpd.server_address[:2]
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        connection.request(method, path or server.url_path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def test_range_server():
+    """测试2: 范围服务器按Range头返回206/416，内容与明文一致"""
+    print("测试2: 本地HTTP范围服务器")
+    plain = _plain_data(300 * 1024 + 13)
+    size = len(plain)
+    block_size = 64 * 1024
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for algorithm in ALGORITHMS:
+            path = os.path.join(temp_dir, f"{algorithm}.enc.mp4")
+            _write_encrypted(path, plain, algorithm)
+            blocks = Decryptor().open_decrypted_blocks(path, PASSWORD, block_size=block_size)
+            server = DecryptedRangeServer(blocks, name="video.mp4")
+            server.start()
+            try:
+                status, headers, body = _request(server, 'GET')
+                assert status == 200 and body == plain
+                assert headers['Accept-Ranges'] == 'bytes' and headers['Content-Type'] == 'video/mp4'
+
+                # 跨块边界、到末尾、最后N个字节
+                cases = {
+                    'bytes=100-199': (100, 200),
+                    f'bytes={block_size - 5}-{block_size + 10}': (block_size - 5, block_size + 11),
+                    f'bytes={size - 20}-': (size - 20, size),
+                    'bytes=-500': (size - 500, size),
+                    f'bytes=10-{size + 1000}': (10, size),
+                }
+                for header, (start, end) in cases.items():
+                    status, headers, body = _request(server, 'GET', {'Range': header})
+                    assert status == 206, header
+                    assert headers['Content-Range'] == f'bytes {start}-{end - 1}/{size}', header
+                    assert int(headers['Content-Length']) == end - start
+                    assert body == plain[start:end], header
+
+                # 无法满足或不支持的范围
+                for header in (f'bytes={size}-', 'bytes=200-100', 'bytes=0-1,5-6', 'items=0-1'):
+                    status, headers, body = _request(server, 'GET', {'Range': header})
+                    assert status == 416, header
+                    assert headers['Content-Range'] == f'bytes */{size}'
+
+                status, headers, body = _request(server, 'HEAD', {'Range': 'bytes=0-99'})
+                assert status == 206 and headers['Content-Length'] == '100' and body == b''
+
+                status, _, _ = _request(server, 'GET', path='/other.mp4')
+                assert status == 404
+            finally:
+                server.stop()
+            print(f"  ✓ {algorithm}")
+    print()
+
+
+def test_decrypting_reader():
+    """测试3: DecryptingReader的read/seek/tell与明文一致"""
+    print("测试3: 可定位的解密文件对象")
+    plain = _plain_data(200 * 1024 + 7)
+    size = len(plain)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for algorithm in ALGORITHMS:
+            path = os.path.join(temp_dir, f"{algorithm}.enc.mp4")
+            _write_encrypted(path, plain, algorithm)
+
+            with DecryptingReader(path, PASSWORD, block_size=16 * 1024, max_blocks=2) as f:
+                assert f.size == size and f.seekable() and f.readable()
+                assert f.read(16) == plain[:16] and f.tell() == 16
+
+                assert f.seek(16 * 1024 - 3) == 16 * 1024 - 3
+                assert f.read(10) == plain[16 * 1024 - 3:16 * 1024 + 7]
+                assert f.seek(5, io.SEEK_CUR) == 16 * 1024 + 12
+                assert f.read(4) == plain[16 * 1024 + 12:16 * 1024 + 16]
+
+                f.seek(-1024, io.SEEK_END)
+                assert f.read() == plain[-1024:]
+                assert f.read(10) == b'' and f.tell() == size
+
+                # 超出末尾的位置可以seek，读取返回空
+                f.seek(size + 100)
+                assert f.read(10) == b''
+
+                buffer = bytearray(100)
+                f.seek(50)
+                assert f.readinto(buffer) == 100 and bytes(buffer) == plain[50:150]
+
+                try:
+                    f.seek(-1)
+                except ValueError:
+                    pass
+                else:
+                    raise AssertionError("负的位置未报错")
+
+                # 标准库按文件对象读取
+                f.seek(0)
+                digest = hashlib.sha256()
+                for chunk in iter(lambda: f.read(8192), b''):
+                    digest.update(chunk)
+                assert digest.digest() == hashlib.sha256(plain).digest()
+
+                f.seek(0)
+                output = io.BytesIO()
+                shutil.copyfileobj(f, output)
+                assert output.getvalue() == plain
+
+            try:
+                f.read(1)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("关闭后读取未报错")
+            print(f"  ✓ {algorithm}")
+    print()
+
+
+def main():
+    """运行所有测试"""
+    print("=" * 60)
+    print("随机访问测试")
+    print("=" * 60)
+    print()
+
+    test_random_access_decrypt()
+    test_range_server()
+    test_decrypting_reader()
+
+    print("=" * 60)
+    print("测试完成")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()